@@ -0,0 +1,65 @@
+"""
+Mesure du gain de la fusion des transformations ligne à ligne
+
+Les transformations SelectionVariables, EnleveValMq, FormaterDate et
+SelectionObservations sont appliquées au jeu de données synop, d'abord l'une
+après l'autre puis fusionnées en un seul parcours (voir Fusion). Les deux
+résultats doivent être identiques.
+"""
+from time import perf_counter
+
+from pipelinepackage.imports.importcsvgz import ImportCsvGz
+
+from pipelinepackage.transformations.enlevevalmq import EnleveValMq
+from pipelinepackage.transformations.formaterdate import FormaterDate
+from pipelinepackage.transformations.fusion import Fusion
+from pipelinepackage.transformations.selectionobservations import SelectionObservations
+from pipelinepackage.transformations.selectionvariables import SelectionVariables
+
+REPETITIONS = 5
+
+
+def etapes():
+    """Transformations mesurées (nouvelles à chaque mesure : les dates déjà
+    converties par FormaterDate sont mémorisées)"""
+    return [SelectionVariables(['numer_sta', 'date', 't']),
+            EnleveValMq([None, 'mq']),
+            FormaterDate('date', '%Y%m%d%H%M%S'),
+            SelectionObservations(['t'], ['>'], [280], ['float'])]
+
+
+def successives(dataset):
+    """Transformations appliquées l'une après l'autre"""
+    for transfo in etapes():
+        dataset = transfo.transforme(dataset)
+    return dataset
+
+
+def fusionnees(dataset):
+    """Transformations appliquées en un seul parcours"""
+    return Fusion(etapes()).transforme(dataset)
+
+
+def mesure(fonction, importation):
+    """Meilleure durée d'exécution (en secondes) et résultat"""
+    meilleure = None
+    for _ in range(REPETITIONS):
+        dataset = importation.importe()
+        debut = perf_counter()
+        resultat = fonction(dataset)
+        duree = perf_counter() - debut
+        meilleure = duree if meilleure is None else min(meilleure, duree)
+    return meilleure, resultat
+
+
+if __name__ == '__main__':
+    synop = ImportCsvGz('data/input/synop.202201.csv.gz', ';')
+    duree_successives, attendu = mesure(successives, synop)
+    duree_fusionnees, obtenu = mesure(fusionnees, synop)
+
+    assert obtenu.header == attendu.header and obtenu.body == attendu.body
+
+    print(len(synop.importe()), "observations,", len(obtenu), "retenues")
+    print("successives : {:.1f} ms".format(1000*duree_successives))
+    print("fusionnées  : {:.1f} ms".format(1000*duree_fusionnees))
+    print("gain        : x{:.2f}".format(duree_successives/duree_fusionnees))
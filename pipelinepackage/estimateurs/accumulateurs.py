@@ -0,0 +1,620 @@
+"""
+module accumulateurs
+
+Statistiques calculées au fil de l'eau, valeur par valeur.
+
+Un accumulateur reçoit les valeurs d'un groupe une à une (ajoute) et ne
+conserve que ce qui est nécessaire au calcul de sa statistique (une somme, un
+effectif, un extremum...) : les observations du groupe n'ont pas à être gardées
+en mémoire. Les valeurs manquantes ne sont jamais transmises aux accumulateurs.
+
+Deux accumulateurs de même statistique, alimentés par des parties disjointes
+d'un jeu de données (lots, fichiers, processus), se fusionnent (fusionne) : le
+résultat est celui d'un seul accumulateur ayant reçu toutes les valeurs,
+exactement (formule de Chan et al. pour la variance), sauf pour les quantiles
+qui sont estimés par un t-digest.
+
+Examples
+--------
+>>> acc = cree_accumulateur('moyenne')
+>>> for val in [23.0, 17.0, 7.0, 21.0]:
+...     acc.ajoute(val)
+>>> acc.valeur()
+17.0
+>>> acc = cree_accumulateur('max')
+>>> for val in [23.0, 17.0, 7.0, 21.0]:
+...     acc.ajoute(val)
+>>> acc.valeur()
+23.0
+>>> autre = cree_accumulateur('max')
+>>> autre.ajoute(31.0)
+>>> acc.fusionne(autre).valeur()
+31.0
+"""
+from abc import ABC, abstractmethod
+
+
+class Accumulateur(ABC):
+    """Classe abstraite Accumulateur
+
+    Attributes
+    ----------
+    numerique : bool
+        True si les valeurs doivent être converties en nombres avant d'être ajoutées
+    """
+
+    numerique = True
+
+    @abstractmethod
+    def ajoute(self, valeur):
+        """Ajout d'une valeur (non manquante)
+
+        Parameters
+        ----------
+        valeur
+            Valeur à prendre en compte
+        """
+
+    @abstractmethod
+    def valeur(self):
+        """Statistique sur les valeurs ajoutées
+
+        Returns
+        -------
+        float ou None
+            Statistique (None si aucune valeur n'a été ajoutée)
+        """
+
+    @abstractmethod
+    def fusionne(self, autre):
+        """Ajout des valeurs reçues par un autre accumulateur de même classe
+
+        Les valeurs de autre sont considérées comme reçues après celles de
+        l'accumulateur (pour 'premier' et 'dernier').
+
+        Parameters
+        ----------
+        autre : Accumulateur
+            Accumulateur alimenté par d'autres valeurs
+
+        Returns
+        -------
+        Accumulateur
+            L'accumulateur lui-même
+        """
+
+
+class Compte(Accumulateur):
+    """Classe Compte
+
+    Nombre de valeurs non manquantes.
+    """
+
+    numerique = False
+
+    def __init__(self):
+        """Constructeur"""
+        self.__nombre = 0
+
+    def ajoute(self, valeur):
+        self.__nombre += 1
+
+    def valeur(self):
+        return self.__nombre
+
+    def fusionne(self, autre):
+        self.__nombre += autre.__nombre
+        return self
+
+
+class Somme(Accumulateur):
+    """Classe Somme
+
+    Somme des valeurs.
+    """
+
+    def __init__(self):
+        """Constructeur"""
+        self.__somme = 0.0
+
+    def ajoute(self, valeur):
+        self.__somme += valeur
+
+    def valeur(self):
+        return self.__somme
+
+    def fusionne(self, autre):
+        self.__somme += autre.__somme
+        return self
+
+
+class Moyenne(Accumulateur):
+    """Classe Moyenne
+
+    Moyenne des valeurs, tenue à jour par une somme et un effectif.
+    """
+
+    def __init__(self):
+        """Constructeur"""
+        self.__somme = 0.0
+        self.__nombre = 0
+
+    def ajoute(self, valeur):
+        self.__somme += valeur
+        self.__nombre += 1
+
+    def valeur(self):
+        if self.__nombre == 0:
+            return None
+        return self.__somme/self.__nombre
+
+    def fusionne(self, autre):
+        self.__somme += autre.__somme
+        self.__nombre += autre.__nombre
+        return self
+
+
+class Min(Accumulateur):
+    """Classe Min
+
+    Plus petite valeur.
+    """
+
+    def __init__(self):
+        """Constructeur"""
+        self.__min = None
+
+    def ajoute(self, valeur):
+        if self.__min is None or valeur < self.__min:
+            self.__min = valeur
+
+    def valeur(self):
+        return self.__min
+
+    def fusionne(self, autre):
+        if autre.__min is not None:
+            self.ajoute(autre.__min)
+        return self
+
+
+class Max(Accumulateur):
+    """Classe Max
+
+    Plus grande valeur.
+    """
+
+    def __init__(self):
+        """Constructeur"""
+        self.__max = None
+
+    def ajoute(self, valeur):
+        if self.__max is None or valeur > self.__max:
+            self.__max = valeur
+
+    def valeur(self):
+        return self.__max
+
+    def fusionne(self, autre):
+        if autre.__max is not None:
+            self.ajoute(autre.__max)
+        return self
+
+
+class Variance(Accumulateur):
+    """Classe Variance
+
+    Variance corrigée, calculée en un seul passage par la méthode de Welford ;
+    deux variances se fusionnent par la formule de Chan et al.
+
+    Attributes
+    ----------
+    nombre : int
+        Nombre de valeurs ajoutées
+    moyenne : float
+        Moyenne des valeurs ajoutées (None si aucune)
+
+    Examples
+    --------
+    >>> a, b = Variance(), Variance()
+    >>> for val in [23.0, 17.0]:
+    ...     a.ajoute(val)
+    >>> for val in [7.0, 21.0]:
+    ...     b.ajoute(val)
+    >>> a = a.fusionne(b)
+    >>> a.nombre, a.moyenne, round(a.valeur(), 3)
+    (4, 17.0, 50.667)
+    """
+
+    def __init__(self):
+        """Constructeur"""
+        self.__nombre = 0
+        self.__moyenne = 0.0
+        self.__m2 = 0.0
+
+    @property
+    def nombre(self):
+        """Nombre de valeurs ajoutées"""
+        return self.__nombre
+
+    @property
+    def moyenne(self):
+        """Moyenne des valeurs ajoutées"""
+        return self.__moyenne if self.__nombre else None
+
+    def ajoute(self, valeur):
+        self.__nombre += 1
+        delta = valeur - self.__moyenne
+        self.__moyenne += delta/self.__nombre
+        self.__m2 += delta*(valeur - self.__moyenne)
+
+    def valeur(self):
+        if self.__nombre < 2:
+            return None
+        return self.__m2/(self.__nombre-1)
+
+    def fusionne(self, autre):
+        if autre.__nombre:
+            nombre = self.__nombre + autre.__nombre
+            delta = autre.__moyenne - self.__moyenne
+            self.__m2 += autre.__m2 + delta*delta*self.__nombre*autre.__nombre/nombre
+            self.__moyenne += delta*autre.__nombre/nombre
+            self.__nombre = nombre
+        return self
+
+
+class EcartType(Variance):
+    """Classe EcartType
+
+    Écart-type corrigé (comme Estimateur.ecarttype), racine de la variance.
+
+    Examples
+    --------
+    >>> acc = EcartType()
+    >>> for val in [23.0, 17.0, 7.0, 21.0]:
+    ...     acc.ajoute(val)
+    >>> round(acc.valeur(), 3)
+    7.118
+    """
+
+    def valeur(self):
+        variance = super().valeur()
+        return None if variance is None else variance**(1/2)
+
+
+class Premier(Accumulateur):
+    """Classe Premier
+
+    Première valeur rencontrée.
+    """
+
+    numerique = False
+
+    def __init__(self):
+        """Constructeur"""
+        self.__valeur = None
+        self.__vide = True
+
+    def ajoute(self, valeur):
+        if self.__vide:
+            self.__valeur = valeur
+            self.__vide = False
+
+    def valeur(self):
+        return self.__valeur
+
+    def fusionne(self, autre):
+        if not autre.__vide:
+            self.ajoute(autre.__valeur)
+        return self
+
+
+class Dernier(Accumulateur):
+    """Classe Dernier
+
+    Dernière valeur rencontrée.
+    """
+
+    numerique = False
+
+    def __init__(self):
+        """Constructeur"""
+        self.__valeur = None
+        self.__vide = True
+
+    def ajoute(self, valeur):
+        self.__valeur = valeur
+        self.__vide = False
+
+    def valeur(self):
+        return self.__valeur
+
+    def fusionne(self, autre):
+        if not autre.__vide:
+            self.ajoute(autre.__valeur)
+        return self
+
+
+class TDigest:
+    """Classe TDigest
+
+    Estimation des quantiles d'une distribution par un ensemble de centroïdes
+    (moyenne, poids) : les centroïdes sont petits aux extrémités de la
+    distribution et plus gros au centre, leur nombre reste de l'ordre de la
+    compression quel que soit le nombre de valeurs.
+
+    Attributes
+    ----------
+    compression : int
+        Paramètre de précision (plus il est grand, plus l'estimation est
+        précise et plus le digest est gros)
+
+    Examples
+    --------
+    >>> d = TDigest()
+    >>> for val in range(1, 10001):
+    ...     d.ajoute(float(val))
+    >>> round(d.quantile(0.5)), round(d.quantile(0.99))
+    (5000, 9900)
+    """
+
+    def __init__(self, compression=100):
+        """Constructeur
+
+        Parameters
+        ----------
+        compression : int, optional
+            Paramètre de précision, by default 100
+        """
+        self.__compression = compression
+        self.__centroides = []
+        self.__tampon = []
+        self.__total = 0.0
+        self.__min = None
+        self.__max = None
+
+    @property
+    def compression(self):
+        """Paramètre de précision"""
+        return self.__compression
+
+    def __len__(self):
+        return int(self.__total)
+
+    def ajoute(self, valeur, poids=1.0):
+        """Ajout d'une valeur
+
+        Parameters
+        ----------
+        valeur : float
+            Valeur à ajouter
+        poids : float, optional
+            Poids de la valeur, by default 1.0
+        """
+        self.__tampon.append((valeur, poids))
+        self.__total += poids
+        if self.__min is None or valeur < self.__min:
+            self.__min = valeur
+        if self.__max is None or valeur > self.__max:
+            self.__max = valeur
+        if len(self.__tampon) > 5*self.__compression:
+            self.__compresse()
+
+    def fusionne(self, autre):
+        """Ajout des valeurs d'un autre digest
+
+        Parameters
+        ----------
+        autre : TDigest
+            Digest calculé sur d'autres valeurs
+
+        Returns
+        -------
+        TDigest
+            Le digest lui-même
+        """
+        if autre.__total == 0:
+            return self
+        autre.__compresse()
+        self.__tampon.extend(autre.__centroides)
+        self.__total += autre.__total
+        self.__min = autre.__min if self.__min is None else min(self.__min, autre.__min)
+        self.__max = autre.__max if self.__max is None else max(self.__max, autre.__max)
+        self.__compresse()
+        return self
+
+    def __compresse(self):
+        """Regroupement des centroïdes et des valeurs en attente"""
+        if not self.__tampon:
+            return
+        points = sorted(self.__centroides + self.__tampon)
+        self.__tampon = []
+        total = self.__total
+        centroides = []
+        cumul = 0.0
+        moyenne, poids = points[0]
+        for val, poids_val in points[1:]:
+            nouveau = poids + poids_val
+            q = (cumul + nouveau/2)/total
+            if nouveau <= max(1.0, 4*total*q*(1-q)/self.__compression):
+                moyenne += (val - moyenne)*poids_val/nouveau
+                poids = nouveau
+            else:
+                centroides.append((moyenne, poids))
+                cumul += poids
+                moyenne, poids = val, poids_val
+        centroides.append((moyenne, poids))
+        self.__centroides = centroides
+
+    def quantile(self, ordre):
+        """Estimation d'un quantile
+
+        Parameters
+        ----------
+        ordre : float
+            Ordre du quantile, entre 0 et 1
+
+        Returns
+        -------
+        float ou None
+            Quantile estimé (None si aucune valeur)
+        """
+        if self.__total == 0:
+            return None
+        self.__compresse()
+        centroides = self.__centroides
+        if len(centroides) == 1:
+            return centroides[0][0]
+        cible = ordre*self.__total
+        # position (effectif cumulé) du centre de chaque centroïde
+        centres = []
+        cumul = 0.0
+        for _, poids in centroides:
+            centres.append(cumul + poids/2)
+            cumul += poids
+        if cible <= centres[0]:
+            return self.__interpole(cible, 0.0, centres[0], self.__min, centroides[0][0])
+        if cible >= centres[-1]:
+            return self.__interpole(cible, centres[-1], self.__total,
+                                    centroides[-1][0], self.__max)
+        for k in range(len(centres) - 1):
+            if cible <= centres[k+1]:
+                return self.__interpole(cible, centres[k], centres[k+1],
+                                        centroides[k][0], centroides[k+1][0])
+        return self.__max
+
+    @staticmethod
+    def __interpole(x, x0, x1, y0, y1):
+        if x1 == x0:
+            return y0
+        return y0 + (y1 - y0)*(x - x0)/(x1 - x0)
+
+
+class Quantile(Accumulateur):
+    """Classe Quantile
+
+    Quantile estimé par un t-digest (la médiane par défaut) ; les autres
+    quantiles des mêmes valeurs restent disponibles (quantile).
+
+    Examples
+    --------
+    >>> a, b = Quantile(), Quantile()
+    >>> for val in range(1, 5001):
+    ...     a.ajoute(float(val))
+    >>> for val in range(5001, 10001):
+    ...     b.ajoute(float(val))
+    >>> round(a.fusionne(b).valeur()), round(a.quantile(0.99))
+    (5000, 9900)
+    """
+
+    def __init__(self, ordre=0.5, compression=100):
+        """Constructeur
+
+        Parameters
+        ----------
+        ordre : float, optional
+            Ordre du quantile rendu par valeur, entre 0 et 1, by default 0.5
+        compression : int, optional
+            Précision de l'estimation (voir TDigest), by default 100
+        """
+        self.__ordre = ordre
+        self.__digest = TDigest(compression)
+
+    def ajoute(self, valeur):
+        self.__digest.ajoute(valeur)
+
+    def valeur(self):
+        return self.__digest.quantile(self.__ordre)
+
+    def quantile(self, ordre):
+        """Estimation d'un quantile quelconque des valeurs ajoutées
+
+        Parameters
+        ----------
+        ordre : float
+            Ordre du quantile, entre 0 et 1
+
+        Returns
+        -------
+        float ou None
+            Quantile estimé (None si aucune valeur)
+        """
+        return self.__digest.quantile(ordre)
+
+    def fusionne(self, autre):
+        self.__digest.fusionne(autre.__digest)
+        return self
+
+
+class Fonction(Accumulateur):
+    """Classe Fonction
+
+    Application d'une fonction quelconque à la liste des valeurs. Contrairement
+    aux autres accumulateurs, les valeurs sont conservées jusqu'au calcul.
+
+    Examples
+    --------
+    >>> acc = Fonction(lambda x: max(x) - min(x))
+    >>> for val in [23.0, 17.0, 7.0, 21.0]:
+    ...     acc.ajoute(val)
+    >>> acc.valeur()
+    16.0
+    """
+
+    def __init__(self, fonction):
+        """Constructeur
+
+        Parameters
+        ----------
+        fonction : function
+            Fonction qui prend la liste des valeurs et renvoie la statistique
+        """
+        self.__fonction = fonction
+        self.__valeurs = []
+
+    def ajoute(self, valeur):
+        self.__valeurs.append(valeur)
+
+    def valeur(self):
+        return self.__fonction(self.__valeurs)
+
+    def fusionne(self, autre):
+        self.__valeurs.extend(autre.__valeurs)
+        return self
+
+
+# accumulateur associé au nom de chaque statistique (noms français et anglais)
+ACCUMULATEURS = {'compte': Compte, 'count': Compte,
+                 'somme': Somme, 'sum': Somme,
+                 'moyenne': Moyenne, 'mean': Moyenne,
+                 'min': Min, 'max': Max,
+                 'variance': Variance, 'var': Variance,
+                 'ecarttype': EcartType, 'std': EcartType,
+                 'mediane': Quantile, 'median': Quantile,
+                 'premier': Premier, 'first': Premier,
+                 'dernier': Dernier, 'last': Dernier}
+
+
+def cree_accumulateur(agregat):
+    """Création d'un accumulateur
+
+    Parameters
+    ----------
+    agregat : str ou function
+        Nom de la statistique (voir ACCUMULATEURS) ou fonction qui prend la
+        liste des valeurs
+
+    Returns
+    -------
+    Accumulateur
+        Nouvel accumulateur, sans valeur
+    """
+    if callable(agregat):
+        return Fonction(agregat)
+    if agregat not in ACCUMULATEURS:
+        raise ValueError("Agrégat inconnu : " + str(agregat))
+    return ACCUMULATEURS[agregat]()
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod(verbose=True)
@@ -0,0 +1,327 @@
+"""
+module accumulateursglissants
+
+Statistiques mises à jour au fil d'une fenêtre glissante.
+
+Un accumulateur reçoit les valeurs qui entrent dans la fenêtre (ajoute) et
+celles qui en sortent (retire), toujours dans l'ordre d'entrée : la valeur
+retirée est la plus ancienne de la fenêtre. Les valeurs manquantes (None)
+occupent une place dans la fenêtre mais ne sont pas prises en compte dans
+les statistiques. Comme pour la classe Estimateur, les résultats sont arrondis
+à 3 décimales.
+
+Examples
+--------
+>>> acc = AccMoyenne()
+>>> for val in [15, 17, 16]:
+...     acc.ajoute(val)
+>>> acc.valeur()
+16.0
+>>> acc.retire(15)
+>>> acc.ajoute(None)
+>>> acc.valeur()
+16.5
+"""
+from abc import ABC, abstractmethod
+from collections import deque
+from heapq import heappop, heappush
+from math import floor
+
+
+class Accumulateur(ABC):
+    """Classe abstraite Accumulateur
+
+    Statistique calculée sur une fenêtre glissante.
+    """
+
+    @abstractmethod
+    def ajoute(self, valeur):
+        """Entrée d'une valeur dans la fenêtre
+
+        Parameters
+        ----------
+        valeur : float ou None
+            Valeur qui entre dans la fenêtre
+        """
+
+    @abstractmethod
+    def retire(self, valeur):
+        """Sortie de la plus ancienne valeur de la fenêtre
+
+        Parameters
+        ----------
+        valeur : float ou None
+            Valeur qui sort de la fenêtre
+        """
+
+    @abstractmethod
+    def valeur(self):
+        """Statistique sur les valeurs de la fenêtre
+
+        Returns
+        -------
+        float ou None
+            Statistique (None si la fenêtre ne contient aucune valeur)
+        """
+
+
+class AccMoyenne(Accumulateur):
+    """Classe AccMoyenne
+
+    Moyenne glissante tenue à jour par une somme courante.
+
+    Examples
+    --------
+    >>> acc = AccMoyenne()
+    >>> acc.ajoute(1.0)
+    >>> acc.ajoute(2.0)
+    >>> acc.valeur()
+    1.5
+    """
+
+    def __init__(self):
+        """Constructeur"""
+        self.__somme = 0.0
+        self.__nombre = 0
+
+    def ajoute(self, valeur):
+        if valeur is not None:
+            self.__somme += valeur
+            self.__nombre += 1
+
+    def retire(self, valeur):
+        if valeur is not None:
+            self.__somme -= valeur
+            self.__nombre -= 1
+            if self.__nombre == 0:
+                self.__somme = 0.0
+
+    def valeur(self):
+        if self.__nombre == 0:
+            return None
+        return round(self.__somme/self.__nombre, 3)
+
+
+class AccEcartType(Accumulateur):
+    """Classe AccEcartType
+
+    Écart-type (corrigé, comme Estimateur.ecarttype) glissant tenu à jour par
+    la méthode de Welford, qui permet aussi de retirer une valeur.
+
+    Examples
+    --------
+    >>> acc = AccEcartType()
+    >>> for val in [23, 17, 7, 21, 100]:
+    ...     acc.ajoute(val)
+    >>> acc.retire(23)
+    >>> acc.retire(17)
+    >>> acc.valeur()
+    50.143
+    """
+
+    def __init__(self):
+        """Constructeur"""
+        self.__nombre = 0
+        self.__moyenne = 0.0
+        self.__m2 = 0.0
+
+    def ajoute(self, valeur):
+        if valeur is None:
+            return
+        self.__nombre += 1
+        delta = valeur - self.__moyenne
+        self.__moyenne += delta/self.__nombre
+        self.__m2 += delta*(valeur - self.__moyenne)
+
+    def retire(self, valeur):
+        if valeur is None:
+            return
+        if self.__nombre == 1:
+            self.__init__()
+            return
+        ancienne = self.__moyenne
+        self.__nombre -= 1
+        self.__moyenne -= (valeur - ancienne)/self.__nombre
+        self.__m2 -= (valeur - ancienne)*(valeur - self.__moyenne)
+
+    def valeur(self):
+        if self.__nombre < 2:
+            return None
+        return round((max(self.__m2, 0.0)/(self.__nombre-1))**(1/2), 3)
+
+
+class AccMin(Accumulateur):
+    """Classe AccMin
+
+    Minimum glissant tenu à jour par une file monotone : chaque valeur y entre
+    et en sort au plus une fois.
+
+    Examples
+    --------
+    >>> acc = AccMin()
+    >>> for val in [3, 1, 2]:
+    ...     acc.ajoute(val)
+    >>> acc.valeur()
+    1
+    >>> acc.retire(3)
+    >>> acc.retire(1)
+    >>> acc.valeur()
+    2
+    """
+
+    def __init__(self):
+        """Constructeur"""
+        self.__file = deque()
+        self.__entrees = 0
+        self.__sorties = 0
+
+    def domine(self, nouvelle, ancienne):
+        """Vrai si la nouvelle valeur rend inutile une valeur plus ancienne"""
+        return nouvelle <= ancienne
+
+    def ajoute(self, valeur):
+        rang = self.__entrees
+        self.__entrees += 1
+        if valeur is None:
+            return
+        while self.__file and self.domine(valeur, self.__file[-1][1]):
+            self.__file.pop()
+        self.__file.append((rang, valeur))
+
+    def retire(self, valeur):
+        rang = self.__sorties
+        self.__sorties += 1
+        if self.__file and self.__file[0][0] == rang:
+            self.__file.popleft()
+
+    def valeur(self):
+        if not self.__file:
+            return None
+        return round(self.__file[0][1], 3)
+
+
+class AccMax(AccMin):
+    """Classe AccMax
+
+    Maximum glissant tenu à jour par une file monotone.
+
+    Examples
+    --------
+    >>> acc = AccMax()
+    >>> for val in [3, 1, 2]:
+    ...     acc.ajoute(val)
+    >>> acc.retire(3)
+    >>> acc.valeur()
+    2
+    """
+
+    def domine(self, nouvelle, ancienne):
+        return nouvelle >= ancienne
+
+
+class AccQuantile(Accumulateur):
+    """Classe AccQuantile
+
+    Quantile glissant (interpolation linéaire entre les deux valeurs
+    encadrantes) tenu à jour par deux tas : le tas du bas contient les valeurs
+    jusqu'au rang du quantile, le tas du haut les suivantes. Les valeurs
+    retirées sont supprimées des tas au moment où elles arrivent à leur sommet.
+    Chaque mise à jour coûte O(log w) pour une fenêtre de w valeurs.
+
+    Attributes
+    ----------
+    ordre : float
+        Ordre du quantile, entre 0 et 1 (0.5 pour la médiane)
+
+    Examples
+    --------
+    >>> acc = AccQuantile(0.5)
+    >>> for val in [5, 1, 4, 2]:
+    ...     acc.ajoute(val)
+    >>> acc.valeur()
+    3.0
+    >>> acc.retire(5)
+    >>> acc.valeur()
+    2
+    >>> acc = AccQuantile(0.9)
+    >>> for val in range(11):
+    ...     acc.ajoute(val)
+    >>> acc.valeur()
+    9
+    """
+
+    def __init__(self, ordre=0.5):
+        """Constructeur
+
+        Parameters
+        ----------
+        ordre : float, optional
+            Ordre du quantile, entre 0 et 1, by default 0.5 (médiane)
+        """
+        self.__ordre = ordre
+        self.__bas = []
+        self.__haut = []
+        self.__nbas = 0
+        self.__nhaut = 0
+        self.__retard = {}
+
+    def __nettoie(self):
+        """Suppression des valeurs retirées présentes au sommet des tas"""
+        retard = self.__retard
+        while self.__bas and retard.get(-self.__bas[0]):
+            retard[-heappop(self.__bas)] -= 1
+        while self.__haut and retard.get(self.__haut[0]):
+            retard[heappop(self.__haut)] -= 1
+
+    def __equilibre(self):
+        """Répartition des valeurs pour que le tas du bas s'arrête au rang du quantile"""
+        nombre = self.__nbas + self.__nhaut
+        cible = floor(self.__ordre*(nombre-1)) + 1 if nombre else 0
+        while self.__nbas > cible:
+            heappush(self.__haut, -heappop(self.__bas))
+            self.__nbas -= 1
+            self.__nhaut += 1
+            self.__nettoie()
+        while self.__nbas < cible:
+            heappush(self.__bas, -heappop(self.__haut))
+            self.__nbas += 1
+            self.__nhaut -= 1
+            self.__nettoie()
+
+    def ajoute(self, valeur):
+        if valeur is None:
+            return
+        if self.__bas and valeur <= -self.__bas[0]:
+            heappush(self.__bas, -valeur)
+            self.__nbas += 1
+        else:
+            heappush(self.__haut, valeur)
+            self.__nhaut += 1
+        self.__equilibre()
+
+    def retire(self, valeur):
+        if valeur is None:
+            return
+        self.__retard[valeur] = self.__retard.get(valeur, 0) + 1
+        if self.__bas and valeur <= -self.__bas[0]:
+            self.__nbas -= 1
+        else:
+            self.__nhaut -= 1
+        self.__nettoie()
+        self.__equilibre()
+
+    def valeur(self):
+        nombre = self.__nbas + self.__nhaut
+        if nombre == 0:
+            return None
+        position = self.__ordre*(nombre-1)
+        bas = -self.__bas[0]
+        fraction = position - floor(position)
+        if fraction == 0 or not self.__haut:
+            return round(bas, 3)
+        return round(bas + fraction*(self.__haut[0] - bas), 3)
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod(verbose=True)
@@ -1,7 +1,201 @@
 """" module estimateur
 
 Calcule des statistiques descriptives sur une variable d'un jeu de données.
+
+Toutes les statistiques de toutes les variables (et de tous les groupes) sont
+calculées en un seul parcours des observations, sous forme de résumés
+(Statistiques) formés d'accumulateurs fusionnables (module accumulateurs) : les
+résumés de plusieurs lots ou de plusieurs fichiers, éventuellement calculés
+dans des processus différents, se combinent exactement (les quantiles sont
+estimés).
+
+Examples
+--------
+>>> a, b = Statistiques(), Statistiques()
+>>> for val in [23.0, 17.0]:
+...     a.ajoute(val)
+>>> for val in [7.0, 21.0, None]:
+...     b.ajoute(val)
+>>> s = a.fusionne(b)
+>>> s.nombre, s.nb_nulls, s.moyenne, round(s.ecarttype, 3), s.min, s.max
+(4, 1, 17.0, 7.118, 7.0, 23.0)
 """
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from math import isnan
+from pipelinepackage.estimateurs.accumulateurs import Max, Min, Quantile, Somme, Variance
+from pipelinepackage.model.colonne import VALMQ
+from pipelinepackage.model.dataset import Dataset
+from pipelinepackage.model.datasetcolonnes import DatasetColonnes
+
+
+class Statistiques:
+    """Classe Statistiques
+
+    Résumé fusionnable d'une variable : nombre de valeurs manquantes et
+    accumulateurs de la somme, de la variance (qui tient aussi l'effectif et la
+    moyenne), du minimum, du maximum et éventuellement des quantiles.
+
+    Attributes
+    ----------
+    nombre : int
+        Nombre de valeurs non manquantes
+    nb_nulls : int
+        Nombre de valeurs manquantes
+    somme : float
+        Somme des valeurs
+    moyenne : float
+        Moyenne des valeurs (None si aucune)
+    variance : float
+        Variance corrigée (None si moins de deux valeurs)
+    ecarttype : float
+        Écart-type corrigé, comme Estimateur.ecarttype (None si moins de deux valeurs)
+    min : float
+        Plus petite valeur
+    max : float
+        Plus grande valeur
+    """
+
+    def __init__(self, quantiles=False, compression=100):
+        """Constructeur
+
+        Parameters
+        ----------
+        quantiles : bool, optional
+            True pour estimer aussi les quantiles, by default False
+        compression : int, optional
+            Précision de l'estimation des quantiles (voir TDigest), by default 100
+        """
+        self.__nb_nulls = 0
+        self.__somme = Somme()
+        self.__variance = Variance()
+        self.__min = Min()
+        self.__max = Max()
+        self.__quantile = Quantile(compression=compression) if quantiles else None
+        self.__accumulateurs = [acc for acc in (self.__somme, self.__variance, self.__min,
+                                                self.__max, self.__quantile)
+                                if acc is not None]
+
+    def ajoute(self, valeur):
+        """Ajout d'une valeur
+
+        Parameters
+        ----------
+        valeur : float ou None
+            Valeur à ajouter (None ou NaN pour une valeur manquante)
+        """
+        if valeur is None or isnan(valeur):
+            self.__nb_nulls += 1
+            return
+        for acc in self.__accumulateurs:
+            acc.ajoute(valeur)
+
+    def fusionne(self, autre):
+        """Ajout des valeurs résumées par un autre résumé
+
+        Parameters
+        ----------
+        autre : Statistiques
+            Résumé calculé sur d'autres valeurs
+
+        Returns
+        -------
+        Statistiques
+            Le résumé lui-même
+        """
+        self.__nb_nulls += autre.__nb_nulls
+        for acc, acc_autre in zip(self.__accumulateurs, autre.__accumulateurs):
+            acc.fusionne(acc_autre)
+        return self
+
+    @property
+    def nombre(self):
+        """Nombre de valeurs non manquantes"""
+        return self.__variance.nombre
+
+    @property
+    def nb_nulls(self):
+        """Nombre de valeurs manquantes"""
+        return self.__nb_nulls
+
+    @property
+    def somme(self):
+        """Somme des valeurs"""
+        return self.__somme.valeur()
+
+    @property
+    def moyenne(self):
+        """Moyenne des valeurs"""
+        return self.__variance.moyenne
+
+    @property
+    def variance(self):
+        """Variance corrigée"""
+        return self.__variance.valeur()
+
+    @property
+    def ecarttype(self):
+        """Écart-type corrigé"""
+        variance = self.__variance.valeur()
+        return None if variance is None else variance**(1/2)
+
+    @property
+    def min(self):
+        """Plus petite valeur"""
+        return self.__min.valeur()
+
+    @property
+    def max(self):
+        """Plus grande valeur"""
+        return self.__max.valeur()
+
+    def quantile(self, ordre):
+        """Estimation d'un quantile (voir accumulateurs.Quantile)
+
+        Parameters
+        ----------
+        ordre : float
+            Ordre du quantile, entre 0 et 1
+
+        Returns
+        -------
+        float ou None
+            Quantile estimé
+        """
+        if self.__quantile is None:
+            raise ValueError("Quantiles non demandés (quantiles=True)")
+        return self.__quantile.quantile(ordre)
+
+    def resultats(self):
+        """Toutes les statistiques
+
+        Returns
+        -------
+        dict
+            Nom et valeur de chaque statistique (et médiane si les quantiles
+            sont estimés)
+
+        Examples
+        --------
+        >>> s = Statistiques(quantiles=True)
+        >>> for val in [1.0, 2.0, None, 3.0]:
+        ...     s.ajoute(val)
+        >>> s.resultats()
+        {'nombre': 3, 'nb_nulls': 1, 'somme': 6.0, 'moyenne': 2.0, 'variance': 1.0, 'ecarttype': 1.0, 'min': 1.0, 'max': 3.0, 'mediane': 2.0}
+        """
+        res = {'nombre': self.nombre, 'nb_nulls': self.nb_nulls, 'somme': self.somme,
+               'moyenne': self.moyenne, 'variance': self.variance,
+               'ecarttype': self.ecarttype, 'min': self.min, 'max': self.max}
+        if self.__quantile is not None:
+            res['mediane'] = self.__quantile.valeur()
+        return res
+
+
+def _calcule_fichier(estimateur, importation, fichier):
+    """Résumés d'un seul fichier (exécutée dans un processus de travail)"""
+    body = list(importation.lignes_fichier(fichier))
+    return estimateur.calcule(Dataset(importation.entete(body), body))
+
 
 class Estimateur:
     """Classe Estimateur
@@ -10,8 +204,13 @@ class Estimateur:
 
     Attributes
     ----------
-    variable : str
-        Variable su laquelle on calcule les statistiques
+    variable : str ou list[str]
+        Variable(s) sur laquelle/lesquelles on calcule les statistiques
+    groupby : str ou list[str], optional
+        Variable(s) définissant des groupes sur lesquels calculer séparément
+        les statistiques, by default None
+    quantiles : bool, optional
+        True pour estimer aussi les quantiles (t-digest), by default False
 
     Examples
     --------
@@ -22,15 +221,176 @@ class Estimateur:
     17.0
     """
 
-    def __init__(self, variable):
+    def __init__(self, variable, groupby=None, quantiles=False):
         """" Constructeur
 
         Parameters
         ----------
-        variable : str
-            Variable sur laquelle on calcule les statistiques
+        variable : str ou list[str]
+            Variable(s) sur laquelle/lesquelles on calcule les statistiques
+        groupby : str ou list[str], optional
+            Variable(s) définissant les groupes, by default None
+        quantiles : bool, optional
+            True pour estimer aussi les quantiles, by default False
         """
+        if isinstance(groupby, str):
+            groupby = [groupby]
         self.__variable = variable
+        self.__groupby = groupby
+        self.__quantiles = quantiles
+
+    @property
+    def variables(self):
+        """Variables sur lesquelles on calcule les statistiques"""
+        if isinstance(self.__variable, str):
+            return [self.__variable]
+        return list(self.__variable)
+
+    def __valeurs(self, dataset, variable):
+        """Valeurs numériques d'une variable (None si manquante)"""
+        if isinstance(dataset, DatasetColonnes):
+            if variable not in dataset.header:
+                return [None] * len(dataset)
+            col = dataset.colonne(variable)
+            if col.type != 'str':
+                if col.nulls is None:
+                    return col.donnees
+                return [None if mq else val for val, mq in zip(col.donnees, col.nulls)]
+        valmq = set(VALMQ)
+        return [None if val in valmq else float(val) for val in dataset.valeurs(variable)]
+
+    def calcule(self, dataset):
+        """Calcul de toutes les statistiques en un seul parcours
+
+        Parameters
+        ----------
+        dataset : Dataset
+            Jeu de données comprenant la ou les variables
+
+        Returns
+        -------
+        dict
+            Résumé (Statistiques) de chaque variable ; si groupby est
+            renseigné, ces résumés pour chaque groupe (tuple des valeurs des
+            variables de regroupement, dans l'ordre d'apparition)
+
+        Examples
+        --------
+        >>> data = Dataset(['region', 't'], [{'region': 'Bretagne', 't': '280'}, {'region': 'Corse', 't': '290'}, {'region': 'Bretagne', 't': 'mq'}, {'region': 'Bretagne', 't': '284'}])
+        >>> res = Estimateur(['t'], groupby='region').calcule(data)
+        >>> {cle: (stats['t'].nombre, stats['t'].nb_nulls, stats['t'].moyenne) for cle, stats in res.items()}
+        {('Bretagne',): (2, 1, 282.0), ('Corse',): (1, 0, 290.0)}
+        """
+        variables = self.variables
+        colonnes = [self.__valeurs(dataset, var) for var in variables]
+        quantiles = self.__quantiles
+
+        if self.__groupby is None:
+            resumes = {var: Statistiques(quantiles) for var in variables}
+            for var, vals in zip(variables, colonnes):
+                ajoute = resumes[var].ajoute
+                for val in vals:
+                    ajoute(val)
+            return resumes
+
+        cles = zip(*[dataset.valeurs(var) for var in self.__groupby])
+        groupes = {}
+        for i, cle in enumerate(cles):
+            resumes = groupes.get(cle)
+            if resumes is None:
+                resumes = groupes[cle] = [Statistiques(quantiles) for _ in variables]
+            for resume, vals in zip(resumes, colonnes):
+                resume.ajoute(vals[i])
+        return {cle: dict(zip(variables, resumes)) for cle, resumes in groupes.items()}
+
+    def fusionne(self, premier, second):
+        """Fusion des résumés de deux parties disjointes d'un jeu de données
+
+        Parameters
+        ----------
+        premier : dict
+            Résultat de calcule sur une première partie (modifié)
+        second : dict
+            Résultat de calcule sur une seconde partie
+
+        Returns
+        -------
+        dict
+            Résumés de l'ensemble des deux parties
+        """
+        if self.__groupby is None:
+            for var, resume in second.items():
+                premier[var].fusionne(resume)
+            return premier
+        for cle, resumes in second.items():
+            if cle in premier:
+                for var, resume in resumes.items():
+                    premier[cle][var].fusionne(resume)
+            else:
+                premier[cle] = resumes
+        return premier
+
+    def calcule_lots(self, lots):
+        """Calcul des statistiques d'un jeu de données découpé en lots
+
+        Parameters
+        ----------
+        lots : iterable[Dataset]
+            Lots successifs (par exemple Importation.importe_lots)
+
+        Returns
+        -------
+        dict
+            Résumés de l'ensemble des lots (voir calcule)
+
+        Examples
+        --------
+        >>> from pipelinepackage.imports.importcsvgz import ImportCsvGz
+        >>> synop = ImportCsvGz('data/input/synop.202201.csv.gz', ';', ['t'])
+        >>> res = Estimateur('t').calcule_lots(synop.importe_lots(5000))['t']
+        >>> res.nombre, res.nb_nulls, round(res.moyenne, 3), res.min, res.max
+        (14285, 290, 282.675, 264.45, 306.55)
+        """
+        return self.__fusionne_tous(self.calcule(lot) for lot in lots)
+
+    def __fusionne_tous(self, resultats):
+        """Fusion de résultats successifs de calcule"""
+        resultat = None
+        for resumes in resultats:
+            resultat = resumes if resultat is None else self.fusionne(resultat, resumes)
+        if resultat is None:
+            resultat = self.calcule(Dataset(self.variables, []))
+        return resultat
+
+    def calcule_parallele(self, importation, nb_processus):
+        """Calcul des statistiques des fichiers d'une importation, un fichier par processus
+
+        Parameters
+        ----------
+        importation : Importation
+            Importation des fichiers (par exemple les partitions d'un dossier)
+        nb_processus : int
+            Nombre de processus de travail
+
+        Returns
+        -------
+        dict
+            Résumés de l'ensemble des fichiers (voir calcule)
+        """
+        fichiers = importation.fichiers(importation.extension)
+        if len(fichiers) < 2 or nb_processus < 2:
+            return self.__fusionne_tous(_calcule_fichier(self, importation, fichier)
+                                        for fichier in fichiers)
+        with ProcessPoolExecutor(max_workers=min(nb_processus, len(fichiers))) as executeur:
+            return self.__fusionne_tous(
+                executeur.map(_calcule_fichier, repeat(self), repeat(importation), fichiers))
+
+    def __resume(self, dataset):
+        """Résumé de la variable (ou de chaque variable)"""
+        resumes = Estimateur(self.__variable, quantiles=self.__quantiles).calcule(dataset)
+        if isinstance(self.__variable, str):
+            return resumes[self.__variable]
+        return resumes
 
     def moyenne(self, dataset):
         """Calcul de la moyenne
@@ -40,12 +400,12 @@ class Estimateur:
         Parameters
         ----------
         dataset : Dataset
-            Jeu de données comprenant la variable (sans valeurs manquantes)
+            Jeu de données comprenant la variable (les valeurs manquantes sont ignorées)
 
         Returns
         -------
-        dataset
-            Dataset
+        float
+            Moyenne arrondie au millième (une par variable si plusieurs variables)
 
         Examples
         --------
@@ -55,25 +415,26 @@ class Estimateur:
         >>> c.moyenne(data)
         17.0
         """
-        vals = [float(row.get(self.__variable)) for row in dataset.body
-                if row.get(self.__variable) is not None]
-        moy = sum(vals)/len(vals)
-        return round(moy, 3)
+        resume = self.__resume(dataset)
+        if isinstance(resume, dict):
+            return {var: round(res.moyenne, 3) for var, res in resume.items()}
+        return round(resume.moyenne, 3)
 
     def ecarttype(self, dataset):
         """Calcul de l'écart-type
 
-        Calcule l'écart-type pour la variable du jeu de données dataset
+        Calcule l'écart-type pour la variable du jeu de données dataset, en un
+        seul passage (sans calcul préalable de la moyenne)
 
         Parameters
         ----------
         dataset : Dataset
-            Jeu de données comprenant la variable (sans valeurs manquantes)
+            Jeu de données comprenant la variable (les valeurs manquantes sont ignorées)
 
         Returns
         -------
-        dataset
-            Dataset
+        float
+            Écart-type corrigé arrondi au millième (un par variable si plusieurs variables)
 
         Examples
         --------
@@ -83,10 +444,10 @@ class Estimateur:
         >>> c.ecarttype(data)
         7.118
         """
-        moy = self.moyenne(dataset)
-        ecart = [(float(row.get(self.__variable))-moy)
-                 ** 2 for row in dataset.body]
-        return round((sum(ecart)/(len(ecart)-1))**(1/2), 3)
+        resume = self.__resume(dataset)
+        if isinstance(resume, dict):
+            return {var: round(res.ecarttype, 3) for var, res in resume.items()}
+        return round(resume.ecarttype, 3)
 
 
 if __name__ == '__main__':
@@ -2,8 +2,56 @@
 module exportation
 
 Exporter un jeu de données selon un certain format.
+
+Le jeu de données peut être découpé en partitions (par exemple une par
+région ou par mois) : chaque partition est écrite dans un dossier cle=valeur,
+sans les variables de partition, que les importations partitionnées
+(partitionne=True) retrouvent à partir du nom des dossiers (voir
+Importation.constantes).
 """
+import copy
+import os
 from abc import ABC, abstractmethod
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from pipelinepackage.model.dataset import Dataset
+from pipelinepackage.model.datasetcolonnes import DatasetColonnes
+
+
+def verifie_variables(header, variables):
+    """Vérification qu'un lot n'apporte pas de variable absente des fichiers
+    déjà commencés
+
+    Parameters
+    ----------
+    header : list[str]
+        Variables écrites dans les fichiers
+    variables : list[str]
+        Variables du lot
+
+    Raises
+    ------
+    ValueError
+        Si le lot contient une variable absente de header
+
+    Examples
+    --------
+    >>> verifie_variables(['date', 't'], ['t'])
+    >>> verifie_variables(['date', 't'], ['date', 't', 'u'])
+    Traceback (most recent call last):
+    ...
+    ValueError: Variables absentes des lots précédents : u
+    """
+    nouvelles = [var for var in variables if var not in header]
+    if nouvelles:
+        raise ValueError("Variables absentes des lots précédents : " + ', '.join(nouvelles))
+
+
+def _ecrit_partition(exportation, fichier, dataset):
+    """Écriture d'une partition (exécutée dans un processus de travail)"""
+    exportation.ecrit(fichier, dataset)
+
 
 class Exportation(ABC):
     """Classe abstraite exportation
@@ -14,9 +62,20 @@ class Exportation(ABC):
         Dossier dans lequel sauvegarder le résultat, by default "data/output"
     filename : str, optional
         Nom du fichier résultat, by default "tableau.csv"
+    partitions : list, optional
+        Variables de partition : nom d'une variable, ou couple (nom, fonction)
+        où la fonction calcule la valeur à partir de l'observation,
+        by default None (un seul fichier)
+    nb_processus : int, optional
+        Nombre de processus écrivant les partitions en parallèle,
+        by default None (écriture séquentielle)
+    max_ouverts : int, optional
+        Nombre maximal de fichiers ouverts en même temps lors d'une
+        exportation par lots partitionnée, by default 32
     """
 
-    def __init__(self, chemin = "data/output", filename = "tableau"):
+    def __init__(self, chemin = "data/output", filename = "tableau", partitions=None,
+                 nb_processus=None, max_ouverts=32):
         """Constructeur
 
         Parameters
@@ -25,9 +84,19 @@ class Exportation(ABC):
             Dossier dans lequel sauvegarder le résultat, by default "data/output"
         filename : str, optional
             Nom du fichier résultat, by default "tableau"
+        partitions : list, optional
+            Variables de partition (nom ou couple (nom, fonction)),
+            by default None (un seul fichier)
+        nb_processus : int, optional
+            Nombre de processus écrivant en parallèle, by default None
+        max_ouverts : int, optional
+            Nombre maximal de fichiers ouverts en même temps, by default 32
         """
         self.__chemin = chemin
         self.__filename = filename
+        self.__partitions = partitions
+        self.__nb_processus = nb_processus
+        self.__max_ouverts = max_ouverts
 
     @property
     def chemin(self):
@@ -51,14 +120,255 @@ class Exportation(ABC):
         """
         return self.__filename
 
+    @property
+    def partitions(self):
+        """Getter pour l'attribut partitions
+
+        Returns
+        -------
+        list ou None
+            Variables de partition
+        """
+        return self.__partitions
+
+    @property
+    def nb_processus(self):
+        """Getter pour l'attribut nb_processus
+
+        Returns
+        -------
+        int ou None
+            Nombre de processus écrivant en parallèle
+        """
+        return self.__nb_processus
+
     @abstractmethod
+    def ecrit(self, fichier, dataset):
+        """Écriture du jeu de données dans un fichier
+
+        Parameters
+        ----------
+        fichier : str
+            Chemin du fichier à écrire
+        dataset : Dataset
+            Jeu de données à exporter
+        """
+
     def exporte(self, dataset):
         """Exportation du jeu de données
 
-        Exporte le jeu de données au chemin passé en paramètre.
+        Exporte le jeu de données au chemin passé en paramètre, dans un seul
+        fichier ou dans un fichier par partition.
 
         Parameters
         ----------
         dataset : Dataset
             Jeu de données à exporter
         """
+        if self.__partitions:
+            self.exporte_partitions(dataset)
+        else:
+            self.ecrit(os.path.join(self.__chemin, self.__filename), dataset)
+
+    def exporte_lots(self, lots):
+        """Exportation d'un jeu de données découpé en lots
+
+        Par défaut les lots sont rassemblés puis exportés en une fois. Pour une
+        exportation partitionnée dans un format permettant l'ajout (voir
+        ExportationAjout), chaque lot
+        est réparti entre les fichiers de ses partitions dès qu'il est reçu ;
+        au plus max_ouverts fichiers restent ouverts (les moins récemment
+        utilisés sont fermés, puis rouverts en ajout si besoin). Les variables
+        écrites sont celles du premier lot non vide (voir verifie_variables).
+
+        Parameters
+        ----------
+        lots : iterable[Dataset]
+            Lots successifs du jeu de données à exporter
+        """
+        if not self.__partitions or not isinstance(self, ExportationAjout):
+            self.exporte(Dataset.concatene(lots))
+            return
+        noms = self.__noms()
+        ouverts = OrderedDict()
+        crees = set()
+        header = None
+        try:
+            for lot in lots:
+                if not lot.body:
+                    continue
+                if header is None:
+                    header = [var for var in lot.header if var not in noms]
+                else:
+                    verifie_variables(header + noms, lot.header)
+                for cle, indices in self.__groupes(lot).items():
+                    fichier = self.fichier(cle)
+                    if fichier in ouverts:
+                        ouverts.move_to_end(fichier)
+                    else:
+                        if len(ouverts) >= self.__max_ouverts:
+                            ouverts.popitem(last=False)[1][0].close()
+                        nouveau = fichier not in crees
+                        if nouveau:
+                            os.makedirs(os.path.dirname(fichier), exist_ok=True)
+                            crees.add(fichier)
+                        ouverts[fichier] = self.ouvre(fichier, header, nouveau)
+                    body = lot.body
+                    ouverts[fichier][1].writerows(
+                        {var: val for var, val in body[i].items() if var not in noms}
+                        for i in indices)
+        finally:
+            for flux, _ in ouverts.values():
+                flux.close()
+
+    def __noms(self):
+        """Noms des variables de partition"""
+        return [part if isinstance(part, str) else part[0] for part in self.__partitions]
+
+    def __groupes(self, dataset):
+        """Indices des observations de chaque partition, dans l'ordre d'apparition
+
+        Si le jeu de données est décrit comme partitionné ou trié selon les
+        variables de partition (voir Dataset.groupe_contigu), chaque partition
+        est une suite de positions consécutives (range), trouvée sans
+        construire les observations.
+        """
+        noms = self.__noms()
+        if all(isinstance(part, str) for part in self.__partitions) and \
+                dataset.groupe_contigu(noms):
+            groupes = {}
+            debut = 0
+            cles = list(zip(*[dataset.valeurs(var) for var in noms]))
+            for i in range(1, len(cles) + 1):
+                if i == len(cles) or cles[i] != cles[debut]:
+                    groupes[cles[debut]] = range(debut, i)
+                    debut = i
+            return groupes
+
+        acces = [(lambda row, var=part: row.get(var)) if isinstance(part, str) else part[1]
+                 for part in self.__partitions]
+        groupes = {}
+        for i, row in enumerate(dataset.body):
+            cle = tuple(fonction(row) for fonction in acces)
+            groupe = groupes.get(cle)
+            if groupe is None:
+                groupe = groupes[cle] = []
+            groupe.append(i)
+        return groupes
+
+    def fichier(self, cle):
+        """Chemin du fichier d'une partition
+
+        Parameters
+        ----------
+        cle : tuple
+            Valeurs des variables de partition
+
+        Returns
+        -------
+        str
+            Chemin chemin/var1=val1/var2=val2/filename (une valeur manquante
+            est écrite 'mq')
+
+        Examples
+        --------
+        >>> from pipelinepackage.exports.exportcsv import ExportCsv
+        >>> ExportCsv('sortie', 'conso.csv', partitions=['region', 'mois']).fichier(('Bretagne', '2022-01'))
+        'sortie/region=Bretagne/mois=2022-01/conso.csv'
+        """
+        dossiers = [nom + '=' + ('mq' if val in (None, '') else str(val).replace(os.sep, '_'))
+                    for nom, val in zip(self.__noms(), cle)]
+        return os.path.join(self.__chemin, *dossiers, self.__filename)
+
+    def exporte_partitions(self, dataset):
+        """Exportation d'un fichier par partition
+
+        Les observations sont réparties en un seul passage, puis chaque
+        partition est écrite (par un processus de travail si nb_processus est
+        renseigné), sans les variables de partition.
+
+        Parameters
+        ----------
+        dataset : Dataset
+            Jeu de données à exporter
+
+        Examples
+        --------
+        >>> import tempfile
+        >>> from pipelinepackage.exports.exportcsv import ExportCsv
+        >>> from pipelinepackage.imports.importcsv import ImportCsv
+        >>> dossier = tempfile.TemporaryDirectory()
+        >>> data = Dataset(['region', 'date', 't'], [{'region': 'Bretagne', 'date': '2022-01-31', 't': '280'}, {'region': 'Corse', 'date': '2022-01-31', 't': '290'}, {'region': 'Bretagne', 'date': '2022-02-01', 't': '281'}])
+        >>> ExportCsv(dossier.name, 'temp.csv', partitions=['region', ('mois', lambda row: row['date'][:7])]).exporte(data)
+        >>> sorted(os.listdir(os.path.join(dossier.name, 'region=Bretagne')))
+        ['mois=2022-01', 'mois=2022-02']
+        >>> ImportCsv(os.path.join(dossier.name, 'region=Bretagne', 'mois=2022-02', 'temp.csv'), ';').importe().body
+        [{'date': '2022-02-01', 't': '281'}]
+        >>> ImportCsv(dossier.name, ';', ['region', 't'], partitionne=True).importe().body
+        [{'region': 'Bretagne', 't': '280'}, {'region': 'Bretagne', 't': '281'}, {'region': 'Corse', 't': '290'}]
+        >>> dossier.cleanup()
+        """
+        noms = self.__noms()
+        fichiers = []
+        morceaux = []
+        for cle, indices in self.__groupes(dataset).items():
+            fichiers.append(self.fichier(cle))
+            if isinstance(dataset, DatasetColonnes):
+                morceau = dataset.tranche(indices.start, indices.stop) \
+                    if isinstance(indices, range) else dataset.prend(indices)
+                morceaux.append(DatasetColonnes([col for col in morceau.colonnes
+                                                 if col.nom not in noms]))
+            else:
+                body = dataset.body
+                morceaux.append(Dataset(
+                    [var for var in dataset.header if var not in noms],
+                    [{var: val for var, val in body[i].items() if var not in noms}
+                     for i in indices]))
+        for fichier in fichiers:
+            os.makedirs(os.path.dirname(fichier), exist_ok=True)
+
+        if (self.__nb_processus or 1) < 2 or len(fichiers) < 2:
+            for fichier, morceau in zip(fichiers, morceaux):
+                self.ecrit(fichier, morceau)
+            return
+        # copie sans partition (les fonctions de partition ne sont pas transmises)
+        exportation = copy.copy(self)
+        exportation.__partitions = None
+        exportation.__nb_processus = None
+        with ProcessPoolExecutor(max_workers=min(self.__nb_processus,
+                                                 len(fichiers))) as executeur:
+            list(executeur.map(_ecrit_partition, repeat(exportation), fichiers, morceaux))
+
+
+
+class ExportationAjout(Exportation):
+    """Classe abstraite ExportationAjout
+
+    Exportation dans un format permettant de compléter un fichier déjà
+    écrit : une exportation par lots partitionnée écrit alors chaque lot dès
+    sa réception (voir Exportation.exporte_lots).
+    """
+
+    @abstractmethod
+    def ouvre(self, fichier, header, nouveau):
+        """Ouverture d'un fichier complété au fur et à mesure
+
+        Parameters
+        ----------
+        fichier : str
+            Chemin du fichier
+        header : list[str]
+            Variables écrites dans le fichier
+        nouveau : bool
+            True si le fichier doit être créé (sinon il est complété)
+
+        Returns
+        -------
+        tuple
+            Flux à fermer et objet dont la méthode writerows écrit des observations
+        """
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod(verbose=True)
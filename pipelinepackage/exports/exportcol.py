@@ -0,0 +1,139 @@
+"""
+module exportcol
+
+Exporter un jeu de données au format binaire par colonnes (.col)
+
+Les valeurs sont écrites typées (voir le module formatcolonnes) : la relecture
+par ImportCol n'a ni texte à découper ni conversion à refaire, et les
+statistiques de chaque groupe de lignes permettent de ne lire que les groupes
+utiles. Ce format convient aux résultats intermédiaires d'un traitement.
+
+Examples
+--------
+>>> c = ExportCol('data/output', 'tab.col', codec='lzma')
+"""
+from pipelinepackage.exports.exportation import Exportation
+from pipelinepackage.model.datasetcolonnes import DatasetColonnes
+from pipelinepackage.model.formatcolonnes import ecrit, CODECS
+
+
+class ExportCol(Exportation):
+    """Classe ExportCol
+
+    Modélise une exportation de fichier au format .col
+
+    Attributes
+    ----------
+    chemin : str, optional
+        Dossier dans lequel sauvegarder le résultat, by default "data/output"
+    filename : str, optional
+        Nom du fichier résultat, by default "tableau.col"
+    taille_groupe : int, optional
+        Nombre de lignes par groupe, by default 65536
+    codec : str, optional
+        Codec de compression ('aucun', 'zlib', 'bz2' ou 'lzma'), by default 'zlib'
+    codecs : dict, optional
+        Codec propre à certaines variables, by default None
+    types : dict, optional
+        Type de certaines variables ('int', 'float', 'date' ou 'str') pour un
+        jeu de données qui n'est pas déjà par colonnes, by default None (types déduits)
+    partitions : list, optional
+        Variables de partition (voir Exportation), by default None
+    nb_processus : int, optional
+        Nombre de processus écrivant les partitions en parallèle, by default None
+    """
+
+    def __init__(self, chemin="data/output", filename="tableau.col", taille_groupe=65536,
+                 codec='zlib', codecs=None, types=None, partitions=None, nb_processus=None):
+        """Constructeur
+
+        Parameters
+        ----------
+        chemin : str, optional
+            Dossier dans lequel sauvegarder le résultat, by default "data/output"
+        filename : str, optional
+            Nom du fichier résultat, by default "tableau.col"
+        taille_groupe : int, optional
+            Nombre de lignes par groupe, by default 65536
+        codec : str, optional
+            Codec de compression ('aucun', 'zlib', 'bz2' ou 'lzma'), by default 'zlib'
+        codecs : dict, optional
+            Codec propre à certaines variables, by default None
+        types : dict, optional
+            Type de certaines variables, by default None (types déduits)
+        partitions : list, optional
+            Variables de partition (voir Exportation), by default None
+        nb_processus : int, optional
+            Nombre de processus écrivant les partitions en parallèle, by default None
+        """
+        super().__init__(chemin, filename, partitions, nb_processus)
+        for nom in [codec] + list((codecs or {}).values()):
+            if nom not in CODECS:
+                raise ValueError("Codec inconnu : " + str(nom))
+        self.__taille_groupe = taille_groupe
+        self.__codec = codec
+        self.__codecs = codecs
+        self.__types = types
+
+    @property
+    def taille_groupe(self):
+        """Nombre de lignes par groupe"""
+        return self.__taille_groupe
+
+    @property
+    def codec(self):
+        """Codec de compression"""
+        return self.__codec
+
+    def exporte(self, dataset):
+        """Exporte le jeu de données
+
+        Le jeu de données est converti par colonnes une seule fois, pour que
+        toutes les partitions aient les mêmes types.
+
+        Parameters
+        ----------
+        dataset : Dataset
+            Jeu de données à exporter
+        """
+        if not isinstance(dataset, DatasetColonnes):
+            dataset = DatasetColonnes.depuis_dataset(dataset, self.__types)
+        super().exporte(dataset)
+
+    def ecrit(self, fichier, dataset):
+        """Écrit le jeu de données dans un fichier au format .col
+
+        Parameters
+        ----------
+        fichier : str
+            Chemin du fichier à écrire
+        dataset : Dataset
+            Jeu de données à exporter
+
+        Examples
+        --------
+        >>> import os, tempfile
+        >>> from pipelinepackage.imports.importcsvgz import ImportCsvGz
+        >>> from pipelinepackage.imports.importcol import ImportCol
+        >>> dossier = tempfile.TemporaryDirectory()
+        >>> synop = ImportCsvGz('data/input/synop.202201.csv.gz', ';').importe()
+        >>> ExportCol(dossier.name, 'synop.col', types={'numer_sta': 'str'}).exporte(synop)
+        >>> relu = ImportCol(os.path.join(dossier.name, 'synop.col')).importe()
+        >>> len(relu), relu.valeurs('numer_sta')[:2], relu.colonne('t').type
+        (14575, ['07005', '07015'], 'float')
+
+        Un fichier par station, relu avec la station en variable de partition
+        >>> ExportCol(os.path.join(dossier.name, 'stations'), 'synop.col', types={'numer_sta': 'str'}, partitions=['numer_sta']).exporte(synop)
+        >>> relu = ImportCol(os.path.join(dossier.name, 'stations'), ['numer_sta', 't'], partitionne=True).importe()
+        >>> len(relu), relu.colonne('t').type
+        (14575, 'float')
+        >>> dossier.cleanup()
+        """
+        if not isinstance(dataset, DatasetColonnes):
+            dataset = DatasetColonnes.depuis_dataset(dataset, self.__types)
+        ecrit(fichier, dataset, self.__taille_groupe, self.__codec, self.__codecs)
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod(verbose=True)
@@ -9,10 +9,10 @@ Examples
 """
 import csv
 import os
-from pipelinepackage.exports.exportation import Exportation
+from pipelinepackage.exports.exportation import ExportationAjout, verifie_variables
 
 
-class ExportCsv(Exportation):
+class ExportCsv(ExportationAjout):
     """Classe ExportCsv
 
     Modélise une exportation de fichier au format .csv
@@ -25,13 +25,20 @@ class ExportCsv(Exportation):
         Nom du fichier résultat, by default "tableau.csv"
     sep : str, optional
         Séparateur à utiliser, by default ';'
+    partitions : list, optional
+        Variables de partition (voir Exportation), by default None
+    nb_processus : int, optional
+        Nombre de processus écrivant les partitions en parallèle, by default None
+    max_ouverts : int, optional
+        Nombre maximal de fichiers ouverts en même temps, by default 32
 
     Examples
     --------
     >>> c=ExportCsv('data/output',sep=',')
     """
 
-    def __init__(self, chemin="data/output", filename="tableau.csv", sep=";"):
+    def __init__(self, chemin="data/output", filename="tableau.csv", sep=";", partitions=None,
+                 nb_processus=None, max_ouverts=32):
         """Constructeur
 
         Parameters
@@ -42,17 +49,23 @@ class ExportCsv(Exportation):
             Nom du fichier résultat, by default "tableau.csv"
         sep : str, optional
             Séparateur à utiliser, by default ";"
+        partitions : list, optional
+            Variables de partition (voir Exportation), by default None
+        nb_processus : int, optional
+            Nombre de processus écrivant les partitions en parallèle, by default None
+        max_ouverts : int, optional
+            Nombre maximal de fichiers ouverts en même temps, by default 32
         """
-        super().__init__(chemin, filename)
+        super().__init__(chemin, filename, partitions, nb_processus, max_ouverts)
         self.__sep = sep
 
-    def exporte(self, dataset):
-        """Exporte le jeu de données
-
-        Exporte le jeu de données dataset passé en paramètre au format .csv
+    def ecrit(self, fichier, dataset):
+        """Écrit le jeu de données dans un fichier au format .csv
 
         Parameters
         ----------
+        fichier : str
+            Chemin du fichier à écrire
         dataset : Dataset
             Jeu de données à exporter
 
@@ -60,13 +73,85 @@ class ExportCsv(Exportation):
         --------
         >>> c=ExportCsv('data/output', 'tab.csv', ',')
         """
-        with open(os.path.join(self.chemin, self.filename),
-                  'wt', encoding='UTF8', newline='') as csvfile:
+        with open(fichier, 'wt', encoding='UTF8', newline='') as csvfile:
             writer = csv.DictWriter(
                 csvfile, delimiter=self.__sep, fieldnames=dataset.header)
             writer.writeheader()
             writer.writerows(dataset.body)
 
+    def exporte_lots(self, lots):
+        """Exporte le jeu de données lot par lot
+
+        Chaque lot est écrit dans le fichier dès qu'il est reçu. Les variables
+        sont celles du premier lot non vide : un lot suivant ne peut pas en
+        apporter de nouvelles.
+
+        Parameters
+        ----------
+        lots : iterable[Dataset]
+            Lots successifs du jeu de données à exporter
+
+        Raises
+        ------
+        ValueError
+            Si un lot contient une variable absente du premier lot non vide
+
+        Examples
+        --------
+        >>> import tempfile
+        >>> from pipelinepackage.imports.importcsv import ImportCsv
+        >>> from pipelinepackage.imports.importcsvgz import ImportCsvGz
+        >>> dossier = tempfile.TemporaryDirectory()
+        >>> c = ExportCsv(dossier.name, 'lots.csv')
+        >>> c.exporte_lots(ImportCsvGz('data/input/synop.202201.csv.gz', ';').importe_lots(5000))
+        >>> len(ImportCsv(os.path.join(dossier.name, 'lots.csv'), ';').importe().body)
+        14575
+
+        Un fichier par station, au plus 10 fichiers ouverts en même temps
+        >>> c = ExportCsv(os.path.join(dossier.name, 'stations'), 'synop.csv', partitions=['numer_sta'], max_ouverts=10)
+        >>> c.exporte_lots(ImportCsvGz('data/input/synop.202201.csv.gz', ';').importe_lots(5000))
+        >>> len(ImportCsv(os.path.join(dossier.name, 'stations'), ';', partitionne=True).importe().body)
+        14575
+
+        Une variable apparaissant dans un lot suivant n'est pas ignorée
+        >>> from pipelinepackage.model.dataset import Dataset
+        >>> lots = [Dataset(['t'], [{'t': '280'}]), Dataset(['t', 'u'], [{'t': '281', 'u': '90'}])]
+        >>> ExportCsv(dossier.name, 'lots.csv').exporte_lots(lots)
+        Traceback (most recent call last):
+        ...
+        ValueError: Variables absentes des lots précédents : u
+        >>> dossier.cleanup()
+        """
+        if self.partitions:
+            super().exporte_lots(lots)
+            return
+        with open(os.path.join(self.chemin, self.filename),
+                  'wt', encoding='UTF8', newline='') as csvfile:
+            writer = None
+            header = []
+            for lot in lots:
+                if writer is None:
+                    header = lot.header
+                    if not lot.body:
+                        continue
+                    writer = csv.DictWriter(
+                        csvfile, delimiter=self.__sep, fieldnames=header)
+                    writer.writeheader()
+                elif lot.body:
+                    verifie_variables(header, lot.header)
+                writer.writerows(lot.body)
+            if writer is None:
+                csv.DictWriter(csvfile, delimiter=self.__sep,
+                               fieldnames=header).writeheader()
+
+    def ouvre(self, fichier, header, nouveau):
+        """Ouverture d'un fichier complété au fur et à mesure (voir ExportationAjout.ouvre)"""
+        csvfile = open(fichier, 'wt' if nouveau else 'at', encoding='UTF8', newline='')
+        writer = csv.DictWriter(csvfile, delimiter=self.__sep, fieldnames=header)
+        if nouveau:
+            writer.writeheader()
+        return csvfile, writer
+
 
 if __name__ == '__main__':
     import doctest
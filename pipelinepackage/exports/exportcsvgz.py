@@ -6,14 +6,46 @@ Exporter un jeu de données au format .csv.gz
 Examples
 --------
 >>> c=ExportCsvGz('data/output')
+
+Le fichier peut être écrit par plusieurs processus : les observations sont
+découpées en blocs, chaque bloc est mis en forme et compressé par un processus
+de travail, et les blocs compressés sont écrits à la suite dans l'ordre. Un
+fichier gzip (comme bz2 ou xz) formé de plusieurs membres concaténés reste un
+fichier valide, lu d'un seul tenant par ImportCsvGz.
 """
+import bz2
 import gzip
 import csv
+import io
+import lzma
 import os
-from pipelinepackage.exports.exportation import Exportation
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain
+from pipelinepackage.exports.exportation import ExportationAjout, verifie_variables
+
+# ouverture d'un flux compressé et compression d'un bloc pour chaque codec
+# ('zlib' désigne la compression deflate de zlib, enveloppée au format gzip)
+CODECS = {'gzip': (lambda f, mode, niveau: gzip.open(f, mode, compresslevel=niveau),
+                   lambda octets, niveau: gzip.compress(octets, compresslevel=niveau, mtime=0)),
+          'bz2': (lambda f, mode, niveau: bz2.open(f, mode, compresslevel=niveau),
+                  lambda octets, niveau: bz2.compress(octets, compresslevel=niveau)),
+          'lzma': (lambda f, mode, niveau: lzma.open(f, mode, preset=niveau),
+                   lambda octets, niveau: lzma.compress(octets, preset=niveau))}
+CODECS['zlib'] = CODECS['gzip']
+
+# niveau de compression par défaut de chaque codec
+NIVEAUX = {'gzip': 9, 'zlib': 9, 'bz2': 9, 'lzma': 6}
+
 
+def _compresse_bloc(codec, niveau, sep, lignes):
+    """Mise en forme et compression d'un bloc de lignes (exécutée dans un processus de travail)"""
+    texte = io.StringIO()
+    csv.writer(texte, delimiter=sep).writerows(lignes)
+    return CODECS[codec][1](texte.getvalue().encode('UTF8'), niveau)
 
-class ExportCsvGz(Exportation):
+
+class ExportCsvGz(ExportationAjout):
     """Classe ExportCsvGz
 
     Modélise une exportation de fichier
@@ -26,13 +58,28 @@ class ExportCsvGz(Exportation):
         Nom du fichier résultat, by default "tableau.csv.gz"
     sep : str, optional
         Séparateur à utiliser, by default ';'
+    niveau : int, optional
+        Niveau de compression, by default None (9, ou 6 pour 'lzma')
+    nb_processus : int, optional
+        Nombre de processus compressant les blocs en parallèle,
+        by default None (compression séquentielle)
+    taille_bloc : int, optional
+        Nombre d'observations par bloc compressé en parallèle, by default 20000
+    codec : str, optional
+        Compression utilisée : 'gzip' (ou 'zlib'), 'bz2' ou 'lzma', by default 'gzip'
+    partitions : list, optional
+        Variables de partition (voir Exportation), by default None
+    max_ouverts : int, optional
+        Nombre maximal de fichiers ouverts en même temps, by default 32
 
     Examples
     --------
     >>> c=ExportCsvGz('data/output', sep=';')
     """
 
-    def __init__(self, chemin="data/output", filename="tableau.csv.gz", sep=";"):
+    def __init__(self, chemin="data/output", filename="tableau.csv.gz", sep=";", niveau=None,
+                 nb_processus=None, taille_bloc=20000, codec='gzip', partitions=None,
+                 max_ouverts=32):
         """Constructeur
 
         Parameters
@@ -43,31 +90,172 @@ class ExportCsvGz(Exportation):
             Nom du fichier résultat, by default "tableau.csv.gz"
         sep : str, optional
             Séparateur à utiliser, by default ";"
+        niveau : int, optional
+            Niveau de compression, by default None (9, ou 6 pour 'lzma')
+        nb_processus : int, optional
+            Nombre de processus compressant les blocs en parallèle,
+            by default None (compression séquentielle)
+        taille_bloc : int, optional
+            Nombre d'observations par bloc compressé en parallèle, by default 20000
+        codec : str, optional
+            Compression utilisée : 'gzip' (ou 'zlib'), 'bz2' ou 'lzma', by default 'gzip'
+        partitions : list, optional
+            Variables de partition (voir Exportation), by default None ; les
+            partitions sont alors écrites en parallèle par nb_processus processus
+        max_ouverts : int, optional
+            Nombre maximal de fichiers ouverts en même temps, by default 32
         """
-        super().__init__(chemin, filename)
+        super().__init__(chemin, filename, partitions, nb_processus, max_ouverts)
+        if codec not in CODECS:
+            raise ValueError("Codec inconnu : " + str(codec))
         self.__sep = sep
+        self.__niveau = NIVEAUX[codec] if niveau is None else niveau
+        self.__taille_bloc = taille_bloc
+        self.__codec = codec
+
+    @property
+    def codec(self):
+        """Compression utilisée"""
+        return self.__codec
+
+    def __ouvre(self, fichier, mode='wb'):
+        """Flux texte compressé vers un fichier"""
+        flux = CODECS[self.__codec][0](fichier, mode, self.__niveau)
+        return io.TextIOWrapper(flux, encoding='UTF8', newline='')
 
-    def exporte(self, dataset):
-        """Exporte le jeu de données
+    def __blocs(self, header, lots):
+        """Découpage des observations des lots en blocs de lignes (listes de valeurs)"""
+        bloc = []
+        for lot in lots:
+            if lot.body:
+                verifie_variables(header, lot.header)
+            for row in lot.body:
+                bloc.append([row.get(var) for var in header])
+                if len(bloc) == self.__taille_bloc:
+                    yield bloc
+                    bloc = []
+        if bloc:
+            yield bloc
 
-        Exporte le jeu de données dataset passé en paramètre au format .csv.gz
+    def __ecrit_parallele(self, fichier, header, lots):
+        """Écriture de blocs compressés en parallèle, à la suite et dans l'ordre
+
+        Au plus deux blocs par processus sont en cours à un instant donné.
+        """
+        codec, niveau, sep = self.__codec, self.__niveau, self.__sep
+        with open(fichier, 'wb') as sortie, \
+                ProcessPoolExecutor(max_workers=self.nb_processus) as executeur:
+            sortie.write(_compresse_bloc(codec, niveau, sep, [header]))
+            en_cours = deque()
+            for bloc in self.__blocs(header, lots):
+                en_cours.append(executeur.submit(_compresse_bloc, codec, niveau, sep, bloc))
+                if len(en_cours) >= 2*self.nb_processus:
+                    sortie.write(en_cours.popleft().result())
+            while en_cours:
+                sortie.write(en_cours.popleft().result())
+
+    def ecrit(self, fichier, dataset):
+        """Écrit le jeu de données dans un fichier au format .csv.gz
 
         Parameters
         ----------
+        fichier : str
+            Chemin du fichier à écrire
         dataset : Dataset
             Jeu de données à exporter
 
         Examples
         --------
         >>> c=ExportCsvGz('data/output', 'tab.csv.gz', ';')
+
+        Compression en parallèle par blocs de 5000 observations
+        >>> import tempfile
+        >>> from pipelinepackage.imports.importcsvgz import ImportCsvGz
+        >>> dossier = tempfile.TemporaryDirectory()
+        >>> synop = ImportCsvGz('data/input/synop.202201.csv.gz', ';').importe()
+        >>> ExportCsvGz(dossier.name, 'par.csv.gz', nb_processus=2, taille_bloc=5000).exporte(synop)
+        >>> ImportCsvGz(os.path.join(dossier.name, 'par.csv.gz'), ';').importe().body == synop.body
+        True
+        >>> dossier.cleanup()
         """
-        with gzip.open(os.path.join(self.chemin, self.filename),
-                       'wt', encoding='UTF8', newline='') as csvgzfile:
+        if self.nb_processus is not None:
+            self.__ecrit_parallele(fichier, dataset.header, [dataset])
+            return
+        with self.__ouvre(fichier) as csvgzfile:
             writer = csv.DictWriter(
                 csvgzfile, delimiter=self.__sep, fieldnames=dataset.header)
             writer.writeheader()
             writer.writerows(dataset.body)
 
+    def exporte_lots(self, lots):
+        """Exporte le jeu de données lot par lot
+
+        Chaque lot est écrit dans le fichier dès qu'il est reçu. Les variables
+        sont celles du premier lot non vide : un lot suivant ne peut pas en
+        apporter de nouvelles.
+
+        Parameters
+        ----------
+        lots : iterable[Dataset]
+            Lots successifs du jeu de données à exporter
+
+        Raises
+        ------
+        ValueError
+            Si un lot contient une variable absente du premier lot non vide
+
+        Examples
+        --------
+        >>> import tempfile
+        >>> from pipelinepackage.imports.importcsvgz import ImportCsvGz
+        >>> dossier = tempfile.TemporaryDirectory()
+        >>> c = ExportCsvGz(dossier.name, 'lots.csv.gz')
+        >>> c.exporte_lots(ImportCsvGz('data/input/synop.202201.csv.gz', ';').importe_lots(5000))
+        >>> len(ImportCsvGz(os.path.join(dossier.name, 'lots.csv.gz'), ';').importe().body)
+        14575
+        >>> dossier.cleanup()
+        """
+        if self.partitions:
+            super().exporte_lots(lots)
+            return
+        fichier = os.path.join(self.chemin, self.filename)
+        if self.nb_processus is not None:
+            lots = iter(lots)
+            premier = next((lot for lot in lots if lot.body), None)
+            if premier is None:
+                self.__ecrit_parallele(fichier, [], [])
+            else:
+                self.__ecrit_parallele(fichier, premier.header, chain([premier], lots))
+            return
+        with self.__ouvre(fichier) as csvgzfile:
+            writer = None
+            header = []
+            for lot in lots:
+                if writer is None:
+                    header = lot.header
+                    if not lot.body:
+                        continue
+                    writer = csv.DictWriter(
+                        csvgzfile, delimiter=self.__sep, fieldnames=header)
+                    writer.writeheader()
+                elif lot.body:
+                    verifie_variables(header, lot.header)
+                writer.writerows(lot.body)
+            if writer is None:
+                csv.DictWriter(csvgzfile, delimiter=self.__sep,
+                               fieldnames=header).writeheader()
+
+    def ouvre(self, fichier, header, nouveau):
+        """Ouverture d'un fichier complété au fur et à mesure (voir ExportationAjout.ouvre)
+
+        Un fichier rouvert est complété par un nouveau membre compressé.
+        """
+        csvgzfile = self.__ouvre(fichier, 'wb' if nouveau else 'ab')
+        writer = csv.DictWriter(csvgzfile, delimiter=self.__sep, fieldnames=header)
+        if nouveau:
+            writer.writeheader()
+        return csvgzfile, writer
+
 
 if __name__ == '__main__':
     import doctest
@@ -1,7 +1,45 @@
 """module Importation
 
 """
+import copy
+import os
+import re
 from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice, repeat
+from operator import itemgetter
+from pipelinepackage.model.dataset import Dataset
+from pipelinepackage.model.datasetmorcele import DatasetMorcele
+from pipelinepackage.model.predicat import Et
+
+
+# année et mois dans un nom de fichier (synop.202201.csv.gz, 2022-01.json.gz)
+_RE_MOIS = re.compile(r'(?<![0-9])([0-9]{4})-?(0[1-9]|1[0-2])(?![0-9])')
+
+# plus grand décalage horaire par rapport à UTC : la période d'un fichier est
+# donnée en heure locale, les dates avec décalage sont comparées en UTC
+_DECALAGE_MAX = timedelta(hours=14)
+
+
+def _periode(annee, mois=None):
+    """Première et dernière seconde d'une année ou d'un mois, élargies du
+    plus grand décalage horaire (les dates des observations peuvent être en
+    heure locale)"""
+    annee = int(annee)
+    if mois is None:
+        debut, suivant = datetime(annee, 1, 1), datetime(annee+1, 1, 1)
+    else:
+        mois = int(mois)
+        debut = datetime(annee, mois, 1)
+        suivant = datetime(annee + mois // 12, mois % 12 + 1, 1)
+    return debut - _DECALAGE_MAX, suivant - timedelta(seconds=1) + _DECALAGE_MAX
+
+
+def _importe_fichier(importation, fichier):
+    """Importation d'un seul fichier (exécutée dans un processus de travail)"""
+    body = list(importation.lignes_fichier(fichier))
+    return Dataset(importation.entete(body), body)
 
 
 class Importation(ABC):
@@ -13,17 +51,60 @@ class Importation(ABC):
     ----------
     chemin : str
         Chemin vers le fichier ou le dossier de fichiers à importer
+    variables : list[str], optional
+        Variables à importer, by default None (toutes les variables)
+    filtre : Predicat, optional
+        Condition que doivent vérifier les observations importées,
+        by default None (toutes les observations)
+    nb_processus : int, optional
+        Nombre de processus lisant en parallèle les fichiers d'un dossier,
+        by default None (lecture séquentielle)
+    vardate : str, optional
+        Variable de date décrite par les noms des fichiers ou des dossiers
+        (voir partition), by default None
+    partitionne : bool, optional
+        Vrai si le dossier est partitionné : ses sous-dossiers cle=valeur
+        sont parcourus et leurs variables ajoutées aux observations (voir
+        constantes), by default False (seuls les fichiers du dossier sont lus)
+    elagage : Predicat, optional
+        Condition servant uniquement à écarter des fichiers sans les lire,
+        by default None
+    extension : str
+        Extension des fichiers lus par l'importation (attribut de classe)
     """
 
-    def __init__(self, chemin):
+    extension = None
+
+    def __init__(self, chemin, variables=None, filtre=None, nb_processus=None,
+                 vardate=None, partitionne=False):
         """Constructeur de la classe Importation
 
         Parameters
         ----------
         chemin : str
             Chemin vers le fichier ou le dossier de fichiers à importer
+        variables : list[str], optional
+            Variables à importer, by default None (toutes les variables)
+        filtre : Predicat, optional
+            Condition que doivent vérifier les observations importées,
+            by default None (toutes les observations)
+        nb_processus : int, optional
+            Nombre de processus lisant en parallèle les fichiers d'un dossier,
+            by default None (lecture séquentielle)
+        vardate : str, optional
+            Variable de date décrite par les noms des fichiers ou des dossiers
+            (voir partition), by default None
+        partitionne : bool, optional
+            Vrai si les sous-dossiers cle=valeur du dossier doivent être
+            parcourus, by default False
         """
         self.__chemin = chemin
+        self.__variables = variables
+        self.__filtre = filtre
+        self.__nb_processus = nb_processus
+        self.__vardate = vardate
+        self.__partitionne = partitionne
+        self.__elagage = None
 
     @abstractmethod
     def importe(self):
@@ -35,6 +116,431 @@ class Importation(ABC):
             Chemin vers le fichier ou le dossier de fichiers à importer
         """
 
+    @abstractmethod
+    def lignes_fichier(self, fichier):
+        """Parcourir les observations d'un fichier une à une
+
+        Parameters
+        ----------
+        fichier : str
+            Chemin vers le fichier
+
+        Returns
+        -------
+        generator[dict]
+            Observations lues au fur et à mesure dans le fichier
+        """
+
+    def lignes(self):
+        """Parcourir les observations du jeu de données une à une
+
+        Returns
+        -------
+        generator[dict]
+            Observations lues au fur et à mesure dans le(s) fichier(s)
+        """
+        for fichier in self.fichiers(self.extension):
+            yield from self.lignes_fichier(fichier)
+
+    def importe_parallele(self):
+        """Importe les fichiers d'un dossier dans plusieurs processus
+
+        Chaque fichier est lu (décompression, découpage, filtre et projection)
+        par un processus de travail ; le filtre est compilé dans le processus
+        qui l'utilise. Les morceaux sont rassemblés dans l'ordre des fichiers,
+        sans copie des observations.
+
+        Returns
+        -------
+        Dataset
+            Jeu de données importé (un DatasetMorcele, un morceau par fichier)
+        """
+        fichiers = self.fichiers(self.extension)
+        if len(fichiers) < 2 or (self.__nb_processus or 1) < 2:
+            morceaux = [_importe_fichier(self, fichier) for fichier in fichiers]
+        else:
+            with ProcessPoolExecutor(max_workers=min(self.__nb_processus,
+                                                     len(fichiers))) as executeur:
+                morceaux = list(executeur.map(_importe_fichier, repeat(self), fichiers))
+        return DatasetMorcele(morceaux)
+
+    def entete(self, body):
+        """Variables d'un ensemble d'observations importées
+
+        Parameters
+        ----------
+        body : list[dict]
+            Observations importées
+
+        Returns
+        -------
+        list[str]
+            Variables du jeu de données
+        """
+        if not body:
+            return []
+        return list(body[0])
+
+    def importe_lots(self, taille_lot):
+        """Importe un jeu de données par lots
+
+        Les observations sont lues au fur et à mesure : seul le lot courant
+        est conservé en mémoire.
+
+        Parameters
+        ----------
+        taille_lot : int
+            Nombre maximal d'observations par lot
+
+        Returns
+        -------
+        generator[Dataset]
+            Lots successifs du jeu de données
+        """
+        lignes = self.lignes()
+        while True:
+            body = list(islice(lignes, taille_lot))
+            if not body:
+                return
+            yield Dataset(self.entete(body), body)
+
+    def fichiers(self, extension):
+        """Liste des fichiers à importer
+
+        Les sous-dossiers (partitions au format cle=valeur) ne sont parcourus
+        que si l'importation est partitionnée. Les fichiers dont la partition ne peut vérifier ni le filtre ni la
+        condition d'élagage sont écartés sans être ouverts.
+
+        Parameters
+        ----------
+        extension : str
+            Extension des fichiers à importer (par exemple ".csv.gz")
+
+        Returns
+        -------
+        list[str]
+            Chemins des fichiers, dans l'ordre alphabétique pour un dossier
+        """
+        if os.path.isfile(self.chemin):
+            lfiles = [self.chemin]
+        elif not self.__partitionne:
+            lfiles = sorted(os.path.join(self.chemin, nom) for nom in os.listdir(self.chemin))
+        else:
+            lfiles = []
+            for dossier, sousdossiers, noms in os.walk(self.chemin):
+                sousdossiers.sort()
+                lfiles.extend(os.path.join(dossier, nom) for nom in sorted(noms))
+            lfiles.sort()
+        lfiles = [file for file in lfiles if file.endswith(extension)]
+
+        predicats = [pred for pred in (self.__filtre, self.__elagage) if pred is not None]
+        if predicats:
+            lfiles = [file for file in lfiles
+                      if all(pred.peut_correspondre(self.partition(file)) for pred in predicats)]
+        return lfiles
+
+    def estime_lignes(self):
+        """Nombre estimé d'observations importées
+
+        Seul le plus petit des fichiers retenus est lu (filtre compris) ; le
+        nombre d'observations des autres fichiers est déduit de leur taille.
+
+        Returns
+        -------
+        float
+            Nombre estimé d'observations (exact pour un seul fichier)
+
+        Examples
+        --------
+        >>> from pipelinepackage.imports.importcsvgz import ImportCsvGz
+        >>> ImportCsvGz('data/input/synop.202201.csv.gz', ';').estime_lignes()
+        14575
+        """
+        fichiers = self.fichiers(self.extension)
+        if not fichiers:
+            return 0
+        tailles = [os.path.getsize(fichier) for fichier in fichiers]
+        plus_petit = min(range(len(fichiers)), key=tailles.__getitem__)
+        nombre = sum(1 for _ in self.lignes_fichier(fichiers[plus_petit]))
+        if len(fichiers) == 1:
+            return nombre
+        return nombre * sum(tailles) / max(tailles[plus_petit], 1)
+
+    def constantes(self, fichier):
+        """Variables fixées par les dossiers d'un fichier (partitions cle=valeur)
+
+        Aucune si l'importation n'est pas partitionnée.
+
+        Parameters
+        ----------
+        fichier : str
+            Chemin vers le fichier
+
+        Returns
+        -------
+        dict
+            Valeur de chaque variable de partition
+
+        Examples
+        --------
+        >>> from pipelinepackage.imports.importcsv import ImportCsv
+        >>> ImportCsv('archive', ';', partitionne=True).constantes('archive/region=Bretagne/mois=2022-01/part.csv')
+        {'region': 'Bretagne', 'mois': '2022-01'}
+        >>> ImportCsv('archive', ';').constantes('archive/region=Bretagne/mois=2022-01/part.csv')
+        {}
+        """
+        if not self.__partitionne or os.path.isfile(self.chemin):
+            return {}
+        dossiers = os.path.relpath(fichier, self.chemin).split(os.sep)[:-1]
+        return dict(part.split('=', 1) for part in dossiers if '=' in part)
+
+    def partition(self, fichier):
+        """Valeurs extrêmes connues des variables d'un fichier
+
+        Les variables des dossiers cle=valeur n'ont qu'une valeur. La période
+        couverte par le fichier, donnée par des dossiers annee=/year= et
+        mois=/month= ou à défaut par une date YYYYMM ou YYYY-MM dans le nom du
+        fichier, borne la variable vardate. Elle est élargie de 14 heures de
+        part et d'autre : un fichier de janvier peut contenir
+        2022-01-01T00:00:00+01:00, soit le 31 décembre à 23h UTC.
+
+        Parameters
+        ----------
+        fichier : str
+            Chemin vers le fichier
+
+        Returns
+        -------
+        dict
+            Valeurs minimale et maximale (min, max) de certaines variables
+
+        Examples
+        --------
+        >>> from pipelinepackage.imports.importcsvgz import ImportCsvGz
+        >>> ImportCsvGz('data/input', ';', vardate='date').partition('data/input/synop.202202.csv.gz')
+        {'date': (datetime.datetime(2022, 1, 31, 10, 0), datetime.datetime(2022, 3, 1, 13, 59, 59))}
+
+        Les premières heures du mois, en heure locale, sont en UTC dans le mois
+        précédent : le fichier n'est pas écarté
+
+        >>> from pipelinepackage.imports.importjsongz import ImportJsonGz
+        >>> from pipelinepackage.transformations.fenetrage import Fenetrage
+        >>> fenetre = Fenetrage('2021-12-31 23:00:00', '2021-12-31 23:30:00', 'date_heure')
+        >>> ImportJsonGz('data/input', vardate='date_heure').elague(fenetre.predicat).fichiers('.json.gz')
+        ['data/input/2022-01.json.gz']
+        >>> ImportJsonGz('data/input', vardate='date_heure').elague(Fenetrage('2021-12-01', '2021-12-30', 'date_heure').predicat).fichiers('.json.gz')
+        []
+        """
+        constantes = self.constantes(fichier)
+        bornes = {var: (val, val) for var, val in constantes.items()}
+        if self.__vardate is None:
+            return bornes
+
+        annee = constantes.get('annee', constantes.get('year'))
+        mois = constantes.get('mois', constantes.get('month'))
+        periode = None
+        if mois is not None and _RE_MOIS.fullmatch(mois):
+            periode = _periode(*_RE_MOIS.fullmatch(mois).groups())
+        elif annee is not None and annee.isdigit():
+            periode = _periode(annee, mois if mois is not None and mois.isdigit() else None)
+        else:
+            trouve = _RE_MOIS.search(os.path.basename(fichier))
+            if trouve:
+                periode = _periode(*trouve.groups())
+        if periode is not None:
+            bornes[self.__vardate] = periode
+        return bornes
+
+    def elague(self, predicat):
+        """Importation limitée aux fichiers pouvant vérifier une condition
+
+        Contrairement à selection, les observations des fichiers lus ne sont
+        pas filtrées : la condition sert seulement à ne pas ouvrir les
+        fichiers dont la partition (voir partition) ne peut pas la vérifier.
+
+        Parameters
+        ----------
+        predicat : Predicat
+            Condition portant sur les observations
+
+        Returns
+        -------
+        Importation
+            Copie de l'importation
+        """
+        if self.__elagage is not None:
+            predicat = Et([self.__elagage, predicat])
+        importation = copy.copy(self)
+        importation.__elagage = predicat
+        return importation
+
+    def projection(self, variables):
+        """Importation limitée à certaines variables
+
+        Les autres variables ne sont jamais construites lors de la lecture.
+
+        Parameters
+        ----------
+        variables : list[str]
+            Variables à importer
+
+        Returns
+        -------
+        Importation
+            Copie de l'importation ne lisant que les variables demandées
+            (parmi celles déjà retenues le cas échéant)
+        """
+        if self.__variables is not None:
+            variables = [var for var in variables if var in self.__variables]
+        importation = copy.copy(self)
+        importation.__variables = list(variables)
+        return importation
+
+    def selection(self, predicat):
+        """Importation limitée aux observations vérifiant une condition
+
+        Les observations rejetées ne sont jamais construites lors de la lecture.
+
+        Parameters
+        ----------
+        predicat : Predicat
+            Condition que doivent vérifier les observations importées
+
+        Returns
+        -------
+        Importation
+            Copie de l'importation ne lisant que les observations retenues
+            (qui doivent aussi vérifier le filtre déjà présent le cas échéant)
+        """
+        if self.__filtre is not None:
+            predicat = Et([self.__filtre, predicat])
+        importation = copy.copy(self)
+        importation.__filtre = predicat
+        return importation
+
+    def projette_lignes(self, reader, constantes=None):
+        """Lecture des observations et variables retenues dans des lignes découpées
+
+        Le filtre est évalué directement sur la ligne découpée : seules les
+        observations retenues sont converties en dictionnaires.
+
+        Parameters
+        ----------
+        reader : iterable[list[str]]
+            Lignes découpées (la première contient les noms des variables),
+            par exemple un csv.reader
+        constantes : dict, optional
+            Variables de partition, ajoutées aux observations si elles ne
+            sont pas dans le fichier, by default None
+
+        Returns
+        -------
+        generator[dict]
+            Observations retenues, ne contenant que les variables retenues
+        """
+        header = next(reader, None)
+        if header is None:
+            return
+        constantes = {var: val for var, val in (constantes or {}).items()
+                      if var not in header}
+        if self.__variables is None:
+            noms = header
+            ajouts = constantes
+            ordre = None
+        else:
+            noms = [var for var in self.__variables if var in header]
+            ajouts = {var: val for var, val in constantes.items() if var in self.__variables}
+            # ordre des variables demandées, variables de partition comprises
+            ordre = [var for var in self.__variables if var in header or var in ajouts]
+        positions = [header.index(var) for var in noms]
+        taille = len(header)
+        test = None
+        if self.__filtre is not None:
+            def acces(var):
+                if var in header:
+                    return itemgetter(header.index(var))
+                val = constantes.get(var)
+                return lambda row: val
+            test = self.__filtre.compile(acces)
+        for row in reader:
+            if not row:
+                continue
+            if len(row) < taille:
+                row = row + [None] * (taille - len(row))
+            if test is None or test(row):
+                obs = {var: row[pos] for var, pos in zip(noms, positions)}
+                if ajouts:
+                    obs.update(ajouts)
+                    if ordre is not None:
+                        obs = {var: obs[var] for var in ordre}
+                yield obs
+
+    @property
+    def variables(self):
+        """Getter pour l'attribut variables
+
+        Returns
+        -------
+        list[str] ou None
+            Variables à importer (None pour toutes les variables)
+        """
+        return self.__variables
+
+    @property
+    def nb_processus(self):
+        """Getter pour l'attribut nb_processus
+
+        Returns
+        -------
+        int ou None
+            Nombre de processus lisant en parallèle les fichiers d'un dossier
+        """
+        return self.__nb_processus
+
+    @property
+    def vardate(self):
+        """Getter pour l'attribut vardate
+
+        Returns
+        -------
+        str ou None
+            Variable de date décrite par les noms des fichiers ou des dossiers
+        """
+        return self.__vardate
+
+    @property
+    def partitionne(self):
+        """Getter pour l'attribut partitionne
+
+        Returns
+        -------
+        bool
+            Vrai si les sous-dossiers cle=valeur du dossier sont parcourus
+        """
+        return self.__partitionne
+
+    @property
+    def elagage(self):
+        """Getter pour l'attribut elagage
+
+        Returns
+        -------
+        Predicat ou None
+            Condition servant uniquement à écarter des fichiers sans les lire
+        """
+        return self.__elagage
+
+    @property
+    def filtre(self):
+        """Getter pour l'attribut filtre
+
+        Returns
+        -------
+        Predicat ou None
+            Condition que doivent vérifier les observations importées
+        """
+        return self.__filtre
+
     @property
     def chemin(self):
         """Getter pour l'attribut chemin
@@ -0,0 +1,121 @@
+"""
+Importer des fichiers .col (format binaire par colonnes, voir ExportCol)
+
+Possibilité d'importer un fichier indivuellement ou tous les fichiers d'un dossier.
+Seules les variables demandées sont décompressées, et les groupes de lignes
+dont les statistiques ne peuvent pas vérifier le filtre ne sont pas lus.
+"""
+from pipelinepackage.imports.importation import Importation
+from pipelinepackage.model.colonne import Colonne
+from pipelinepackage.model.datasetcolonnes import DatasetColonnes
+from pipelinepackage.model.formatcolonnes import lit
+
+
+class ImportCol(Importation):
+    """Modélisation de l'importation
+
+    Les conditions du filtre portent sur les valeurs typées enregistrées
+    (par exemple Comparaison('t', '>', 280, 'float') pour une variable de type
+    'float').
+
+    Attributes
+    ----------
+    chemin : str
+        Chemin vers le fichier ou le dossier de fichiers à importer
+    variables : list[str], optional
+        Variables à importer, by default None (toutes les variables)
+    filtre : Predicat, optional
+        Condition que doivent vérifier les observations importées,
+        by default None (toutes les observations)
+    nb_processus : int, optional
+        Ignoré : la lecture d'un fichier .col ne nécessite aucun découpage
+        ni aucune conversion, by default None
+    vardate : str, optional
+        Variable de date décrite par les noms des fichiers ou des dossiers,
+        by default None
+    partitionne : bool, optional
+        Vrai si les sous-dossiers cle=valeur du dossier sont parcourus,
+        by default False
+
+    Examples
+    --------
+    Import des seules observations de Bretagne
+    >>> import os, tempfile
+    >>> from pipelinepackage.model.predicat import Comparaison
+    >>> from pipelinepackage.exports.exportcol import ExportCol
+    >>> from pipelinepackage.imports.importjsongz import ImportJsonGz
+    >>> dossier = tempfile.TemporaryDirectory()
+    >>> conso = ImportJsonGz('data/input/2022-01.json.gz', ['region', 'date_heure', 'consommation_brute_electricite_rte']).importe()
+    >>> ExportCol(dossier.name, 'conso.col', taille_groupe=1000).exporte(conso)
+    >>> d = ImportCol(os.path.join(dossier.name, 'conso.col'), ['region', 'consommation_brute_electricite_rte'], filtre=Comparaison('region', '=', 'Bretagne')).importe()
+    >>> len(d), d.header, set(d.valeurs('region'))
+    (1488, ['region', 'consommation_brute_electricite_rte'], {'Bretagne'})
+    >>> dossier.cleanup()
+    """
+
+    extension = ".col"
+
+    def importe(self):
+        """Importe un jeu de données
+
+        Returns
+        -------
+        DatasetColonnes
+            Jeu de données importé
+        """
+        morceaux = [self.importe_fichier(fichier) for fichier in self.fichiers(self.extension)]
+        if len(morceaux) == 1:
+            return morceaux[0]
+        header = {}
+        for morceau in morceaux:
+            header.update(dict.fromkeys(morceau.header))
+        colonnes = []
+        for var in header:
+            types = {m.colonne(var).type for m in morceaux if var in m.header}
+            if len(types) > 1:
+                # types différents selon les fichiers : nouvelle déduction du type
+                colonnes.append(Colonne.depuis_valeurs(var, [
+                    val for m in morceaux
+                    for val in (m.colonne(var).valeurs() if var in m.header else [None] * len(m))]))
+                continue
+            typ = types.pop()
+            colonnes.append(Colonne.concatene([
+                m.colonne(var) if var in m.header
+                else Colonne.depuis_valeurs(var, [None] * len(m), typ)
+                for m in morceaux]))
+        return DatasetColonnes(colonnes)
+
+    def importe_fichier(self, fichier):
+        """Importe un seul fichier
+
+        Parameters
+        ----------
+        fichier : str
+            Chemin vers le fichier
+
+        Returns
+        -------
+        DatasetColonnes
+            Observations retenues du fichier
+        """
+        return lit(fichier, self.variables, self.filtre, self.constantes(fichier))
+
+    def lignes_fichier(self, fichier):
+        """Parcourt les observations d'un fichier une à une
+
+        Parameters
+        ----------
+        fichier : str
+            Chemin vers le fichier
+
+        Returns
+        -------
+        generator[dict]
+            Observations du fichier
+        """
+        yield from self.importe_fichier(fichier).body
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
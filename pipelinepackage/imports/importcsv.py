@@ -4,7 +4,6 @@ Importer des fichiers .csv
 Possibilité d'importer un fichier indivuellement ou tous les fichiers d'un dossier.
 """
 import csv
-import os
 from pipelinepackage.imports.importation import Importation
 from pipelinepackage.model.dataset import Dataset
 
@@ -18,9 +17,40 @@ class ImportCsv(Importation):
         Chemin vers le fichier ou le dossier de fichiers à importer
     sep : str
         Séparateur utilisé pour le(s) fichier(s)
+    variables : list[str], optional
+        Variables à importer, by default None (toutes les variables)
+    filtre : Predicat, optional
+        Condition que doivent vérifier les observations importées,
+        by default None (toutes les observations)
+    nb_processus : int, optional
+        Nombre de processus lisant en parallèle les fichiers d'un dossier,
+        by default None (lecture séquentielle)
+    vardate : str, optional
+        Variable de date décrite par les noms des fichiers ou des dossiers,
+        by default None
+    partitionne : bool, optional
+        Vrai si les sous-dossiers cle=valeur du dossier sont parcourus,
+        by default False
+
+    Examples
+    --------
+    Import des seules observations de Bretagne
+    >>> import os, tempfile
+    >>> from pipelinepackage.model.predicat import Comparaison
+    >>> from pipelinepackage.exports.exportcsv import ExportCsv
+    >>> from pipelinepackage.imports.importjsongz import ImportJsonGz
+    >>> dossier = tempfile.TemporaryDirectory()
+    >>> ExportCsv(dossier.name, 'conso.csv').exporte(ImportJsonGz('data/input/2022-01.json.gz', ['region', 'date_heure']).importe())
+    >>> d = ImportCsv(os.path.join(dossier.name, 'conso.csv'), ';', filtre=Comparaison('region', '=', 'Bretagne')).importe()
+    >>> len(d.body), set(d.valeurs('region'))
+    (1488, {'Bretagne'})
+    >>> dossier.cleanup()
     """
 
-    def __init__(self, chemin, sep):
+    extension = ".csv"
+
+    def __init__(self, chemin, sep, variables=None, filtre=None, nb_processus=None,
+                 vardate=None, partitionne=False):
         """Constructeur
 
         Parameters
@@ -29,8 +59,22 @@ class ImportCsv(Importation):
             Chemin vers le fichier ou le dossier de fichiers à importer
         sep : str
             Séparateur utilisé pour le(s) fichier(s)
+        variables : list[str], optional
+            Variables à importer, by default None (toutes les variables)
+        filtre : Predicat, optional
+            Condition que doivent vérifier les observations importées,
+            by default None (toutes les observations)
+        nb_processus : int, optional
+            Nombre de processus lisant en parallèle les fichiers d'un dossier,
+            by default None (lecture séquentielle)
+        vardate : str, optional
+            Variable de date décrite par les noms des fichiers ou des dossiers
+            (voir Importation.partition), by default None
+        partitionne : bool, optional
+            Vrai si les sous-dossiers cle=valeur du dossier sont parcourus
+            (voir Importation.constantes), by default False
         """
-        super().__init__(chemin)
+        super().__init__(chemin, variables, filtre, nb_processus, vardate, partitionne)
         self.__sep = sep
 
     def importe(self):
@@ -41,31 +85,32 @@ class ImportCsv(Importation):
         Dataset
             Jeu de données importé
         """
-        body = []
-
-        lfiles = []
-
-        if os.path.isfile(self.chemin):
-            lfiles.append(self.chemin)
-        else:
-            for filename in os.listdir(self.chemin):
-                lfiles.append(os.path.join(self.chemin, filename))
-
-        for file in lfiles:
-            if file.endswith(".csv"):
-
-                with open(file, mode='rt', encoding='utf-8') as gzfile:
-                    synopreader = csv.DictReader(
-                        gzfile, delimiter=self.__sep)
+        if self.nb_processus is not None:
+            return self.importe_parallele()
+        body = list(self.lignes())
 
-                    # stockage des données dans une liste de dictionnaires
-                    for row in synopreader:
-                        body.append(row)
+        return Dataset(self.entete(body), body)
 
-        header = list(body[0])
+    def lignes_fichier(self, fichier):
+        """Parcourt les observations d'un fichier une à une
 
-        return Dataset(header, body)
+        Parameters
+        ----------
+        fichier : str
+            Chemin vers le fichier
 
+        Returns
+        -------
+        generator[dict]
+            Observations lues au fur et à mesure dans le fichier
+        """
+        constantes = self.constantes(fichier)
+        with open(fichier, mode='rt', encoding='utf-8') as csvfile:
+            if self.variables is None and self.filtre is None and not constantes:
+                yield from csv.DictReader(csvfile, delimiter=self.__sep)
+            else:
+                yield from self.projette_lignes(
+                    csv.reader(csvfile, delimiter=self.__sep), constantes)
 
 if __name__ == "__main__":
     import doctest
@@ -7,13 +7,39 @@ Examples
 --------
 >>> c=ImportCsvGz('data/input/synop.202201.csv.gz',';')
 """
+import bz2
 import gzip
 import csv
-import os
+import lzma
 from pipelinepackage.imports.importation import Importation
 from pipelinepackage.model.dataset import Dataset
 
 
+def ouvre(fichier):
+    """Ouverture en mode texte d'un fichier compressé
+
+    La compression est reconnue à ses premiers octets : gzip, bz2 ou xz
+    (voir ExportCsvGz).
+
+    Parameters
+    ----------
+    fichier : str
+        Chemin vers le fichier
+
+    Returns
+    -------
+    io.TextIOWrapper
+        Flux texte décompressé
+    """
+    with open(fichier, 'rb') as brut:
+        entete = brut.read(6)
+    if entete.startswith(b'BZh'):
+        return bz2.open(fichier, mode='rt', encoding='utf-8')
+    if entete.startswith(b'\xfd7zXZ'):
+        return lzma.open(fichier, mode='rt', encoding='utf-8')
+    return gzip.open(fichier, mode='rt', encoding='utf-8')
+
+
 class ImportCsvGz(Importation):
     """Modélisation de l'importation
 
@@ -23,13 +49,44 @@ class ImportCsvGz(Importation):
         Chemin vers le fichier ou le dossier de fichiers à importer
     sep : str
         Séparateur utilisé pour le(s) fichier(s)
+    variables : list[str], optional
+        Variables à importer, by default None (toutes les variables)
+    filtre : Predicat, optional
+        Condition que doivent vérifier les observations importées,
+        by default None (toutes les observations)
+    nb_processus : int, optional
+        Nombre de processus lisant en parallèle les fichiers d'un dossier,
+        by default None (lecture séquentielle)
+    vardate : str, optional
+        Variable de date décrite par les noms des fichiers ou des dossiers,
+        by default None
+    partitionne : bool, optional
+        Vrai si les sous-dossiers cle=valeur du dossier sont parcourus,
+        by default False
 
     Examples
     --------
     >>> c=ImportCsvGz('data/input/synop.202201.csv.gz',';')
+
+    Import par lots de 5000 observations
+    >>> [len(lot.body) for lot in c.importe_lots(5000)]
+    [5000, 5000, 4575]
+
+    Import limité à trois des 59 variables
+    >>> d = ImportCsvGz('data/input/synop.202201.csv.gz', ';', ['numer_sta', 'date', 't']).importe()
+    >>> d.body[0]
+    {'numer_sta': '07005', 'date': '20220101000000', 't': '284.450000'}
+
+    Import d'un dossier, un processus par fichier (au plus 4)
+    >>> d = ImportCsvGz('data/input', ';', nb_processus=4).importe()
+    >>> len(d), len(d.morceaux)
+    (14575, 1)
     """
 
-    def __init__(self, chemin, sep):
+    extension = ".csv.gz"
+
+    def __init__(self, chemin, sep, variables=None, filtre=None, nb_processus=None,
+                 vardate=None, partitionne=False):
         """Constructeur
 
         Parameters
@@ -38,8 +95,22 @@ class ImportCsvGz(Importation):
             Chemin vers le fichier ou le dossier de fichiers à importer
         sep : str
             Séparateur utilisé pour le(s) fichier(s)
+        variables : list[str], optional
+            Variables à importer, by default None (toutes les variables)
+        filtre : Predicat, optional
+            Condition que doivent vérifier les observations importées,
+            by default None (toutes les observations)
+        nb_processus : int, optional
+            Nombre de processus lisant en parallèle les fichiers d'un dossier,
+            by default None (lecture séquentielle)
+        vardate : str, optional
+            Variable de date décrite par les noms des fichiers ou des dossiers
+            (voir Importation.partition), by default None
+        partitionne : bool, optional
+            Vrai si les sous-dossiers cle=valeur du dossier sont parcourus
+            (voir Importation.constantes), by default False
         """
-        super().__init__(chemin)
+        super().__init__(chemin, variables, filtre, nb_processus, vardate, partitionne)
         self.__sep = sep
 
     def importe(self):
@@ -54,31 +125,32 @@ class ImportCsvGz(Importation):
         --------
         >>> c = ImportCsvGz('data/input/synop.202201.csv.gz',';')
         """
-        body = []
-
-        lfiles = []
-
-        if os.path.isfile(self.chemin):
-            lfiles.append(self.chemin)
-        else:
-            for filename in os.listdir(self.chemin):
-                lfiles.append(os.path.join(self.chemin, filename))
-
-        for file in lfiles:
-            if file.endswith(".csv.gz"):
-
-                with gzip.open(file, mode='rt', encoding='utf-8') as gzfile:
-                    synopreader = csv.DictReader(
-                        gzfile, delimiter=self.__sep)
+        if self.nb_processus is not None:
+            return self.importe_parallele()
+        body = list(self.lignes())
 
-                    # stockage des données dans une liste de dictionnaires
-                    for row in synopreader:
-                        body.append(row)
+        return Dataset(self.entete(body), body)
 
-        header = list(body[0])
+    def lignes_fichier(self, fichier):
+        """Parcourt les observations d'un fichier une à une
 
-        return Dataset(header, body)
+        Parameters
+        ----------
+        fichier : str
+            Chemin vers le fichier
 
+        Returns
+        -------
+        generator[dict]
+            Observations lues au fur et à mesure dans le fichier
+        """
+        constantes = self.constantes(fichier)
+        with ouvre(fichier) as csvfile:
+            if self.variables is None and self.filtre is None and not constantes:
+                yield from csv.DictReader(csvfile, delimiter=self.__sep)
+            else:
+                yield from self.projette_lignes(
+                    csv.reader(csvfile, delimiter=self.__sep), constantes)
 
 if __name__ == '__main__':
     import doctest
@@ -9,7 +9,6 @@ Examples
 """
 import gzip
 import json
-import os
 from pipelinepackage.imports.importation import Importation
 from pipelinepackage.model.dataset import Dataset
 
@@ -21,21 +20,56 @@ class ImportJsonGz(Importation):
     ----------
     chemin : str
         Chemin vers le fichier ou le dossier de fichiers à importer
+    variables : list[str], optional
+        Variables à importer, by default None (toutes les variables)
+    filtre : Predicat, optional
+        Condition que doivent vérifier les observations importées,
+        by default None (toutes les observations)
+    nb_processus : int, optional
+        Nombre de processus lisant en parallèle les fichiers d'un dossier,
+        by default None (lecture séquentielle)
+    vardate : str, optional
+        Variable de date décrite par les noms des fichiers ou des dossiers,
+        by default None
+    partitionne : bool, optional
+        Vrai si les sous-dossiers cle=valeur du dossier sont parcourus,
+        by default False
 
     Examples
     --------
     >>> c=ImportJsonGz('data/input/2022-01.json.gz')
+
+    Import limité à deux variables
+    >>> ImportJsonGz('data/input/2022-01.json.gz', ['region', 'date_heure']).importe().header
+    ['region', 'date_heure']
     """
 
-    def __init__(self, chemin):
+    extension = ".json.gz"
+
+    def __init__(self, chemin, variables=None, filtre=None, nb_processus=None,
+                 vardate=None, partitionne=False):
         """Constructeur
 
         Parameters
         ----------
         chemin : str
             Chemin vers le fichier ou le dossier de fichiers à importer
+        variables : list[str], optional
+            Variables à importer, by default None (toutes les variables)
+        filtre : Predicat, optional
+            Condition que doivent vérifier les observations importées,
+            by default None (toutes les observations)
+        nb_processus : int, optional
+            Nombre de processus lisant en parallèle les fichiers d'un dossier,
+            by default None (lecture séquentielle)
+        vardate : str, optional
+            Variable de date décrite par les noms des fichiers ou des dossiers
+            (voir Importation.partition), by default None
+        partitionne : bool, optional
+            Vrai si les sous-dossiers cle=valeur du dossier sont parcourus
+            (voir Importation.constantes), by default False
         """
-        super().__init__(chemin)
+        super().__init__(chemin, variables, filtre, nb_processus, vardate, partitionne)
 
     def importe(self):
         """Importe un jeu de données
@@ -49,34 +83,141 @@ class ImportJsonGz(Importation):
         --------
         >>> c=ImportJsonGz('data/input/2022-01.json.gz')
         """
-        body = []
+        if self.nb_processus is not None:
+            return self.importe_parallele()
+        body = list(self.lignes())
+
+        return Dataset(self.entete(body), body)
+
+    def lignes_fichier(self, fichier):
+        """Parcourt les observations d'un fichier une à une
+
+        Le fichier est décompressé et analysé au fur et à mesure (voir
+        enregistrements) : seul le contenu des champs 'fields' de
+        l'enregistrement courant est conservé.
+
+        Parameters
+        ----------
+        fichier : str
+            Chemin vers le fichier
 
-        lfiles = []
+        Returns
+        -------
+        generator[dict]
+            Observations lues dans le fichier
 
-        if os.path.isfile(self.chemin):
-            lfiles.append(self.chemin)
-        else:
-            for filename in os.listdir(self.chemin):
-                lfiles.append(os.path.join(self.chemin, filename))
+        Examples
+        --------
+        >>> next(ImportJsonGz('data/input', ['region', 'consommation_brute_electricite_rte']).lignes())
+        {'region': 'Grand Est', 'consommation_brute_electricite_rte': 6294.0}
+        """
+        test = self.filtre.compile() if self.filtre is not None else None
+        variables = self.variables
+        constantes = self.constantes(fichier)
+        for row in enregistrements(fichier):
+            fields = row['fields']
+            for var, val in constantes.items():
+                fields.setdefault(var, val)
+            if test is not None and not test(fields):
+                continue
+            if variables is None:
+                yield fields
+            else:
+                yield {var: fields[var] for var in variables if var in fields}
+
+    def entete(self, body):
+        """Variables d'un ensemble d'observations importées
+
+        On doit parcourir toutes les observations car les valeurs manquantes
+        font que des clés peuvent ne pas être dans toutes les observations.
+        Les variables sont rangées dans leur ordre d'apparition.
 
-        for file in lfiles:
-            if file.endswith(".json.gz"):
-                with gzip.open(file, mode="rt", encoding='utf-8') as gzfile:
-                    body.extend(
-                        json.load(gzfile, parse_float=float, parse_int=float))
+        Parameters
+        ----------
+        body : list[dict]
+            Observations importées
 
-        header = []
+        Returns
+        -------
+        list[str]
+            Variables du jeu de données
 
-        # récupérer toutes les clés (les noms des variables) et les valeurs
-        # contenues dans les champs 'fields'
-        # on doit parcourir toutes les observations car les valeurs manquantes
-        # font que des clés peuvent ne pas être dans toutes les observations.
-        body = [row['fields'] for row in body]
+        Examples
+        --------
+        >>> ImportJsonGz('data/input').entete([{'a': 1, 'b': 2}, {'a': 1, 'c': 3}])
+        ['a', 'b', 'c']
+        """
+        header = {}
+        cles = header.keys()
         for row in body:
-            header = list(set(header) | set(list(row)))
+            # la plupart des observations n'apportent aucune nouvelle variable
+            if not row.keys() <= cles:
+                header.update(dict.fromkeys(row))
+        if self.variables is not None:
+            return [var for var in self.variables if var in header]
+        return list(header)
+
 
-        return Dataset(header, body)
+def enregistrements(fichier, taille_bloc=1 << 20):
+    """Lecture incrémentale des enregistrements d'un fichier .json.gz
 
+    Le fichier doit contenir une liste d'objets JSON. Il est décompressé par
+    blocs et chaque objet est décodé dès qu'il est complet : seuls le bloc
+    courant et l'enregistrement en cours sont gardés en mémoire. Comme dans
+    l'importation d'origine, tous les nombres sont lus en flottants.
+
+    Parameters
+    ----------
+    fichier : str
+        Chemin vers le fichier .json.gz
+    taille_bloc : int, optional
+        Nombre de caractères décompressés à chaque lecture, by default 1048576
+
+    Returns
+    -------
+    generator[dict]
+        Enregistrements du fichier
+
+    Examples
+    --------
+    >>> rec = next(enregistrements('data/input/2022-01.json.gz', 100))
+    >>> rec['fields']['date_heure']
+    '2022-01-10T22:00:00+01:00'
+    """
+    decodeur = json.JSONDecoder(parse_float=float, parse_int=float)
+    with gzip.open(fichier, mode="rt", encoding='utf-8') as gzfile:
+        tampon = ''
+        pos = 0
+        fin = False
+        debut = True
+        while True:
+            # passage des blancs et séparateurs entre deux enregistrements
+            while pos < len(tampon) and tampon[pos] in ' \t\r\n,':
+                pos += 1
+            if debut and pos < len(tampon):
+                if tampon[pos] != '[':
+                    raise ValueError("Le fichier " + fichier + " ne contient pas une liste JSON")
+                debut = False
+                pos += 1
+                continue
+            if pos < len(tampon) and tampon[pos] == ']':
+                return
+            try:
+                if pos == len(tampon):
+                    raise json.JSONDecodeError("Fin du bloc", tampon, pos)
+                row, pos = decodeur.raw_decode(tampon, pos)
+            except json.JSONDecodeError:
+                # enregistrement incomplet : lecture du bloc suivant
+                if fin:
+                    if tampon[pos:].strip():
+                        raise
+                    return
+                bloc = gzfile.read(taille_bloc)
+                fin = not bloc
+                tampon = tampon[pos:] + bloc
+                pos = 0
+                continue
+            yield row
 
 if __name__ == '__main__':
     import doctest
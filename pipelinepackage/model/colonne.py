@@ -0,0 +1,455 @@
+"""
+module colonne
+
+Modélisation d'une colonne typée d'un jeu de données.
+
+Les valeurs d'une colonne sont stockées dans un tableau contigu (module array)
+selon leur type :
+
+- 'float' : flottants 64 bits
+- 'int'   : entiers 64 bits
+- 'date'  : entiers 64 bits (secondes depuis le 1er janvier 1970)
+- 'str'   : chaines de caractères encodées par dictionnaire (codes entiers
+  renvoyant à la liste des modalités)
+
+Le type 'date' n'est déduit que pour des dates écrites 'yyyy-mm-dd hh:mm:ss',
+seul format rendu à l'identique : les autres dates (sans heure, avec fuseau
+horaire...) restent des chaines, pour ne perdre ni leur format ni leur décalage.
+
+Examples
+--------
+>>> c = Colonne.depuis_valeurs('t', ['284.45', 'mq', '283.35'])
+>>> c.type
+'float'
+>>> c.valeurs()
+[284.45, None, 283.35]
+>>> d = Colonne.depuis_valeurs('date', ['2022-01-01 00:00:00', '2022-01-01 03:00:00'])
+>>> d.type, list(d.donnees)
+('date', [1640995200, 1641006000])
+>>> d[1]
+'2022-01-01 03:00:00'
+>>> Colonne.depuis_valeurs('date', ['2022-01-01T03:00:00+01:00']).valeurs()
+['2022-01-01T03:00:00+01:00']
+"""
+import re
+from array import array
+from calendar import timegm
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+# valeurs considérées comme manquantes par défaut (fichiers synop et eco2mix)
+VALMQ = (None, '', 'mq')
+
+# codes du module array utilisés pour chaque type
+TYPECODES = {'float': 'd', 'int': 'q', 'date': 'q', 'str': 'i'}
+
+_EPOCH = datetime(1970, 1, 1)
+_RE_INT = re.compile(r'-?(0|[1-9][0-9]*)$')
+_RE_ZERO = re.compile(r'-?0[0-9]')
+_RE_DATE = re.compile(r'[0-9]{4}-[0-9]{2}-[0-9]{2}')
+
+
+@lru_cache(maxsize=65536)
+def _epoch_iso(valeur):
+    return vers_epoch(datetime.fromisoformat(valeur))
+
+
+def vers_epoch(valeur):
+    """Conversion d'une date en secondes depuis le 1er janvier 1970
+
+    Les chaines au format ISO sont mises en cache, car une même date
+    revient en général pour toutes les stations ou régions. Une date avec
+    décalage horaire est ramenée en UTC, une date sans décalage est
+    considérée comme déjà en UTC.
+
+    Parameters
+    ----------
+    valeur : str, int ou datetime
+        Date à convertir (un entier est supposé déjà converti)
+
+    Returns
+    -------
+    int
+        Nombre de secondes depuis le 1er janvier 1970
+
+    Examples
+    --------
+    >>> vers_epoch('2022-01-01 03:00:00')
+    1641006000
+    >>> vers_epoch(datetime(2022, 1, 1, 3))
+    1641006000
+    >>> vers_epoch('2022-01-01T03:00:00+01:00')
+    1641002400
+    """
+    if isinstance(valeur, str):
+        return _epoch_iso(valeur)
+    if isinstance(valeur, datetime):
+        if valeur.tzinfo is not None:
+            return int(valeur.timestamp())
+        return timegm(valeur.timetuple())
+    return int(valeur)
+
+
+# conversion des valeurs selon le type de la variable
+CONVERSIONS = {'str': lambda val: val, 'int': int, 'float': float, 'date': vers_epoch}
+
+
+@lru_cache(maxsize=65536)
+def depuis_epoch(secondes):
+    """Conversion de secondes depuis le 1er janvier 1970 en date
+
+    Parameters
+    ----------
+    secondes : int
+        Nombre de secondes depuis le 1er janvier 1970
+
+    Returns
+    -------
+    str
+        Date au format 'yyyy-mm-dd hh:mm:ss'
+
+    Examples
+    --------
+    >>> depuis_epoch(1641006000)
+    '2022-01-01 03:00:00'
+    """
+    return str(_EPOCH + timedelta(seconds=secondes))
+
+
+def _infere_type(valeurs):
+    """Type le plus précis compatible avec toutes les valeurs"""
+    if not valeurs:
+        return 'str'
+    candidats = ['int', 'float', 'date']
+    for val in valeurs:
+        if isinstance(val, bool) or not isinstance(val, (str, int, float)):
+            return 'str'
+        if not isinstance(val, str):
+            exclus = ['date'] if isinstance(val, int) else ['int', 'date']
+            candidats = [typ for typ in candidats if typ not in exclus]
+            if not candidats:
+                return 'str'
+            continue
+        if 'int' in candidats and not _RE_INT.match(val):
+            candidats.remove('int')
+        if 'float' in candidats and 'int' not in candidats:
+            try:
+                float(val)
+                if _RE_ZERO.match(val):
+                    candidats.remove('float')
+            except ValueError:
+                candidats.remove('float')
+        if 'date' in candidats:
+            try:
+                # seules les dates rendues à l'identique sont converties
+                if not _RE_DATE.match(val) or depuis_epoch(_epoch_iso(val)) != val:
+                    raise ValueError
+            except ValueError:
+                candidats.remove('date')
+        if not candidats:
+            return 'str'
+    return candidats[0]
+
+
+class Colonne:
+    """Classe Colonne
+
+    Modélise une variable d'un jeu de données stockée dans un tableau typé.
+
+    Attributes
+    ----------
+    nom : str
+        Nom de la variable
+    type : str
+        Type de la variable ('int', 'float', 'date' ou 'str')
+    donnees : array.array
+        Valeurs typées (codes des modalités pour le type 'str')
+    nulls : bytearray ou None
+        Masque des valeurs manquantes (1 si manquante), None si aucune
+    modalites : list[str] ou None
+        Modalités d'une variable de type 'str'
+
+    Examples
+    --------
+    >>> c = Colonne.depuis_valeurs('region', ['Bretagne', 'Corse', 'Bretagne', None])
+    >>> c.modalites, list(c.donnees)
+    (['Bretagne', 'Corse'], [0, 1, 0, -1])
+    >>> c.valeurs()
+    ['Bretagne', 'Corse', 'Bretagne', None]
+    """
+
+    def __init__(self, nom, typ, donnees, nulls=None, modalites=None):
+        """Constructeur
+
+        Parameters
+        ----------
+        nom : str
+            Nom de la variable
+        typ : str
+            Type de la variable ('int', 'float', 'date' ou 'str')
+        donnees : array.array
+            Valeurs typées (codes des modalités pour le type 'str')
+        nulls : bytearray, optional
+            Masque des valeurs manquantes, by default None
+        modalites : list[str], optional
+            Modalités d'une variable de type 'str', by default None
+        """
+        self.__nom = nom
+        self.__type = typ
+        self.__donnees = donnees
+        self.__nulls = nulls
+        self.__modalites = modalites
+
+    @staticmethod
+    def depuis_valeurs(nom, valeurs, typ=None, valmq=VALMQ):
+        """Construction d'une colonne à partir d'une liste de valeurs
+
+        Parameters
+        ----------
+        nom : str
+            Nom de la variable
+        valeurs : list
+            Valeurs de la variable
+        typ : str, optional
+            Type de la variable, déduit des valeurs si None, by default None
+        valmq : tuple, optional
+            Valeurs considérées comme manquantes, by default (None, '', 'mq')
+
+        Returns
+        -------
+        Colonne
+            Colonne typée
+
+        Examples
+        --------
+        >>> c = Colonne.depuis_valeurs('numer_sta', ['07005', '07015'])
+        >>> c.type, c.valeurs()
+        ('str', ['07005', '07015'])
+        >>> Colonne.depuis_valeurs('u', ['93', '92'], 'float').valeurs()
+        [93.0, 92.0]
+        """
+        valmq = set(valmq)
+        nulls = bytearray(val in valmq for val in valeurs)
+        if not any(nulls):
+            nulls = None
+            presentes = valeurs
+        else:
+            presentes = [val for val, mq in zip(valeurs, nulls) if not mq]
+        if typ is None:
+            try:
+                typ = _infere_type(set(presentes))
+            except TypeError:
+                typ = 'str'
+
+        modalites = None
+        if typ == 'str':
+            modalites = []
+            codes = {}
+            donnees = array(TYPECODES[typ])
+            for val in valeurs:
+                if val in valmq:
+                    donnees.append(-1)
+                    continue
+                code = codes.get(val)
+                if code is None:
+                    code = codes[val] = len(modalites)
+                    modalites.append(val)
+                donnees.append(code)
+        else:
+            conv = CONVERSIONS[typ]
+            vide = float('nan') if typ == 'float' else 0
+            donnees = array(TYPECODES[typ],
+                            [vide if val in valmq else conv(val) for val in valeurs])
+        return Colonne(nom, typ, donnees, nulls, modalites)
+
+    @property
+    def nom(self):
+        """Nom de la variable"""
+        return self.__nom
+
+    @property
+    def type(self):
+        """Type de la variable ('int', 'float', 'date' ou 'str')"""
+        return self.__type
+
+    @property
+    def donnees(self):
+        """Valeurs typées (codes des modalités pour le type 'str')"""
+        return self.__donnees
+
+    @property
+    def nulls(self):
+        """Masque des valeurs manquantes (None si aucune valeur manquante)"""
+        return self.__nulls
+
+    @property
+    def modalites(self):
+        """Modalités d'une variable de type 'str'"""
+        return self.__modalites
+
+    def __len__(self):
+        return len(self.__donnees)
+
+    def __getitem__(self, i):
+        if self.__nulls is not None and self.__nulls[i]:
+            return None
+        val = self.__donnees[i]
+        if self.__type == 'str':
+            return self.__modalites[val]
+        if self.__type == 'date':
+            return depuis_epoch(val)
+        return val
+
+    def valeurs(self):
+        """Valeurs de la variable sous forme de liste
+
+        Les dates sont rendues au format 'yyyy-mm-dd hh:mm:ss' et les
+        valeurs manquantes valent None.
+
+        Returns
+        -------
+        list
+            Valeurs de la variable
+
+        Examples
+        --------
+        >>> Colonne.depuis_valeurs('n', ['3', '', '5']).valeurs()
+        [3, None, 5]
+        """
+        if self.__type == 'str':
+            modalites = self.__modalites
+            return [modalites[code] if code >= 0 else None for code in self.__donnees]
+        if self.__type == 'date':
+            vals = [depuis_epoch(val) for val in self.__donnees]
+        else:
+            vals = self.__donnees.tolist()
+        if self.__nulls is not None:
+            vals = [None if mq else val for val, mq in zip(vals, self.__nulls)]
+        return vals
+
+    def prend(self, indices):
+        """Sélection de lignes de la colonne
+
+        Parameters
+        ----------
+        indices : list[int]
+            Positions des lignes à conserver
+
+        Returns
+        -------
+        Colonne
+            Colonne ne contenant que les lignes sélectionnées
+
+        Examples
+        --------
+        >>> c = Colonne.depuis_valeurs('t', ['1.5', '', '2.5'])
+        >>> c.prend([2, 1]).valeurs()
+        [2.5, None]
+        """
+        donnees = self.__donnees
+        nulls = None
+        if self.__nulls is not None:
+            nulls = bytearray(self.__nulls[i] for i in indices)
+            if not any(nulls):
+                nulls = None
+        return Colonne(self.__nom, self.__type,
+                       array(donnees.typecode, [donnees[i] for i in indices]),
+                       nulls, self.__modalites)
+
+    def tranche(self, debut, fin):
+        """Lignes consécutives de la colonne
+
+        Les valeurs sont recopiées d'un bloc (sans passer par des objets
+        Python), les modalités sont partagées.
+
+        Parameters
+        ----------
+        debut : int
+            Position de la première ligne
+        fin : int
+            Position suivant la dernière ligne
+
+        Returns
+        -------
+        Colonne
+            Colonne ne contenant que les lignes debut à fin (exclue)
+
+        Examples
+        --------
+        >>> Colonne.depuis_valeurs('t', ['1.5', '', '2.5', '3.5']).tranche(1, 3).valeurs()
+        [None, 2.5]
+        """
+        nulls = None
+        if self.__nulls is not None:
+            nulls = self.__nulls[debut:fin]
+            if not any(nulls):
+                nulls = None
+        return Colonne(self.__nom, self.__type, self.__donnees[debut:fin], nulls,
+                       self.__modalites)
+
+    def renomme(self, nom):
+        """Copie de la colonne sous un autre nom (les données sont partagées)
+
+        Parameters
+        ----------
+        nom : str
+            Nouveau nom de la variable
+
+        Returns
+        -------
+        Colonne
+            Colonne renommée
+        """
+        return Colonne(nom, self.__type, self.__donnees, self.__nulls, self.__modalites)
+
+    @staticmethod
+    def concatene(colonnes):
+        """Mise bout à bout de colonnes de même nom et de même type
+
+        Pour le type 'str', les codes sont ramenés à un dictionnaire de
+        modalités commun (inchangés si toutes les colonnes partagent déjà
+        le même).
+
+        Parameters
+        ----------
+        colonnes : list[Colonne]
+            Colonnes à concaténer (au moins une)
+
+        Returns
+        -------
+        Colonne
+            Colonne contenant toutes les valeurs
+
+        Examples
+        --------
+        >>> a = Colonne.depuis_valeurs('region', ['Bretagne', 'Corse'])
+        >>> b = Colonne.depuis_valeurs('region', ['Corse', None, 'Normandie'])
+        >>> Colonne.concatene([a, b]).valeurs()
+        ['Bretagne', 'Corse', 'Corse', None, 'Normandie']
+        """
+        premiere = colonnes[0]
+        donnees = array(premiere.donnees.typecode)
+        modalites = premiere.modalites
+        if premiere.type == 'str' and any(col.modalites is not modalites for col in colonnes):
+            modalites = []
+            codes = {}
+            for col in colonnes:
+                # table de correspondance des codes, -1 (manquant) restant -1
+                table = [codes.setdefault(val, len(codes)) for val in col.modalites] + [-1]
+                donnees.extend(array(donnees.typecode, map(table.__getitem__, col.donnees)))
+            modalites = list(codes)
+        else:
+            for col in colonnes:
+                donnees.extend(col.donnees)
+
+        nulls = None
+        if any(col.nulls is not None for col in colonnes):
+            nulls = bytearray()
+            for col in colonnes:
+                nulls.extend(col.nulls if col.nulls is not None else bytes(len(col)))
+        return Colonne(premiere.nom, premiere.type, donnees, nulls, modalites)
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod(verbose=True)
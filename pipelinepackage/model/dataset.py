@@ -14,12 +14,25 @@ Méthode body
 >>> print(d.body)
 [{'nom': 'Anne', 'age': 23}, {'nom': 'Thomas', 'age': 17}]
 
+Index secondaires
+>>> d = Dataset(["nom", "age"], [{"nom" : "Anne", "age" : 23}, {"nom" : "Thomas", "age" : 17}, {"nom" : "Anne", "age" : 7}])
+>>> d.indexe("nom").positions([("Anne",)])
+[0, 2]
+>>> d.indexe("age", "tri", "int").intervalle(10, 30)
+[0, 1]
+
+Ordre des observations
+>>> d = Dataset(["nom", "age"], [{"nom" : "Thomas", "age" : 17}, {"nom" : "Anne", "age" : 23}], tri=["age"])
+>>> d.tri, d.groupe_contigu(["age"])
+(('age',), True)
+
 Méthode __str__
 >>> d = Dataset(["nom", "age"], [{"nom" : "Anne", "age" : 23}, {"nom" : "Thomas", "age" : 17}, {"nom" : "Gribouille", "age" : 7}, {"nom" : "Maelle", "age" : 21}])
 >>> print(d)
   Dimensions : 4 observations et 2 variables
   Variables  : ['nom', 'age']
 """
+from pipelinepackage.model.index import IndexHachage, IndexTrie
 
 
 class Dataset:
@@ -34,6 +47,12 @@ class Dataset:
     body : list[dict]
         Observations du jeu de données(une observation est
         un élément de la liste donc un dictionnaire)
+    tri : tuple[str]
+        Variables selon lesquelles les observations sont triées (ordre
+        croissant des valeurs, variable après variable), () si inconnu
+    partition : tuple[str]
+        Variables dont les observations de mêmes valeurs sont consécutives
+        (par exemple une partition par région), () si inconnu
 
     Examples
     --------
@@ -44,7 +63,7 @@ class Dataset:
     ['nom', 'age']
     """
 
-    def __init__(self, header, body):
+    def __init__(self, header, body, tri=(), partition=()):
         """Constructeur
 
         Parameters
@@ -54,9 +73,18 @@ class Dataset:
         body : list[dict]
             Observations du jeu de données (une observation est
             un élément de la liste donc un dictionnaire)
+        tri : list[str], optional
+            Variables selon lesquelles les observations sont triées, by default ()
+        partition : list[str], optional
+            Variables dont les observations de mêmes valeurs sont
+            consécutives, by default ()
         """
         self.__header = header
         self.__body = body
+        self.__tri = tuple(tri)
+        self.__partition = tuple(partition)
+        # index secondaires construits à la demande, par (variables, genre, type)
+        self.__index = {}
 
     @property
     def header(self):
@@ -92,6 +120,278 @@ class Dataset:
         """
         return self.__body
 
+    @property
+    def tri(self):
+        """Variables selon lesquelles les observations sont triées
+
+        Returns
+        -------
+        tuple[str]
+            Variables du tri, () si l'ordre n'est pas connu
+        """
+        return self.__tri
+
+    @property
+    def partition(self):
+        """Variables dont les observations de mêmes valeurs sont consécutives
+
+        Returns
+        -------
+        tuple[str]
+            Variables de la partition, () si inconnue
+        """
+        return self.__partition
+
+    def decrit_ordre(self, tri=None, partition=None):
+        """Description de l'ordre des observations
+
+        Parameters
+        ----------
+        tri : list[str], optional
+            Variables selon lesquelles les observations sont triées, by
+            default None (inchangé)
+        partition : list[str], optional
+            Variables dont les observations de mêmes valeurs sont
+            consécutives, by default None (inchangée)
+
+        Returns
+        -------
+        Dataset
+            Le jeu de données lui-même
+        """
+        if tri is not None:
+            self.__tri = tuple(tri)
+        if partition is not None:
+            self.__partition = tuple(partition)
+        return self
+
+    def reprend_ordre(self, dataset, tri=True, partition=True):
+        """Reprise de l'ordre décrit pour un jeu de données dont les
+        observations ont gardé leur ordre relatif
+
+        Le tri n'est repris que pour ses premières variables toujours
+        présentes, la partition que si toutes ses variables sont présentes ;
+        un ordre déjà décrit n'est pas remplacé.
+
+        Parameters
+        ----------
+        dataset : Dataset
+            Jeu de données d'origine
+        tri : bool, optional
+            Vrai si le tri est conservé, by default True
+        partition : bool, optional
+            Vrai si la partition est conservée, by default True
+
+        Returns
+        -------
+        Dataset
+            Le jeu de données lui-même
+
+        Examples
+        --------
+        >>> d = Dataset(["region", "date"], [], tri=["region", "date"])
+        >>> Dataset(["date"], []).reprend_ordre(d).tri
+        ()
+        >>> Dataset(["region"], []).reprend_ordre(d).tri
+        ('region',)
+        """
+        header = set(self.header)
+        if tri and not self.__tri:
+            prefixe = []
+            for var in dataset.tri:
+                if var not in header:
+                    break
+                prefixe.append(var)
+            self.__tri = tuple(prefixe)
+        if partition and not self.__partition and header.issuperset(dataset.partition):
+            self.__partition = dataset.partition
+        return self
+
+    def groupe_contigu(self, variables):
+        """Les observations de mêmes valeurs des variables sont-elles consécutives ?
+
+        C'est le cas si les variables sont celles de la partition, ou les
+        premières variables du tri.
+
+        Parameters
+        ----------
+        variables : list[str]
+            Variables définissant les groupes
+
+        Returns
+        -------
+        bool
+            Vrai si chaque groupe occupe des positions consécutives
+        """
+        variables = set(variables)
+        return bool(variables) and (variables == set(self.__partition) or
+                                    variables == set(self.__tri[:len(variables)]))
+
+    def __len__(self):
+        """Nombre d'observations du jeu de données
+
+        Examples
+        --------
+        >>> d = Dataset(["nom", "age"], [{"nom" : "Anne", "age" : 23}, {"nom" : "Thomas", "age" : 17}])
+        >>> len(d)
+        2
+        """
+        return len(self.__body)
+
+    def valeurs(self, variable):
+        """Valeurs d'une variable du jeu de données
+
+        Parameters
+        ----------
+        variable : str
+            Nom de la variable
+
+        Returns
+        -------
+        list
+            Valeurs de la variable (None si absente d'une observation)
+
+        Examples
+        --------
+        >>> d = Dataset(["nom", "age"], [{"nom" : "Anne", "age" : 23}, {"nom" : "Thomas"}])
+        >>> d.valeurs("age")
+        [23, None]
+        """
+        return [row.get(variable) for row in self.__body]
+
+    @staticmethod
+    def __cle_index(variables, genre, typ):
+        if genre not in ('hachage', 'tri'):
+            raise ValueError("Genre d'index inconnu : " + str(genre))
+        if isinstance(variables, str):
+            variables = [variables]
+        if genre == 'tri' and len(variables) != 1:
+            raise ValueError("Un index trié porte sur une seule variable")
+        return (tuple(variables), genre, typ if genre == 'tri' else None)
+
+    def indexe(self, variables, genre='hachage', typ='str'):
+        """Index secondaire sur une ou plusieurs variables
+
+        L'index est construit à la première demande puis conservé par le jeu
+        de données. Il décrit les valeurs au moment de sa construction : une
+        transformation qui modifie ces valeurs sur place l'oublie (voir
+        oublie_index).
+
+        Parameters
+        ----------
+        variables : str ou list[str]
+            Variable(s) indexée(s)
+        genre : str, optional
+            'hachage' (égalités, jointures) ou 'tri' (intervalles, une seule
+            variable), by default 'hachage'
+        typ : str, optional
+            Pour un index trié, type dans lequel les valeurs sont comparées
+            ('int', 'float', 'str' ou 'date'), by default 'str'
+
+        Returns
+        -------
+        IndexHachage ou IndexTrie
+            Index des variables
+
+        Examples
+        --------
+        >>> d = Dataset(["date"], [{"date" : "2022-01-02"}, {"date" : "2022-01-01"}])
+        >>> d.indexe("date", "tri", "date") is d.index("date", "tri", "date")
+        True
+        """
+        cle = self.__cle_index(variables, genre, typ)
+        index = self.__index.get(cle)
+        if index is None:
+            if genre == 'tri':
+                index = IndexTrie(self.valeurs(cle[0][0]), typ)
+            else:
+                index = IndexHachage([self.valeurs(var) for var in cle[0]])
+            self.__index[cle] = index
+        return index
+
+    def index(self, variables, genre='hachage', typ='str'):
+        """Index secondaire déjà construit (voir indexe)
+
+        Returns
+        -------
+        IndexHachage, IndexTrie ou None
+            Index des variables, None s'il n'a pas été construit
+        """
+        return self.__index.get(self.__cle_index(variables, genre, typ))
+
+    def reprend_index(self, dataset, exclues=()):
+        """Reprise des index d'un jeu de données ayant les mêmes observations
+
+        À utiliser par les transformations qui conservent les observations et
+        leur ordre : les index des variables conservées et non modifiées
+        restent valides.
+
+        Parameters
+        ----------
+        dataset : Dataset
+            Jeu de données d'origine
+        exclues : iterable[str], optional
+            Variables dont les valeurs ont changé, by default ()
+
+        Returns
+        -------
+        Dataset
+            Le jeu de données lui-même
+        """
+        exclues = set(exclues)
+        header = set(self.header)
+        for cle, index in dataset.__index.items():
+            if header.issuperset(cle[0]) and exclues.isdisjoint(cle[0]):
+                self.__index.setdefault(cle, index)
+        return self
+
+    def oublie_index(self, variables=None):
+        """Suppression des index portant sur des variables
+
+        Parameters
+        ----------
+        variables : iterable[str], optional
+            Variables dont les valeurs vont changer, by default None (tous les index)
+        """
+        if variables is None:
+            self.__index = {}
+            return
+        variables = set(variables)
+        self.__index = {cle: index for cle, index in self.__index.items()
+                        if variables.isdisjoint(cle[0])}
+
+    @staticmethod
+    def concatene(lots):
+        """Concaténation de plusieurs jeux de données
+
+        Les variables du résultat sont l'union des variables des jeux de
+        données, dans leur ordre d'apparition.
+
+        Parameters
+        ----------
+        lots : iterable[Dataset]
+            Jeux de données à concaténer
+
+        Returns
+        -------
+        Dataset
+            Jeu de données contenant toutes les observations
+
+        Examples
+        --------
+        >>> a = Dataset(["nom"], [{"nom" : "Anne"}])
+        >>> b = Dataset(["nom", "age"], [{"nom" : "Thomas", "age" : 17}])
+        >>> c = Dataset.concatene([a, b])
+        >>> c.header, len(c)
+        (['nom', 'age'], 2)
+        """
+        header = {}
+        body = []
+        for lot in lots:
+            header.update(dict.fromkeys(lot.header))
+            body.extend(lot.body)
+        return Dataset(list(header), body)
+
     def __str__(self):
         """Informations sur le jeu de données.
 
@@ -108,12 +408,12 @@ class Dataset:
           Variables  : ['nom', 'age']
         """
         nrow, ncol = 0, 0
-        if self.__body:
-            nrow = len(self.__body)
-            ncol = len(self.__header)
+        if len(self) > 0:
+            nrow = len(self)
+            ncol = len(self.header)
         dim = "  Dimensions : " + \
             str(nrow)+" observations et "+str(ncol)+" variables"
-        var = "\n  Variables  : "+str(self.__header)
+        var = "\n  Variables  : "+str(self.header)
         return dim+var
 
 
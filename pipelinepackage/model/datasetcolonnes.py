@@ -0,0 +1,244 @@
+""" Module datasetcolonnes
+
+Modélisation d'un jeu de données stocké par colonnes typées.
+
+Chaque variable est conservée dans une Colonne (tableau contigu de flottants,
+d'entiers, de dates ou de codes de modalités) au lieu d'un dictionnaire par
+observation. Les propriétés header et body restent disponibles pour les
+transformations travaillant ligne à ligne.
+
+Examples
+--------
+>>> d = Dataset(['region', 't'], [{'region': 'Bretagne', 't': '284.45'}, {'region': 'Corse', 't': 'mq'}])
+>>> c = DatasetColonnes.depuis_dataset(d)
+>>> print(c)
+  Dimensions : 2 observations et 2 variables
+  Variables  : ['region', 't']
+>>> c.body
+[{'region': 'Bretagne', 't': 284.45}, {'region': 'Corse', 't': None}]
+"""
+from pipelinepackage.model.colonne import Colonne, VALMQ
+from pipelinepackage.model.dataset import Dataset
+
+
+class DatasetColonnes(Dataset):
+    """ Classe DatasetColonnes
+
+    Modélise un jeu de données stocké par colonnes typées
+
+    Attributes
+    ----------
+    colonnes : list[Colonne]
+        Variables du jeu de données (toutes de même longueur)
+
+    Examples
+    --------
+    >>> from pipelinepackage.model.colonne import Colonne
+    >>> c = DatasetColonnes([Colonne.depuis_valeurs('nom', ['Anne', 'Thomas']), Colonne.depuis_valeurs('age', ['23', '17'])])
+    >>> c.header
+    ['nom', 'age']
+    >>> c.colonne('age').type
+    'int'
+    """
+
+    def __init__(self, colonnes):
+        """Constructeur
+
+        Parameters
+        ----------
+        colonnes : list[Colonne]
+            Variables du jeu de données (toutes de même longueur)
+        """
+        super().__init__([col.nom for col in colonnes], None)
+        self.__colonnes = {col.nom: col for col in colonnes}
+        self.__nrow = len(colonnes[0]) if colonnes else 0
+        self.__body = None
+
+    @staticmethod
+    def depuis_dataset(dataset, types=None, valmq=VALMQ):
+        """Conversion d'un jeu de données en jeu de données par colonnes
+
+        Parameters
+        ----------
+        dataset : Dataset
+            Jeu de données à convertir
+        types : dict, optional
+            Types imposés à certaines variables (les autres sont déduits
+            des valeurs), by default None
+        valmq : tuple, optional
+            Valeurs considérées comme manquantes, by default (None, '', 'mq')
+
+        Returns
+        -------
+        DatasetColonnes
+            Jeu de données par colonnes
+
+        Examples
+        --------
+        >>> d = Dataset(['numer_sta', 'u'], [{'numer_sta': '07005', 'u': '93'}])
+        >>> c = DatasetColonnes.depuis_dataset(d, {'u': 'float'})
+        >>> [(col.nom, col.type) for col in c.colonnes]
+        [('numer_sta', 'str'), ('u', 'float')]
+        """
+        if isinstance(dataset, DatasetColonnes):
+            return dataset
+        types = types or {}
+        return DatasetColonnes([Colonne.depuis_valeurs(var, dataset.valeurs(var),
+                                                       types.get(var), valmq)
+                                for var in dataset.header])
+
+    @property
+    def colonnes(self):
+        """Variables du jeu de données
+
+        Returns
+        -------
+        list[Colonne]
+            Colonnes du jeu de données
+        """
+        return list(self.__colonnes.values())
+
+    def colonne(self, variable):
+        """Colonne d'une variable
+
+        Parameters
+        ----------
+        variable : str
+            Nom de la variable
+
+        Returns
+        -------
+        Colonne
+            Colonne typée de la variable
+        """
+        return self.__colonnes[variable]
+
+    def valeurs(self, variable):
+        """Valeurs d'une variable du jeu de données
+
+        Parameters
+        ----------
+        variable : str
+            Nom de la variable
+
+        Returns
+        -------
+        list
+            Valeurs typées de la variable (None si manquante)
+
+        Examples
+        --------
+        >>> d = DatasetColonnes.depuis_dataset(Dataset(['t'], [{'t': '1.5'}, {'t': 'mq'}]))
+        >>> d.valeurs('t')
+        [1.5, None]
+        """
+        if variable not in self.__colonnes:
+            return [None] * self.__nrow
+        return self.__colonnes[variable].valeurs()
+
+    @property
+    def body(self):
+        """Observations du jeu de données
+
+        Les observations sont construites à la première demande puis
+        conservées. Les modifications faites sur ces dictionnaires ne sont pas
+        répercutées dans les colonnes.
+
+        Returns
+        -------
+        list[dict]
+            Observations du jeu de données
+        """
+        if self.__body is None:
+            header = self.header
+            colonnes = [self.__colonnes[var].valeurs() for var in header]
+            self.__body = [dict(zip(header, vals)) for vals in zip(*colonnes)]
+        return self.__body
+
+    def __len__(self):
+        return self.__nrow
+
+    def prend(self, indices):
+        """Sélection d'observations par leur position
+
+        Parameters
+        ----------
+        indices : list[int]
+            Positions des observations à conserver
+
+        Returns
+        -------
+        DatasetColonnes
+            Jeu de données ne contenant que les observations sélectionnées
+
+        Examples
+        --------
+        >>> d = DatasetColonnes.depuis_dataset(Dataset(['t'], [{'t': '1.5'}, {'t': '2.5'}, {'t': '3.5'}]))
+        >>> d.prend([0, 2]).valeurs('t')
+        [1.5, 3.5]
+        """
+        return DatasetColonnes([col.prend(indices) for col in self.__colonnes.values()])
+
+    def tranche(self, debut, fin):
+        """Sélection d'observations consécutives
+
+        Parameters
+        ----------
+        debut : int
+            Position de la première observation
+        fin : int
+            Position suivant la dernière observation
+
+        Returns
+        -------
+        DatasetColonnes
+            Jeu de données ne contenant que les observations debut à fin (exclue)
+
+        Examples
+        --------
+        >>> d = DatasetColonnes.depuis_dataset(Dataset(['t'], [{'t': '1.5'}, {'t': '2.5'}, {'t': '3.5'}]))
+        >>> d.tranche(1, 3).valeurs('t')
+        [2.5, 3.5]
+        """
+        return DatasetColonnes([col.tranche(debut, fin) for col in self.__colonnes.values()])
+
+    def remplace(self, colonne):
+        """Ajout ou remplacement d'une colonne
+
+        Les autres colonnes sont partagées avec le jeu de données d'origine.
+
+        Parameters
+        ----------
+        colonne : Colonne
+            Nouvelle colonne (de même longueur que le jeu de données)
+
+        Returns
+        -------
+        DatasetColonnes
+            Jeu de données contenant la nouvelle colonne
+
+        Examples
+        --------
+        >>> from pipelinepackage.model.colonne import Colonne
+        >>> d = DatasetColonnes.depuis_dataset(Dataset(['t'], [{'t': '1.5'}, {'t': '2.5'}]))
+        >>> d.remplace(Colonne.depuis_valeurs('u', [1, 2])).header
+        ['t', 'u']
+        """
+        colonnes = dict(self.__colonnes)
+        colonnes[colonne.nom] = colonne
+        return DatasetColonnes(list(colonnes.values()))
+
+    def vers_dataset(self):
+        """Conversion en jeu de données stocké par observations
+
+        Returns
+        -------
+        Dataset
+            Jeu de données avec une liste de dictionnaires
+        """
+        return Dataset(list(self.header), self.body)
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod(verbose=True)
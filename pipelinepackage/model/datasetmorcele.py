@@ -0,0 +1,99 @@
+""" Module datasetmorcele
+
+Modélisation d'un jeu de données formé de plusieurs morceaux.
+
+Les morceaux (par exemple un par fichier importé) sont conservés tels quels :
+la concaténation ne copie aucune observation. La propriété body construit, à
+la première demande, une liste qui référence les observations des morceaux.
+
+Examples
+--------
+>>> a = Dataset(['nom'], [{'nom': 'Anne'}])
+>>> b = Dataset(['nom', 'age'], [{'nom': 'Thomas', 'age': 17}, {'nom': 'Chloe', 'age': 7}])
+>>> d = DatasetMorcele([a, b])
+>>> print(d)
+  Dimensions : 3 observations et 2 variables
+  Variables  : ['nom', 'age']
+>>> d.valeurs('age')
+[None, 17, 7]
+"""
+from itertools import chain
+from pipelinepackage.model.dataset import Dataset
+
+
+class DatasetMorcele(Dataset):
+    """ Classe DatasetMorcele
+
+    Modélise un jeu de données formé de plusieurs morceaux
+
+    Attributes
+    ----------
+    morceaux : list[Dataset]
+        Jeux de données successifs (les variables du jeu de données sont
+        l'union de leurs variables, dans l'ordre d'apparition)
+    """
+
+    def __init__(self, morceaux):
+        """Constructeur
+
+        Parameters
+        ----------
+        morceaux : list[Dataset]
+            Jeux de données successifs
+        """
+        header = {}
+        for morceau in morceaux:
+            header.update(dict.fromkeys(morceau.header))
+        super().__init__(list(header), None)
+        self.__morceaux = list(morceaux)
+        self.__body = None
+
+    @property
+    def morceaux(self):
+        """Jeux de données successifs
+
+        Returns
+        -------
+        list[Dataset]
+            Morceaux du jeu de données
+        """
+        return self.__morceaux
+
+    @property
+    def body(self):
+        """Observations du jeu de données
+
+        La liste est construite à la première demande puis conservée ; elle
+        contient les observations des morceaux elles-mêmes (sans copie).
+
+        Returns
+        -------
+        list[dict]
+            Observations du jeu de données
+        """
+        if self.__body is None:
+            self.__body = list(chain.from_iterable(morceau.body for morceau in self.__morceaux))
+        return self.__body
+
+    def __len__(self):
+        return sum(len(morceau) for morceau in self.__morceaux)
+
+    def valeurs(self, variable):
+        """Valeurs d'une variable du jeu de données
+
+        Parameters
+        ----------
+        variable : str
+            Nom de la variable
+
+        Returns
+        -------
+        list
+            Valeurs de la variable (None si absente d'une observation)
+        """
+        return [val for morceau in self.__morceaux for val in morceau.valeurs(variable)]
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod(verbose=True)
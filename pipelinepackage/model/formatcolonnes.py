@@ -0,0 +1,321 @@
+"""
+module formatcolonnes
+
+Format binaire par colonnes utilisé par ExportCol et ImportCol (fichiers .col).
+
+Un fichier contient :
+
+- l'en-tête MAGIC ;
+- pour chaque groupe de lignes et chaque colonne, le tableau des valeurs
+  typées (voir le module colonne) puis, s'il y a des valeurs manquantes,
+  leur masque, chacun compressé avec le codec choisi pour la colonne ;
+- un pied de fichier JSON décrivant les colonnes (nom, type, modalités des
+  variables de type 'str') et les groupes (emplacement des blocs, nombre de
+  valeurs manquantes, minimum et maximum de chaque colonne) ;
+- la taille du pied (8 octets) et MAGIC.
+
+Les statistiques du pied permettent d'écarter un groupe entier sans le
+décompresser (voir Predicat.peut_correspondre).
+
+Examples
+--------
+>>> import os, tempfile
+>>> from pipelinepackage.model.dataset import Dataset
+>>> dossier = tempfile.TemporaryDirectory()
+>>> d = DatasetColonnes.depuis_dataset(Dataset(['region', 't'], [{'region': 'Bretagne', 't': '280.5'}, {'region': 'Corse', 't': 'mq'}, {'region': 'Corse', 't': '290'}]))
+>>> ecrit(os.path.join(dossier.name, 'exemple.col'), d, taille_groupe=2)
+>>> with FichierColonnes(os.path.join(dossier.name, 'exemple.col')) as fichier:
+...     print(len(fichier.groupes), fichier.bornes(0), fichier.lit(1, 't').valeurs())
+2 {'region': ('Bretagne', 'Corse'), 't': (280.5, 280.5)} [290.0]
+>>> dossier.cleanup()
+"""
+import bz2
+import json
+import lzma
+import mmap
+import struct
+import sys
+import zlib
+from array import array
+from datetime import datetime, timedelta
+from pipelinepackage.model.colonne import Colonne, TYPECODES
+from pipelinepackage.model.datasetcolonnes import DatasetColonnes
+
+MAGIC = b'PPCOL1\n\x00'
+
+# compression et décompression de chaque codec
+CODECS = {'aucun': (bytes, bytes),
+          'zlib': (zlib.compress, zlib.decompress),
+          'bz2': (bz2.compress, bz2.decompress),
+          'lzma': (lzma.compress, lzma.decompress)}
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _octets(donnees):
+    """Représentation petit-boutiste d'un tableau"""
+    if sys.byteorder == 'big':
+        donnees = array(donnees.typecode, donnees)
+        donnees.byteswap()
+    return donnees.tobytes()
+
+
+def _statistiques(col, debut, fin):
+    """Nombre de valeurs manquantes, minimum et maximum d'une tranche de colonne"""
+    donnees = col.donnees[debut:fin]
+    nulls = col.nulls[debut:fin] if col.nulls is not None else None
+    nb_nulls = nulls.count(1) if nulls is not None else 0
+    if col.type == 'str':
+        presentes = [col.modalites[code] for code in set(donnees) if code >= 0]
+    elif nb_nulls:
+        presentes = [val for val, mq in zip(donnees, nulls) if not mq]
+    else:
+        presentes = donnees
+    if len(presentes) == 0:
+        return nb_nulls, None, None
+    return nb_nulls, min(presentes), max(presentes)
+
+
+def ecrit(fichier, dataset, taille_groupe=65536, codec='zlib', codecs=None):
+    """Écriture d'un jeu de données par colonnes dans un fichier .col
+
+    Parameters
+    ----------
+    fichier : str
+        Chemin du fichier à écrire
+    dataset : DatasetColonnes
+        Jeu de données à écrire
+    taille_groupe : int, optional
+        Nombre de lignes par groupe, by default 65536
+    codec : str, optional
+        Codec de compression des colonnes ('aucun', 'zlib', 'bz2' ou 'lzma'),
+        by default 'zlib'
+    codecs : dict, optional
+        Codec propre à certaines colonnes, by default None
+    """
+    codecs = codecs or {}
+    colonnes = dataset.colonnes
+    nlignes = len(dataset)
+    pied = {'version': 1, 'nlignes': nlignes,
+            'colonnes': [{'nom': col.nom, 'type': col.type, 'modalites': col.modalites}
+                         for col in colonnes],
+            'groupes': []}
+
+    with open(fichier, 'wb') as sortie:
+        sortie.write(MAGIC)
+
+        def bloc(octets, compresse):
+            position = sortie.tell()
+            sortie.write(compresse(octets))
+            return [position, sortie.tell() - position]
+
+        for debut in range(0, nlignes, taille_groupe):
+            fin = min(debut + taille_groupe, nlignes)
+            groupe = {'nlignes': fin - debut, 'colonnes': []}
+            for col in colonnes:
+                nom_codec = codecs.get(col.nom, codec)
+                compresse = CODECS[nom_codec][0]
+                nb_nulls, minimum, maximum = _statistiques(col, debut, fin)
+                groupe['colonnes'].append({
+                    'codec': nom_codec,
+                    'donnees': bloc(_octets(col.donnees[debut:fin]), compresse),
+                    'nulls': bloc(bytes(col.nulls[debut:fin]), compresse) if nb_nulls else None,
+                    'nb_nulls': nb_nulls, 'min': minimum, 'max': maximum})
+            pied['groupes'].append(groupe)
+
+        octets = json.dumps(pied).encode('utf-8')
+        sortie.write(octets)
+        sortie.write(struct.pack('<Q', len(octets)))
+        sortie.write(MAGIC)
+
+
+class FichierColonnes:
+    """Classe FichierColonnes
+
+    Lecture d'un fichier .col projeté en mémoire (mmap) : seuls les blocs
+    demandés sont lus et décompressés.
+
+    Attributes
+    ----------
+    fichier : str
+        Chemin du fichier
+    colonnes : list[dict]
+        Description des colonnes (nom, type, modalités)
+    groupes : list[dict]
+        Description des groupes de lignes
+    """
+
+    def __init__(self, fichier):
+        """Constructeur
+
+        Parameters
+        ----------
+        fichier : str
+            Chemin du fichier
+        """
+        self.__fichier = fichier
+        self.__flux = open(fichier, 'rb')
+        self.__mmap = mmap.mmap(self.__flux.fileno(), 0, access=mmap.ACCESS_READ)
+        taille = len(self.__mmap)
+        if self.__mmap[:len(MAGIC)] != MAGIC or self.__mmap[taille-len(MAGIC):] != MAGIC:
+            self.ferme()
+            raise ValueError(fichier + " n'est pas un fichier .col")
+        fin_pied = taille - len(MAGIC) - 8
+        (taille_pied,) = struct.unpack('<Q', self.__mmap[fin_pied:fin_pied+8])
+        pied = json.loads(self.__mmap[fin_pied-taille_pied:fin_pied].decode('utf-8'))
+        self.__colonnes = pied['colonnes']
+        self.__groupes = pied['groupes']
+        self.__positions = {col['nom']: k for k, col in enumerate(self.__colonnes)}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.ferme()
+
+    def ferme(self):
+        """Fermeture du fichier"""
+        self.__mmap.close()
+        self.__flux.close()
+
+    @property
+    def fichier(self):
+        """Chemin du fichier"""
+        return self.__fichier
+
+    @property
+    def colonnes(self):
+        """Description des colonnes (nom, type, modalités)"""
+        return self.__colonnes
+
+    @property
+    def groupes(self):
+        """Description des groupes de lignes"""
+        return self.__groupes
+
+    def bornes(self, groupe):
+        """Minimum et maximum de chaque colonne d'un groupe
+
+        Les dates sont rendues sous forme de datetime, comme attendu par
+        Predicat.peut_correspondre. Les colonnes sans valeur ne sont pas bornées.
+
+        Parameters
+        ----------
+        groupe : int
+            Numéro du groupe
+
+        Returns
+        -------
+        dict
+            Valeurs minimale et maximale (min, max) de chaque colonne
+        """
+        bornes = {}
+        for col, stats in zip(self.__colonnes, self.__groupes[groupe]['colonnes']):
+            if stats['min'] is None:
+                continue
+            bas, haut = stats['min'], stats['max']
+            if col['type'] == 'date':
+                bas, haut = _EPOCH + timedelta(seconds=bas), _EPOCH + timedelta(seconds=haut)
+            bornes[col['nom']] = (bas, haut)
+        return bornes
+
+    def __bloc(self, position, decompresse):
+        debut, taille = position
+        return decompresse(self.__mmap[debut:debut+taille])
+
+    def lit(self, groupe, variable, modalites=None):
+        """Lecture d'une colonne d'un groupe
+
+        Parameters
+        ----------
+        groupe : int
+            Numéro du groupe
+        variable : str
+            Nom de la variable
+        modalites : list[str], optional
+            Liste de modalités à partager entre les groupes d'une même colonne
+            (type 'str'), by default None (celle du pied de fichier)
+
+        Returns
+        -------
+        Colonne
+            Valeurs typées de la variable dans le groupe
+        """
+        k = self.__positions[variable]
+        col = self.__colonnes[k]
+        stats = self.__groupes[groupe]['colonnes'][k]
+        decompresse = CODECS[stats['codec']][1]
+        donnees = array(TYPECODES[col['type']])
+        donnees.frombytes(self.__bloc(stats['donnees'], decompresse))
+        if sys.byteorder == 'big':
+            donnees.byteswap()
+        nulls = None
+        if stats['nulls'] is not None:
+            nulls = bytearray(self.__bloc(stats['nulls'], decompresse))
+        if col['type'] == 'str' and modalites is None:
+            modalites = col['modalites']
+        return Colonne(variable, col['type'], donnees, nulls,
+                       modalites if col['type'] == 'str' else None)
+
+    def vide(self, variable):
+        """Colonne sans valeur d'une variable (aucun groupe retenu)"""
+        col = self.__colonnes[self.__positions[variable]]
+        return Colonne(variable, col['type'], array(TYPECODES[col['type']]), None,
+                       col['modalites'])
+
+
+def lit(fichier, variables=None, predicat=None, constantes=None):
+    """Lecture d'un fichier .col
+
+    Parameters
+    ----------
+    fichier : str
+        Chemin du fichier
+    variables : list[str], optional
+        Variables à lire, by default None (toutes)
+    predicat : Predicat, optional
+        Condition que doivent vérifier les observations : les groupes dont
+        les statistiques ne peuvent pas la vérifier ne sont pas lus, by default None
+    constantes : dict, optional
+        Variables de partition, ajoutées (type 'str') si elles ne sont pas
+        dans le fichier, by default None
+
+    Returns
+    -------
+    DatasetColonnes
+        Observations retenues
+    """
+    with FichierColonnes(fichier) as source:
+        presentes = [col['nom'] for col in source.colonnes]
+        constantes = {var: val for var, val in (constantes or {}).items()
+                      if var not in presentes}
+        noms = presentes + list(constantes)
+        if variables is not None:
+            noms = [var for var in variables if var in noms]
+        lues = list(noms)
+        if predicat is not None:
+            lues += [var for var in predicat.variables()
+                     if var not in lues and (var in presentes or var in constantes)]
+        groupes = [k for k in range(len(source.groupes))
+                   if predicat is None or predicat.peut_correspondre(source.bornes(k))]
+        nlignes = sum(source.groupes[k]['nlignes'] for k in groupes)
+
+        colonnes = []
+        for var in lues:
+            if var in constantes:
+                colonnes.append(Colonne.depuis_valeurs(var, [constantes[var]] * nlignes, 'str'))
+                continue
+            morceaux = [source.lit(k, var) for k in groupes]
+            colonnes.append(Colonne.concatene(morceaux) if morceaux else source.vide(var))
+
+    dataset = DatasetColonnes(colonnes)
+    if predicat is not None:
+        dataset = dataset.prend([i for i, ok in enumerate(predicat.masque(dataset)) if ok])
+    if lues != noms:
+        dataset = DatasetColonnes([dataset.colonne(var) for var in noms])
+    return dataset
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod(verbose=True)
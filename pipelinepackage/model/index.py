@@ -0,0 +1,261 @@
+"""
+module index
+
+Index secondaires d'un jeu de données.
+
+Un index associe aux valeurs d'une ou plusieurs variables les positions des
+observations qui les prennent. Il est construit une fois (voir
+Dataset.indexe) et conservé par le jeu de données : les recherches répétées
+(sélection d'une région, fenêtre de dates, sonde d'une jointure) ne
+parcourent plus toutes les observations.
+
+- IndexHachage : table de hachage, pour les égalités (et les jointures) ;
+- IndexTrie : valeurs converties dans leur type et triées, pour les
+  intervalles (recherche dichotomique).
+
+Les positions rendues sont toujours dans l'ordre des observations.
+
+Examples
+--------
+>>> h = IndexHachage([['Bretagne', 'Corse', 'Bretagne', None]])
+>>> h.positions([('Bretagne',)])
+[0, 2]
+>>> t = IndexTrie(['3', 'mq', '1', '2'], 'int')
+>>> t.intervalle(2, 3)
+[0, 3]
+"""
+from bisect import bisect_left, bisect_right
+from itertools import chain
+from pipelinepackage.model.colonne import CONVERSIONS, VALMQ
+
+
+class IndexHachage:
+    """Classe IndexHachage
+
+    Index d'égalité sur une ou plusieurs variables. Les clés sont les tuples
+    des valeurs des variables ; les clés contenant une valeur manquante (None)
+    ne sont pas indexées.
+
+    Attributes
+    ----------
+    table : dict
+        Positions (croissantes) des observations de chaque clé
+    """
+
+    def __init__(self, colonnes):
+        """Constructeur
+
+        Parameters
+        ----------
+        colonnes : list[list]
+            Valeurs de chacune des variables indexées
+        """
+        table = {}
+        for i, cle in enumerate(zip(*colonnes)):
+            if None not in cle:
+                positions = table.get(cle)
+                if positions is None:
+                    table[cle] = [i]
+                else:
+                    positions.append(i)
+        self.__table = table
+        self.__nb_variables = len(colonnes)
+
+    @property
+    def table(self):
+        """Positions des observations de chaque clé"""
+        return self.__table
+
+    def __len__(self):
+        return len(self.__table)
+
+    def positions(self, cles):
+        """Positions des observations prenant l'une des clés
+
+        Parameters
+        ----------
+        cles : list[tuple]
+            Clés recherchées
+
+        Returns
+        -------
+        list[int]
+            Positions croissantes des observations
+        """
+        trouvees = [self.__table[cle] for cle in set(cles) if cle in self.__table]
+        if len(trouvees) == 1:
+            return trouvees[0]
+        return sorted(chain.from_iterable(trouvees))
+
+    def cherche(self, comparaison):
+        """Positions des observations vérifiant une comparaison
+
+        Parameters
+        ----------
+        comparaison : Comparaison
+            Comparaison portant sur la variable indexée
+
+        Returns
+        -------
+        list[int] ou None
+            Positions croissantes des observations, None si l'index ne permet
+            pas de répondre (opérateur autre que '=' ou 'in', type autre que 'str')
+
+        Examples
+        --------
+        >>> from pipelinepackage.model.predicat import Comparaison
+        >>> h = IndexHachage([['Bretagne', 'Corse', 'Bretagne']])
+        >>> h.cherche(Comparaison('region', 'in', ['Corse', 'Normandie']))
+        [1]
+        """
+        if self.__nb_variables != 1 or comparaison.type != 'str':
+            return None
+        if comparaison.operateur == '=':
+            return self.positions([(comparaison.valeur,)])
+        if comparaison.operateur == 'in':
+            return self.positions([(val,) for val in comparaison.valeur])
+        return None
+
+
+class IndexTrie:
+    """Classe IndexTrie
+
+    Index d'intervalle sur une variable : valeurs converties dans leur type
+    ('int', 'float', 'str' ou 'date', en secondes) et triées. Les valeurs
+    manquantes ne sont pas indexées.
+
+    Attributes
+    ----------
+    type : str
+        Type dans lequel les valeurs sont comparées
+    cles : list
+        Valeurs converties, triées
+    contigu : bool
+        Vrai si les observations sont déjà triées selon la variable (sans
+        valeur manquante) : un intervalle correspond alors à des
+        observations consécutives
+    """
+
+    def __init__(self, valeurs, typ='str', valmq=VALMQ):
+        """Constructeur
+
+        Parameters
+        ----------
+        valeurs : list
+            Valeurs de la variable
+        typ : str, optional
+            Type de la variable, by default 'str'
+        valmq : tuple, optional
+            Valeurs considérées comme manquantes (seulement None pour le type
+            'str', comme pour Comparaison), by default (None, '', 'mq')
+        """
+        conv = CONVERSIONS[typ]
+        manquantes = frozenset((None,) if typ == 'str' else valmq)
+        paires = [(conv(val), i) for i, val in enumerate(valeurs) if val not in manquantes]
+        contigu = len(paires) == len(valeurs) and \
+            all(paires[k][0] <= paires[k+1][0] for k in range(len(paires) - 1))
+        if not contigu:
+            paires.sort()
+        self.__type = typ
+        self.__cles = [cle for cle, _ in paires]
+        self.__positions = [i for _, i in paires]
+        self.__contigu = contigu
+
+    @property
+    def type(self):
+        """Type dans lequel les valeurs sont comparées"""
+        return self.__type
+
+    @property
+    def cles(self):
+        """Valeurs converties, triées"""
+        return self.__cles
+
+    @property
+    def contigu(self):
+        """Vrai si les observations sont triées selon la variable"""
+        return self.__contigu
+
+    def __len__(self):
+        return len(self.__cles)
+
+    def intervalle(self, bas=None, haut=None, bas_inclus=True, haut_inclus=True):
+        """Positions des observations dont la valeur est dans un intervalle
+
+        Parameters
+        ----------
+        bas : optional
+            Borne inférieure (déjà convertie), by default None (pas de borne)
+        haut : optional
+            Borne supérieure (déjà convertie), by default None (pas de borne)
+        bas_inclus : bool, optional
+            Borne inférieure incluse, by default True
+        haut_inclus : bool, optional
+            Borne supérieure incluse, by default True
+
+        Returns
+        -------
+        range ou list[int]
+            Positions croissantes des observations (un range si l'index est
+            contigu)
+
+        Examples
+        --------
+        >>> IndexTrie([1, 2, 2, 5], 'int').intervalle(2, 5, haut_inclus=False)
+        range(1, 3)
+        """
+        cles = self.__cles
+        debut = 0 if bas is None else \
+            (bisect_left if bas_inclus else bisect_right)(cles, bas)
+        fin = len(cles) if haut is None else \
+            (bisect_right if haut_inclus else bisect_left)(cles, haut)
+        if fin <= debut:
+            return []
+        if self.__contigu:
+            return range(debut, fin)
+        return sorted(self.__positions[debut:fin])
+
+    def cherche(self, comparaison):
+        """Positions des observations vérifiant une comparaison
+
+        Parameters
+        ----------
+        comparaison : Comparaison
+            Comparaison portant sur la variable indexée
+
+        Returns
+        -------
+        range, list[int] ou None
+            Positions croissantes des observations, None si l'index ne permet
+            pas de répondre (type différent, opérateur '!=', 'null' ou 'notnull')
+
+        Examples
+        --------
+        >>> from pipelinepackage.model.predicat import Comparaison
+        >>> t = IndexTrie(['2022-01-02', '2022-01-01', '2022-01-03'], 'date')
+        >>> t.cherche(Comparaison('date', '>=', '2022-01-02', 'date'))
+        [0, 2]
+        """
+        if comparaison.type != self.__type:
+            return None
+        conv = CONVERSIONS[self.__type]
+        oper = comparaison.operateur
+        if oper == 'between':
+            bas, haut = (conv(val) for val in comparaison.valeur)
+            return self.intervalle(bas, haut)
+        if oper == 'in':
+            return sorted(set(chain.from_iterable(
+                self.intervalle(cible, cible) for cible in map(conv, comparaison.valeur))))
+        if oper not in ('=', '<', '<=', '>', '>='):
+            return None
+        cible = conv(comparaison.valeur)
+        if oper == '=':
+            return self.intervalle(cible, cible)
+        if oper in ('<', '<='):
+            return self.intervalle(haut=cible, haut_inclus=oper == '<=')
+        return self.intervalle(bas=cible, bas_inclus=oper == '>=')
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod(verbose=True)
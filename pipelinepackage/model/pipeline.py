@@ -9,6 +9,33 @@ Examples
 >>> a = Pipeline([ImportJsonGz('data/input/2022-01.json.gz'), SelectionVariables(['region','consommation_brute_electricite_rte']), ExportCsvGz(filename='conso_elec.csv.gz')])
 >>> a.run()
 """
+from itertools import tee
+from pipelinepackage.model.dataset import Dataset
+from pipelinepackage.model.plan import Plan
+
+
+def _applique(transfo, dataset):
+    """Application d'une transformation, l'ordre décrit pour le jeu de
+    données (Dataset.tri, Dataset.partition) étant repris s'il est conservé"""
+    return transfo.transforme(dataset).reprend_ordre(dataset, transfo.conserve_tri,
+                                                       transfo.conserve_partition)
+
+
+def _applique_lots(transfo, lots):
+    """Application d'une transformation aux lots d'un même jeu de données
+    (voir Transformation.transforme_lots), l'ordre décrit pour chaque lot
+    étant repris s'il est conservé"""
+    lots, recus = tee(lots)
+    for lot, resultat in zip(recus, transfo.transforme_lots(lots)):
+        yield resultat.reprend_ordre(lot, transfo.conserve_tri, transfo.conserve_partition)
+
+
+def _compte(lots, comptes, position):
+    """Lots inchangés, leurs observations étant comptées au passage"""
+    for lot in lots:
+        comptes[position] += len(lot)
+        yield lot
+
 
 class Pipeline:
     """Modélisation d'un pipeline de données
@@ -37,13 +64,71 @@ class Pipeline:
         """
         self.__ltransfo = ltransfo
 
-    def run(self):
+    def optimise(self):
+        """Réécriture du pipeline avant son exécution
+
+        Le plan du pipeline est réécrit (voir Plan.optimise) : les sélections
+        sont avancées quand c'est possible, les sélections de variables et
+        d'observations placées juste après l'import sont confiées à
+        l'importation, les suivantes servent à écarter des fichiers et les
+        transformations ligne à ligne consécutives sont fusionnées.
+        Le pipeline d'origine n'est pas modifié.
+
+        Returns
+        -------
+        list
+            Import, transformations et export à exécuter
+
+        Examples
+        --------
+        >>> from pipelinepackage.imports.importcsvgz import ImportCsvGz
+        >>> from pipelinepackage.exports.exportcsv import ExportCsv
+        >>> from pipelinepackage.transformations.selectionvariables import SelectionVariables
+        >>> a = Pipeline([ImportCsvGz('data/input/synop.202201.csv.gz', ';'), SelectionVariables(['numer_sta', 't']), ExportCsv()])
+        >>> ltransfo = a.optimise()
+        >>> ltransfo[0].variables, len(ltransfo)
+        (['numer_sta', 't'], 2)
+
+        >>> from pipelinepackage.transformations.selectionobservations import SelectionObservations
+        >>> b = Pipeline([ImportCsvGz('data/input/synop.202201.csv.gz', ';'), SelectionObservations(['numer_sta'], ['='], ['07005']), ExportCsv()])
+        >>> b.optimise()[0].filtre.variables()
+        {'numer_sta'}
+
+        Un fenêtrage sur janvier 2022 écarte les fichiers des autres mois
+        >>> from pipelinepackage.transformations.formaterdate import FormaterDate
+        >>> from pipelinepackage.transformations.fenetrage import Fenetrage
+        >>> c = Pipeline([ImportCsvGz('data/input', ';', vardate='date'), FormaterDate('date', '%Y%m%d%H%M%S'), Fenetrage('2021-12-01', '2021-12-31', 'date'), ExportCsv()])
+        >>> c.optimise()[0].fichiers('.csv.gz')
+        []
+
+        Les transformations ligne à ligne qui suivent l'import sont fusionnées
+        >>> from pipelinepackage.transformations.enlevevalmq import EnleveValMq
+        >>> d = Pipeline([ImportCsvGz('data/input/synop.202201.csv.gz', ';'), SelectionObservations(['t'], ['>'], [280], ['float']), EnleveValMq(['mq']), FormaterDate('date', '%Y%m%d%H%M%S'), ExportCsv()])
+        >>> [type(etape).__name__ for etape in d.optimise()[1].etapes]
+        ['EnleveValMq', 'FormaterDate']
+        """
+        return Plan(self.__ltransfo).optimise().ltransfo
+
+    def run(self, taille_lot=None):
         """
         Execution du pipeline
 
         Les transformations passées en attribut sont effectuées,
         le jeu de données est disponible au chemin passé à l'export.
 
+        Si une taille de lot est donnée, le jeu de données est importé par lots
+        et les premières transformations traitant les observations une à une
+        (voir Transformation.ligne_a_ligne) sont appliquées à chaque lot dès sa
+        lecture. Si toutes les transformations sont dans ce cas, chaque lot est
+        exporté aussitôt et la mémoire utilisée ne dépend plus de la taille du
+        jeu de données ; sinon les lots sont rassemblés avant la première
+        transformation qui a besoin de toutes les observations.
+
+        Parameters
+        ----------
+        taille_lot : int, optional
+            Nombre d'observations par lot, by default None (pas de découpage)
+
         Examples
         --------
         >>> from pipelinepackage.imports.importjsongz import ImportJsonGz
@@ -51,13 +136,103 @@ class Pipeline:
         >>> from pipelinepackage.transformations.selectionvariables import SelectionVariables
         >>> a = Pipeline([ImportJsonGz('data/input/2022-01.json.gz'), SelectionVariables(['region','consommation_brute_electricite_rte']), ExportCsvGz(filename='conso_elec.csv.gz')])
         >>> a.run()
+
+        Exécution par lots de 1000 observations
+        >>> import os, tempfile
+        >>> from pipelinepackage.imports.importcsvgz import ImportCsvGz
+        >>> from pipelinepackage.transformations.enlevevalmq import EnleveValMq
+        >>> dossier = tempfile.TemporaryDirectory()
+        >>> b = Pipeline([ImportCsvGz('data/input/synop.202201.csv.gz', ';'), SelectionVariables(['numer_sta', 'date', 't']), EnleveValMq([None, 'mq']), ExportCsvGz(dossier.name, 'synop_lots.csv.gz')])
+        >>> b.run(taille_lot=1000)
+        >>> len(ImportCsvGz(os.path.join(dossier.name, 'synop_lots.csv.gz'), ';').importe().body)
+        14285
+        >>> dossier.cleanup()
         """
-        table = self.__ltransfo[0].importe()
+        self.__execute(self.optimise(), taille_lot)
+
+    def explain(self, executer=False, taille_lot=None):
+        """Description du plan optimisé
+
+        Pour chaque étape du plan (voir Plan.explique) : description, nombre
+        estimé d'observations et, si le pipeline est exécuté, nombre réel.
+        L'estimation lit le plus petit des fichiers importés (voir
+        Importation.estime_lignes).
+
+        Parameters
+        ----------
+        executer : bool, optional
+            Vrai pour exécuter le pipeline et compter les observations de
+            chaque étape, by default False
+        taille_lot : int, optional
+            Nombre d'observations par lot de l'exécution (voir run), by
+            default None
+
+        Returns
+        -------
+        str
+            Description du plan
+
+        Examples
+        --------
+        >>> import tempfile
+        >>> from pipelinepackage.imports.importcsvgz import ImportCsvGz
+        >>> from pipelinepackage.exports.exportcsv import ExportCsv
+        >>> from pipelinepackage.transformations.enlevevalmq import EnleveValMq
+        >>> from pipelinepackage.transformations.selectionvariables import SelectionVariables
+        >>> dossier = tempfile.TemporaryDirectory()
+        >>> a = Pipeline([ImportCsvGz('data/input/synop.202201.csv.gz', ';'), SelectionVariables(['numer_sta', 'date', 't']), EnleveValMq([None, 'mq']), ExportCsv(dossier.name, 'synop_t.csv')])
+        >>> print(a.explain(executer=True, taille_lot=5000))
+        0. ImportCsvGz data/input/synop.202201.csv.gz, 1 fichier(s), variables ['numer_sta', 'date', 't'] | estimé : 14575 | réel : 14575
+        1. EnleveValMq | estimé : 13118 | réel : 14285
+        2. ExportCsv
+        >>> dossier.cleanup()
+        """
+        plan = Plan(self.__ltransfo).optimise()
+        reels = None
+        if executer:
+            reels = [0] * (len(plan.ltransfo) - 1)
+            self.__execute(plan.ltransfo, taille_lot, reels)
+        return plan.explique(reels)
+
+    @staticmethod
+    def __execute(ltransfo, taille_lot, comptes=None):
+        """Exécution d'un plan, en comptant si demandé les observations
+        rendues par l'import et par chaque transformation"""
+        transfos = ltransfo[1:len(ltransfo)-1]
+
+        if taille_lot is None:
+            table = ltransfo[0].importe()
+            if comptes is not None:
+                comptes[0] = len(table)
+        else:
+            lots = ltransfo[0].importe_lots(taille_lot)
+            if comptes is not None:
+                lots = _compte(lots, comptes, 0)
+
+            # les transformations ligne à ligne en tête de pipeline sont
+            # appliquées à chaque lot au fur et à mesure de la lecture
+            nb_locales = 0
+            while nb_locales < len(transfos) and transfos[nb_locales].ligne_a_ligne:
+                lots = _applique_lots(transfos[nb_locales], lots)
+                nb_locales += 1
+                if comptes is not None:
+                    lots = _compte(lots, comptes, nb_locales)
+            transfos = transfos[nb_locales:]
+
+            if not transfos:
+                ltransfo[-1].exporte_lots(lots)
+                return
+            table = Dataset.concatene(lots)
 
-        for transfo in self.__ltransfo[1:len(self.__ltransfo)-1]:
-            table = transfo.transforme(table)
+        # l'ordre décrit pour le jeu de données suit les transformations qui
+        # le conservent, les suivantes peuvent alors éviter de trier
+        debut = len(ltransfo) - 1 - len(transfos)
+        for k, transfo in enumerate(transfos, debut):
+            table = _applique(transfo, table)
+            if comptes is not None:
+                comptes[k] = len(table)
 
-        self.__ltransfo[-1].exporte(table)
+        ltransfo[-1].exporte(table)
 
 if __name__ == '__main__':
     import doctest
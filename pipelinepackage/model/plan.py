@@ -0,0 +1,290 @@
+"""
+module plan
+
+Plan d'exécution d'un pipeline.
+
+Le plan logique est la suite import, transformations, export telle qu'elle est
+écrite ; rien n'est lu ni calculé à sa construction. Avant l'exécution, il est
+réécrit (voir Plan.optimise) :
+
+- réordonnancement : une sélection (SelectionObservations, Fenetrage) est
+  avancée avant les transformations avec lesquelles elle commute (voir
+  Transformation.commute), par exemple une agrégation spatiale ou une
+  jointure, qui traitent alors moins d'observations ;
+- projection et sélection : les sélections de variables et d'observations
+  placées juste après l'import sont confiées à l'importation ;
+- élagage : les sélections suivantes écartent les fichiers qui ne peuvent pas
+  contenir d'observation retenue ;
+- fusion des transformations ligne à ligne consécutives (voir Fusion).
+
+Le tri des observations est suivi d'étape en étape (voir
+Transformation.ordre) : les tris rendus inutiles par l'ordre décrit sont
+évités à l'exécution (voir Dataset.tri) et signalés par Plan.explique, avec
+le nombre estimé d'observations de chaque étape (voir
+Transformation.estime) et, après exécution, leur nombre réel.
+
+Examples
+--------
+>>> from pipelinepackage.imports.importcsvgz import ImportCsvGz
+>>> from pipelinepackage.exports.exportcsv import ExportCsv
+>>> from pipelinepackage.transformations.agregationspatiale import AgregationSpatiale
+>>> from pipelinepackage.transformations.formaterdate import FormaterDate
+>>> plan = Plan([ImportCsvGz('data/input/synop.202201.csv.gz', ';'), FormaterDate('date', '%Y%m%d%H%M%S'), AgregationSpatiale('data/synop/postesSynopAvecRegions.csv', 'ID', 'numer_sta', 'Region', groupby=['date']), Fenetrage('2022-01-01', '2022-01-07', 'date'), ExportCsv()])
+>>> [type(etape).__name__ for etape in plan.optimise().ltransfo]
+['ImportCsvGz', 'Fusion', 'AgregationSpatiale', 'ExportCsv']
+"""
+from pipelinepackage.imports.importation import Importation
+from pipelinepackage.model.predicat import Et
+from pipelinepackage.transformations.enlevevalmq import EnleveValMq
+from pipelinepackage.transformations.fenetrage import Fenetrage
+from pipelinepackage.transformations.formaterdate import FormaterDate
+from pipelinepackage.transformations.fusion import Fusion
+from pipelinepackage.transformations.selectionobservations import SelectionObservations
+from pipelinepackage.transformations.selectionvariables import SelectionVariables
+
+# transformations qui ne modifient pas la valeur (au format près pour les
+# dates) des variables conservées : une condition placée après elles peut
+# servir à écarter des fichiers à l'import (EnleveValMq seulement sans imputation)
+CONSERVENT_VALEURS = (SelectionVariables, SelectionObservations, Fenetrage,
+                      EnleveValMq, FormaterDate)
+
+# sélections pouvant être avancées dans le plan
+SELECTIONS = (SelectionObservations, Fenetrage)
+
+
+def _decrit(etape):
+    """Description d'une étape sur une ligne"""
+    nom = type(etape).__name__
+    if isinstance(etape, Fusion):
+        return nom + ' [' + ', '.join(map(_decrit, etape.etapes)) + ']'
+    if isinstance(etape, SELECTIONS):
+        return nom + ' ' + str(etape.predicat)
+    if isinstance(etape, SelectionVariables):
+        return nom + ' ' + str(etape.variables)
+    if isinstance(etape, Importation):
+        details = [str(etape.chemin), str(len(etape.fichiers(etape.extension))) + ' fichier(s)']
+        if etape.variables is not None:
+            details.append('variables ' + str(etape.variables))
+        if etape.filtre is not None:
+            details.append('filtre ' + str(etape.filtre))
+        if etape.elagage is not None:
+            details.append('élagage ' + str(etape.elagage))
+        return nom + ' ' + ', '.join(details)
+    return nom
+
+
+class Plan:
+    """Classe Plan
+
+    Plan d'exécution d'un pipeline : import, transformations et export.
+
+    Attributes
+    ----------
+    ltransfo : list
+        Import, transformations et export, dans l'ordre d'exécution
+    """
+
+    def __init__(self, ltransfo):
+        """Constructeur
+
+        Parameters
+        ----------
+        ltransfo : list
+            Import, transformations et export (voir Pipeline)
+        """
+        self.__ltransfo = list(ltransfo)
+
+    @property
+    def ltransfo(self):
+        """Import, transformations et export, dans l'ordre d'exécution"""
+        return self.__ltransfo
+
+    def reordonne(self):
+        """Avancement des sélections
+
+        Chaque sélection (SelectionObservations, Fenetrage) est placée avant
+        les transformations qui la précèdent tant qu'elles commutent avec elle
+        (voir Transformation.commute) : le résultat est le même, mais les
+        transformations coûteuses (jointure, agrégation) reçoivent moins
+        d'observations. Les sélections ne sont échangées entre elles que si
+        cela permet de passer devant une autre transformation.
+
+        Returns
+        -------
+        Plan
+            Nouveau plan
+
+        Examples
+        --------
+        >>> from pipelinepackage.model.dataset import Dataset
+        >>> from pipelinepackage.transformations.jointure import Jointure
+        >>> conso = Dataset(['region', 'date', 'conso'], [])
+        >>> plan = Plan([None, Jointure(conso, ['Region', 'date'], ['region', 'date']), SelectionObservations(['Region'], ['='], ['Bretagne']), SelectionObservations(['conso'], ['>'], [5000], ['float']), None])
+        >>> [_decrit(etape) for etape in plan.reordonne().ltransfo[1:-1]]
+        ["SelectionObservations Region = 'Bretagne'", 'Jointure', 'SelectionObservations conso > 5000']
+        """
+        transfos = self.__ltransfo[1:-1]
+        for k, transfo in enumerate(transfos):
+            if not isinstance(transfo, SELECTIONS):
+                continue
+            j = k
+            while j > 0 and transfos[j-1].commute(transfo.predicat):
+                j -= 1
+            # inutile de passer seulement devant d'autres sélections
+            while j < k and isinstance(transfos[j], SELECTIONS):
+                j += 1
+            transfos.insert(j, transfos.pop(k))
+        return Plan([self.__ltransfo[0]] + transfos + [self.__ltransfo[-1]])
+
+    def optimise(self):
+        """Réécriture du plan avant son exécution
+
+        Les sélections sont d'abord avancées (voir reordonne). Les sélections
+        de variables et d'observations placées juste après l'import sont
+        ensuite confiées à l'importation : les variables et les observations
+        non retenues ne sont alors jamais construites. Les fenêtrages et
+        sélections d'observations qui suivent, tant qu'ils ne sont précédés
+        que de transformations ne modifiant pas les valeurs, servent à écarter
+        les fichiers dont la partition (date dans le nom, dossiers cle=valeur)
+        ne peut pas les vérifier. Enfin, les transformations fusionnables
+        consécutives (voir Transformation.fusionnable) sont regroupées en une
+        Fusion, appliquée en un seul parcours des observations.
+        Le plan d'origine n'est pas modifié.
+
+        Returns
+        -------
+        Plan
+            Plan à exécuter
+        """
+        ltransfo = self.reordonne().ltransfo
+        importation = ltransfo[0]
+        transfos = ltransfo[1:-1]
+
+        while transfos:
+            # projection : les variables sélectionnées sont lues directement
+            if isinstance(transfos[0], SelectionVariables):
+                importation = importation.projection(transfos[0].variables)
+            # sélection : les observations rejetées ne sont pas construites
+            # (si les variables testées n'ont pas été écartées auparavant)
+            elif (isinstance(transfos[0], SelectionObservations) and
+                  (importation.variables is None or
+                   transfos[0].predicat.variables() <= set(importation.variables))):
+                importation = importation.selection(transfos[0].predicat)
+            else:
+                break
+            transfos = transfos[1:]
+
+        # élagage : les fenêtrages et sélections suivants permettent encore
+        # d'écarter les fichiers qui ne peuvent pas contenir d'observation retenue
+        predicats = []
+        for transfo in transfos:
+            if not isinstance(transfo, CONSERVENT_VALEURS):
+                break
+            if isinstance(transfo, EnleveValMq) and transfo.imputation is not None:
+                break
+            if isinstance(transfo, SELECTIONS):
+                predicats.append(transfo.predicat)
+        if predicats:
+            importation = importation.elague(Et(predicats))
+
+        # fusion : les transformations fusionnables consécutives sont
+        # appliquées en un seul parcours, sans liste intermédiaire
+        fusionnees = []
+        for transfo in transfos:
+            if not transfo.fusionnable:
+                fusionnees.append(transfo)
+            elif fusionnees and isinstance(fusionnees[-1], Fusion):
+                fusionnees[-1] = Fusion(fusionnees[-1].etapes + [transfo])
+            elif fusionnees and fusionnees[-1].fusionnable:
+                fusionnees[-1] = Fusion([fusionnees[-1], transfo])
+            else:
+                fusionnees.append(transfo)
+
+        return Plan([importation] + fusionnees + [ltransfo[-1]])
+
+    def estime(self):
+        """Nombre estimé d'observations rendues par l'import et par chaque
+        transformation
+
+        L'import est estimé d'après ses fichiers (voir
+        Importation.estime_lignes, qui lit le plus petit d'entre eux), les
+        transformations d'après leur sélectivité supposée (voir
+        Transformation.estime).
+
+        Returns
+        -------
+        list[float]
+            Une estimation par étape, export exclu
+        """
+        nombres = [self.__ltransfo[0].estime_lignes()]
+        for transfo in self.__ltransfo[1:-1]:
+            nombres.append(transfo.estime(nombres[-1]))
+        return nombres
+
+    def tris(self):
+        """Tri des observations reçues par chaque transformation
+
+        Les importations ne décrivent aucun ordre ; le tri suit ensuite les
+        transformations (voir Transformation.ordre).
+
+        Returns
+        -------
+        list[tuple[str]]
+            Tri reçu par chaque transformation
+        """
+        tris = []
+        tri = ()
+        for transfo in self.__ltransfo[1:-1]:
+            tris.append(tri)
+            tri = transfo.ordre(tri)
+        return tris
+
+    def explique(self, reels=None):
+        """Description du plan
+
+        Une ligne par étape : description, nombre estimé d'observations
+        rendues, nombre réel s'il est connu, et pour les transformations qui
+        trient, si le tri est nécessaire ou évité grâce à l'ordre décrit.
+
+        Parameters
+        ----------
+        reels : list[int], optional
+            Nombre réel d'observations rendues par l'import et chaque
+            transformation (voir Pipeline.explain), by default None
+
+        Returns
+        -------
+        str
+            Description du plan
+
+        Examples
+        --------
+        >>> from pipelinepackage.imports.importcsvgz import ImportCsvGz
+        >>> from pipelinepackage.exports.exportcsv import ExportCsv
+        >>> from pipelinepackage.transformations.moyenneglissante import MoyenneGlissante
+        >>> plan = Plan([ImportCsvGz('data/input/synop.202201.csv.gz', ';'), SelectionObservations(['numer_sta'], ['='], ['07005']), MoyenneGlissante('t', 3, 'date'), MoyenneGlissante('ff', 3, 'date'), ExportCsv()])
+        >>> print(plan.optimise().explique())
+        0. ImportCsvGz data/input/synop.202201.csv.gz, 1 fichier(s), filtre numer_sta = '07005' | estimé : 247
+        1. MoyenneGlissante | estimé : 247 | tri
+        2. MoyenneGlissante | estimé : 247 | tri évité
+        3. ExportCsv
+        """
+        estimations = self.estime()
+        tris = [None] + [transfo.evite_tri(tri) for transfo, tri
+                         in zip(self.__ltransfo[1:-1], self.tris())]
+        lignes = []
+        for k, etape in enumerate(self.__ltransfo):
+            ligne = str(k) + '. ' + _decrit(etape)
+            if k < len(estimations):
+                ligne += ' | estimé : ' + str(round(estimations[k]))
+                if reels is not None:
+                    ligne += ' | réel : ' + str(reels[k])
+                if tris[k] is not None:
+                    ligne += ' | ' + ('tri évité' if tris[k] else 'tri')
+            lignes.append(ligne)
+        return '\n'.join(lignes)
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod(verbose=True)
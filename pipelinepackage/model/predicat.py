@@ -0,0 +1,525 @@
+"""
+module predicat
+
+Modélisation des conditions portant sur les observations d'un jeu de données.
+
+Un prédicat est un arbre de comparaisons reliées par des ET / OU. Il est
+compilé une seule fois en une fonction rapide : les constantes sont converties
+dans le bon type à la compilation et seule la valeur de l'observation est
+convertie à l'évaluation. Sur un jeu de données par colonnes, un prédicat peut
+aussi être évalué colonne par colonne (masque).
+
+Examples
+--------
+>>> p = Comparaison('age', '>=', 18, 'int') & Comparaison('nom', 'in', ['Anne', 'Chloe'])
+>>> test = p.compile()
+>>> test({'nom': 'Anne', 'age': '23'}), test({'nom': 'Chloe', 'age': '7'})
+(True, False)
+>>> (Comparaison('age', 'between', [5, 10], 'int') | Comparaison('age', 'null')).compile()({'nom': 'Maelle'})
+True
+>>> print(p)
+(age >= 18 ET nom in ['Anne', 'Chloe'])
+"""
+import operator
+from abc import ABC, abstractmethod
+from datetime import datetime
+from pipelinepackage.model.colonne import CONVERSIONS, VALMQ
+from pipelinepackage.model.datasetcolonnes import DatasetColonnes
+
+OPERATEURS = {'=': operator.eq, '!=': operator.ne, '>': operator.gt, '<': operator.lt,
+              '>=': operator.ge, '<=': operator.le}
+
+# part des observations vérifiant une comparaison, faute de mieux ('in' :
+# celle de '=' par valeur), pour les estimations du plan d'exécution
+SELECTIVITES = {'=': 0.1, '!=': 0.9, '>': 1/3, '<': 1/3, '>=': 1/3, '<=': 1/3,
+                'between': 0.25, 'null': 0.1, 'notnull': 0.9}
+
+
+def _acces_dict(variable):
+    return lambda row: row.get(variable)
+
+
+class Predicat(ABC):
+    """Classe abstraite Predicat
+
+    Condition portant sur une observation. Les prédicats peuvent être combinés
+    avec les opérateurs & (ET), | (OU) et ~ (NON).
+    """
+
+    @abstractmethod
+    def compile(self, acces=None):
+        """Compilation du prédicat
+
+        Parameters
+        ----------
+        acces : function, optional
+            Fonction qui associe au nom d'une variable une fonction lisant sa
+            valeur dans une observation, by default None (observations sous
+            forme de dictionnaires)
+
+        Returns
+        -------
+        function
+            Fonction qui renvoie True si l'observation vérifie le prédicat
+        """
+
+    @abstractmethod
+    def variables(self):
+        """Variables sur lesquelles porte le prédicat
+
+        Returns
+        -------
+        set[str]
+            Noms des variables
+        """
+
+    def peut_correspondre(self, bornes):
+        """Le prédicat peut-il être vérifié par un ensemble d'observations ?
+
+        Sert à écarter un fichier ou un morceau entier sans le lire, à partir
+        des valeurs extrêmes connues de certaines variables. La réponse False
+        est une certitude ; True signifie seulement que la lecture est
+        nécessaire.
+
+        Parameters
+        ----------
+        bornes : dict
+            Valeurs minimale et maximale (min, max) de certaines variables ;
+            des bornes de type datetime ne sont comparées qu'aux conditions
+            portant sur des dates
+
+        Returns
+        -------
+        bool
+            False si aucune observation ne peut vérifier le prédicat
+        """
+        return True
+
+    def masque(self, dataset):
+        """Évaluation du prédicat sur toutes les observations
+
+        Parameters
+        ----------
+        dataset : Dataset
+            Jeu de données
+
+        Returns
+        -------
+        list[bool]
+            True pour chaque observation vérifiant le prédicat
+        """
+        test = self.compile()
+        return [test(row) for row in dataset.body]
+
+    def selectivite(self):
+        """Part estimée des observations vérifiant le prédicat
+
+        Les comparaisons sont supposées indépendantes (voir SELECTIVITES).
+
+        Returns
+        -------
+        float
+            Estimation entre 0 et 1
+        """
+        return 1.0
+
+    def __and__(self, autre):
+        return Et([self, autre])
+
+    def __or__(self, autre):
+        return Ou([self, autre])
+
+    def __invert__(self):
+        return Non(self)
+
+
+class Comparaison(Predicat):
+    """Classe Comparaison
+
+    Comparaison d'une variable à une constante.
+
+    Attributes
+    ----------
+    variable : str
+        Nom de la variable
+    operateur : str
+        '=', '!=', '>', '<', '>=', '<=', 'in' (valeur est une liste),
+        'between' (valeur est une paire de bornes incluses), 'null' ou
+        'notnull' (valeur ignorée)
+    valeur : optional
+        Constante à laquelle on compare la variable
+    typ : str, optional
+        Type de la variable ('int', 'float', 'str' ou 'date'), by default 'str'
+    valmq : tuple, optional
+        Valeurs considérées comme manquantes, by default (None, '', 'mq')
+
+    Une valeur manquante ne vérifie aucune comparaison, sauf '!=' et 'null'.
+
+    Examples
+    --------
+    >>> Comparaison('t', '<=', '280', 'float').compile()({'t': '284.450000'})
+    False
+    >>> Comparaison('t', '!=', 280, 'float').compile()({'t': 'mq'})
+    True
+    """
+
+    def __init__(self, variable, operateur, valeur=None, typ='str', valmq=VALMQ):
+        """Constructeur
+
+        Parameters
+        ----------
+        variable : str
+            Nom de la variable
+        operateur : str
+            '=', '!=', '>', '<', '>=', '<=', 'in', 'between', 'null' ou 'notnull'
+        valeur : optional
+            Constante à laquelle on compare la variable, by default None
+        typ : str, optional
+            Type de la variable ('int', 'float', 'str' ou 'date'), by default 'str'
+        valmq : tuple, optional
+            Valeurs considérées comme manquantes, by default (None, '', 'mq')
+        """
+        if operateur not in OPERATEURS and operateur not in ('in', 'between', 'null', 'notnull'):
+            raise ValueError("Opérateur inconnu : " + str(operateur))
+        self.__variable = variable
+        self.__operateur = operateur
+        self.__valeur = valeur
+        self.__type = typ
+        self.__valmq = valmq
+
+    @property
+    def variable(self):
+        """Nom de la variable"""
+        return self.__variable
+
+    @property
+    def operateur(self):
+        """Opérateur de comparaison"""
+        return self.__operateur
+
+    @property
+    def valeur(self):
+        """Constante à laquelle on compare la variable"""
+        return self.__valeur
+
+    @property
+    def type(self):
+        """Type de la variable"""
+        return self.__type
+
+    def variables(self):
+        return {self.__variable}
+
+    def selectivite(self):
+        """
+        Examples
+        --------
+        >>> Comparaison('numer_sta', 'in', ['07005', '07015']).selectivite()
+        0.2
+        """
+        if self.__operateur == 'in':
+            return min(1.0, SELECTIVITES['='] * len(self.__valeur))
+        return SELECTIVITES[self.__operateur]
+
+    def __str__(self):
+        if self.__operateur in ('null', 'notnull'):
+            return self.__variable + ' ' + self.__operateur
+        return self.__variable + ' ' + self.__operateur + ' ' + repr(self.__valeur)
+
+    def __test_valeur(self):
+        """Fonction testant une valeur non manquante déjà convertie"""
+        conv = CONVERSIONS[self.__type]
+        oper = self.__operateur
+        if oper == 'in':
+            cibles = frozenset(conv(val) for val in self.__valeur)
+            return cibles.__contains__
+        if oper == 'between':
+            bas, haut = (conv(val) for val in self.__valeur)
+            return lambda val: bas <= val <= haut
+        if oper in ('null', 'notnull'):
+            return lambda val: oper == 'notnull'
+        cible = conv(self.__valeur)
+        fonction = OPERATEURS[oper]
+        return lambda val: fonction(val, cible)
+
+    def __defaut(self):
+        """Résultat du prédicat pour une valeur manquante"""
+        return self.__operateur in ('!=', 'null')
+
+    def peut_correspondre(self, bornes):
+        """Le prédicat peut-il être vérifié par un ensemble d'observations ?
+
+        Examples
+        --------
+        >>> from datetime import datetime
+        >>> janvier = {'date': (datetime(2022, 1, 1), datetime(2022, 1, 31, 23, 59, 59))}
+        >>> Comparaison('date', 'between', ['2022-02-01', '2022-02-28'], 'date').peut_correspondre(janvier)
+        False
+        >>> Comparaison('date', '>=', '2022-01-31', 'date').peut_correspondre(janvier)
+        True
+        >>> Comparaison('region', 'in', ['Corse', 'Bretagne']).peut_correspondre({'region': ('Normandie', 'Normandie')})
+        False
+        """
+        if self.__variable not in bornes or self.__defaut():
+            return True
+        bas, haut = bornes[self.__variable]
+        if isinstance(bas, datetime) != (self.__type == 'date'):
+            return True
+        conv = CONVERSIONS[self.__type]
+        oper = self.__operateur
+        try:
+            bas, haut = conv(bas), conv(haut)
+            if oper == 'notnull':
+                return True
+            if oper == 'in':
+                return any(bas <= conv(val) <= haut for val in self.__valeur)
+            if oper == 'between':
+                debut, fin = (conv(val) for val in self.__valeur)
+                return debut <= haut and bas <= fin
+            cible = conv(self.__valeur)
+        except (TypeError, ValueError):
+            return True
+        if oper == '=':
+            return bas <= cible <= haut
+        if oper in ('>', '>='):
+            return OPERATEURS[oper](haut, cible)
+        return OPERATEURS[oper](bas, cible)
+
+    def compile(self, acces=None):
+        get = (acces or _acces_dict)(self.__variable)
+        test = self.__test_valeur()
+        defaut = self.__defaut()
+
+        if self.__type == 'str' and self.__operateur not in ('null', 'notnull'):
+            def evalue(row):
+                val = get(row)
+                return defaut if val is None else test(val)
+            return evalue
+
+        conv = CONVERSIONS[self.__type]
+        valmq = frozenset(self.__valmq)
+
+        def evalue(row):
+            val = get(row)
+            if val in valmq:
+                return defaut
+            return test(conv(val))
+        return evalue
+
+    def masque(self, dataset):
+        """Évaluation du prédicat sur toutes les observations
+
+        Sur un jeu de données par colonnes, la comparaison est faite
+        directement sur les valeurs typées : pour une variable de type 'str',
+        chaque modalité n'est testée qu'une fois.
+
+        Parameters
+        ----------
+        dataset : Dataset
+            Jeu de données
+
+        Returns
+        -------
+        list[bool]
+            True pour chaque observation vérifiant le prédicat
+
+        Examples
+        --------
+        >>> from pipelinepackage.model.dataset import Dataset
+        >>> d = DatasetColonnes.depuis_dataset(Dataset(['region', 't'], [{'region': 'Bretagne', 't': '1.5'}, {'region': 'Corse', 't': 'mq'}, {'region': 'Bretagne', 't': '3.5'}]))
+        >>> Comparaison('region', '=', 'Bretagne').masque(d)
+        [True, False, True]
+        >>> Comparaison('t', '>', 2, 'float').masque(d)
+        [False, False, True]
+        """
+        if isinstance(dataset, DatasetColonnes) and self.__variable in dataset.header:
+            masque = self.__masque_colonne(dataset.colonne(self.__variable))
+            if masque is not None:
+                return masque
+        test = self.compile(lambda variable: lambda val: val)
+        return [test(val) for val in dataset.valeurs(self.__variable)]
+
+    def __masque_colonne(self, col):
+        """Masque calculé sur une colonne typée (None si types incompatibles)"""
+        defaut = self.__defaut()
+        nulls = col.nulls
+        if self.__operateur in ('null', 'notnull'):
+            if nulls is None:
+                return [defaut] * len(col)
+            return [bool(mq) == defaut for mq in nulls]
+
+        test = self.__test_valeur()
+        if col.type == 'str' and self.__type == 'str':
+            table = [test(val) for val in col.modalites]
+            return [table[code] if code >= 0 else defaut for code in col.donnees]
+        if not ((col.type in ('int', 'float') and self.__type in ('int', 'float')) or
+                (col.type == 'date' and self.__type == 'date')):
+            return None
+        masque = [test(val) for val in col.donnees]
+        if nulls is not None:
+            masque = [defaut if mq else res for res, mq in zip(masque, nulls)]
+        return masque
+
+
+class Et(Predicat):
+    """Classe Et
+
+    Conjonction de prédicats (vrai si tous les prédicats sont vrais).
+
+    Examples
+    --------
+    >>> Et([Comparaison('a', '=', 'x'), Comparaison('b', '=', 'y')]).compile()({'a': 'x', 'b': 'z'})
+    False
+    """
+
+    def __init__(self, predicats):
+        """Constructeur
+
+        Parameters
+        ----------
+        predicats : list[Predicat]
+            Prédicats à combiner
+        """
+        self.__predicats = list(predicats)
+
+    @property
+    def predicats(self):
+        """Prédicats combinés"""
+        return self.__predicats
+
+    def variables(self):
+        return set().union(*(pred.variables() for pred in self.__predicats))
+
+    def peut_correspondre(self, bornes):
+        return all(pred.peut_correspondre(bornes) for pred in self.__predicats)
+
+    def selectivite(self):
+        resultat = 1.0
+        for pred in self.__predicats:
+            resultat *= pred.selectivite()
+        return resultat
+
+    def __str__(self):
+        if len(self.__predicats) == 1:
+            return str(self.__predicats[0])
+        return '(' + ' ET '.join(map(str, self.__predicats)) + ')'
+
+    def compile(self, acces=None):
+        tests = [pred.compile(acces) for pred in self.__predicats]
+        if len(tests) == 1:
+            return tests[0]
+        return lambda row: all(test(row) for test in tests)
+
+    def masque(self, dataset):
+        masque = [True] * len(dataset)
+        for pred in self.__predicats:
+            masque = [a and b for a, b in zip(masque, pred.masque(dataset))]
+        return masque
+
+
+class Ou(Predicat):
+    """Classe Ou
+
+    Disjonction de prédicats (vrai si au moins un prédicat est vrai).
+
+    Examples
+    --------
+    >>> Ou([Comparaison('a', '=', 'x'), Comparaison('b', '=', 'y')]).compile()({'a': 'x', 'b': 'z'})
+    True
+    """
+
+    def __init__(self, predicats):
+        """Constructeur
+
+        Parameters
+        ----------
+        predicats : list[Predicat]
+            Prédicats à combiner
+        """
+        self.__predicats = list(predicats)
+
+    @property
+    def predicats(self):
+        """Prédicats combinés"""
+        return self.__predicats
+
+    def variables(self):
+        return set().union(*(pred.variables() for pred in self.__predicats))
+
+    def peut_correspondre(self, bornes):
+        return any(pred.peut_correspondre(bornes) for pred in self.__predicats)
+
+    def selectivite(self):
+        """
+        Examples
+        --------
+        >>> round((Comparaison('a', '=', 'x') | Comparaison('b', '=', 'y')).selectivite(), 2)
+        0.19
+        """
+        aucun = 1.0
+        for pred in self.__predicats:
+            aucun *= 1 - pred.selectivite()
+        return 1 - aucun
+
+    def __str__(self):
+        if len(self.__predicats) == 1:
+            return str(self.__predicats[0])
+        return '(' + ' OU '.join(map(str, self.__predicats)) + ')'
+
+    def compile(self, acces=None):
+        tests = [pred.compile(acces) for pred in self.__predicats]
+        return lambda row: any(test(row) for test in tests)
+
+    def masque(self, dataset):
+        masque = [False] * len(dataset)
+        for pred in self.__predicats:
+            masque = [a or b for a, b in zip(masque, pred.masque(dataset))]
+        return masque
+
+
+class Non(Predicat):
+    """Classe Non
+
+    Négation d'un prédicat.
+
+    Examples
+    --------
+    >>> (~Comparaison('a', '=', 'x')).compile()({'a': 'x'})
+    False
+    """
+
+    def __init__(self, predicat):
+        """Constructeur
+
+        Parameters
+        ----------
+        predicat : Predicat
+            Prédicat à nier
+        """
+        self.__predicat = predicat
+
+    @property
+    def predicat(self):
+        """Prédicat nié"""
+        return self.__predicat
+
+    def variables(self):
+        return self.__predicat.variables()
+
+    def selectivite(self):
+        return 1 - self.__predicat.selectivite()
+
+    def __str__(self):
+        return 'NON ' + str(self.__predicat)
+
+    def compile(self, acces=None):
+        test = self.__predicat.compile(acces)
+        return lambda row: not test(row)
+
+    def masque(self, dataset):
+        return [not val for val in self.__predicat.masque(dataset)]
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod(verbose=True)
@@ -2,7 +2,9 @@
 Produire des graphiques.
 
 Graphiques classiques (x en fonction de y)
-Séries temporelles (une ou plusieurs variables selon le temps)
+Séries temporelles (une ou plusieurs variables selon le temps), les séries
+n'étant triées que si le jeu de données n'est pas décrit comme trié selon la
+date (Dataset.tri)
 
 Note : les tests utilises les tables créées par le __main__
 """
@@ -96,6 +98,8 @@ class LinePlot:
         >>> table = ImportCsv('data/output/conso_temp.csv', ';').importe()
         >>> lplot.serie_temp(table, 'date', 'consommation_brute_electricite_rte', 'Region')
         """
+        # pas de tri si le jeu de données est décrit comme trié selon la date
+        trie = dataset.tri[:1] == (vardate,)
         if groupby:
             groups = list(set([row[groupby] for row in dataset.body]))
             for group in groups:
@@ -103,7 +107,8 @@ class LinePlot:
                     row[vardate]) for row in dataset.body if row[groupby] == group]
                 data = [float(row.get(vardata))
                         for row in dataset.body if row[groupby] == group]
-                dates, data = zip(*sorted(zip(dates, data)))
+                if not trie:
+                    dates, data = zip(*sorted(zip(dates, data)))
                 plt.plot(dates, data, label=group)
                 plt.legend()
         else:
@@ -111,7 +116,8 @@ class LinePlot:
                      for row in dataset.body]
             data = [float(row.get(vardata)) if row.get(vardata) not in ['', None] else None
                     for row in dataset.body]
-            dates, data = zip(*sorted(zip(dates, data)))
+            if not trie:
+                dates, data = zip(*sorted(zip(dates, data)))
             plt.plot(dates, data)
 
         plt.xlabel("Temps")
@@ -140,12 +146,14 @@ class LinePlot:
         >>> table = ImportCsv('data/output/conso_temp_bretagne.csv', ';').importe()
         >>> lplot.series_temps(table, 'date', ['moygli_t','moygli_consommation_brute_electricite_rte'])
         """
+        trie = dataset.tri[:1] == (vardate,)
         for var in varsdata:
             dates = [datetime.fromisoformat(row[vardate])
                      for row in dataset.body]
             data = [float(row.get(var)) if row.get(var) not in ['', None] else None
                     for row in dataset.body]
-            dates, data = zip(*sorted(zip(dates, data)))
+            if not trie:
+                dates, data = zip(*sorted(zip(dates, data)))
             plt.plot(dates, data, label=var)
 
         plt.xlabel("Temps")
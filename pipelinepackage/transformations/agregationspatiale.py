@@ -9,11 +9,50 @@ Les variables d'autres types (sauf pivot et cariable d'échelle) devront soit
 être renseignées dans l'attribut groupby, soit être supprimées.
 """
 import csv
-from pipelinepackage.transformations.selectionvariables import SelectionVariables
+import os
+from functools import lru_cache
 from pipelinepackage.transformations.transformation import Transformation
+from pipelinepackage.transformations.groupby import GroupBy
 from pipelinepackage.model.dataset import Dataset
 
 
+def index_synop(filesynop, pivotsynop, echelle):
+    """Correspondance entre le pivot et l'échelle d'un fichier de synchronisation
+
+    Le fichier n'est relu que s'il a été modifié depuis la dernière lecture.
+
+    Parameters
+    ----------
+    filesynop : str
+        Fichier csv de synchronisation
+    pivotsynop : str
+        Nom de la variable pivot dans filesynop
+    echelle : str
+        Nom de la variable d'échelle dans filesynop
+
+    Returns
+    -------
+    dict
+        Valeur de l'échelle pour chaque valeur du pivot
+
+    Examples
+    --------
+    >>> index = index_synop('data/synop/postesSynopAvecRegions.csv', 'ID', 'Region')
+    >>> index['07005']
+    'Hauts-de-France'
+    """
+    return _lit_synop(filesynop, os.path.getmtime(filesynop), pivotsynop, echelle)
+
+
+@lru_cache(maxsize=16)
+def _lit_synop(filesynop, modification, pivotsynop, echelle):
+    index = {}
+    with open(filesynop, mode='r', encoding='utf-8') as csvr:
+        for row in csv.DictReader(csvr, delimiter=","):
+            index.setdefault(row[pivotsynop], row[echelle])
+    return index
+
+
 class AgregationSpatiale(Transformation):
     """Classe AgregationSpatiale
 
@@ -30,8 +69,13 @@ class AgregationSpatiale(Transformation):
         Nom de l'échelle à laquelle agréger (nom de la variable dans filesynop)
     groupby : list, optional
         Variables par lesquelles grouper les données (par exemple la date), by default None
-    fonction : function, optional
-        Fonction d'agrégation, by default lambdax:sum(x)/len(x)
+    fonction : function ou str, optional
+        Fonction d'agrégation, qui prend la liste des valeurs, ou nom d'un
+        accumulateur de GroupBy (par exemple 'moyenne', 'somme' ou 'max'),
+        by default lambdax:sum(x)/len(x)
+    inconnus : dict
+        Observations écartées lors de la dernière fusion, par valeur du pivot
+        absente de filesynop
     """
 
     def __init__(self, filesynop, pivotsynop, pivotdata, echelle,
@@ -51,8 +95,10 @@ class AgregationSpatiale(Transformation):
             Nom de l'échelle à laquelle agréger (nom de la variable dans filesynop)
         groupby : list, optional
             Variables par lesquelles grouper les données (par exemple la date), by default None
-        fonction : function, optional
-            Fonction d'agrégation, by default lambdax:sum(x)/len(x)
+        fonction : function ou str, optional
+            Fonction d'agrégation, qui prend la liste des valeurs, ou nom d'un
+            accumulateur de GroupBy (par exemple 'moyenne', 'somme' ou 'max'),
+            by default lambdax:sum(x)/len(x)
         """
         super().__init__()
         self.__filesynop = filesynop
@@ -61,89 +107,131 @@ class AgregationSpatiale(Transformation):
         self.__pivotdata = pivotdata
         self.__groupby = groupby
         self.__fonction = fonction
+        self.__inconnus = {}
 
     def fusion_synop(self, dataset):
         """Fusion du fichier synop avec le jeu de données
 
         Ajoute l'échelle sélectionnée comme nouvelle variable du jeu de données
+        et supprime la variable pivot. La correspondance pivot -> échelle est
+        lue une seule fois (voir index_synop), puis chaque observation est
+        enrichie par une simple recherche dans un dictionnaire. Les
+        observations dont le pivot est absent du fichier de synchronisation sont
+        écartées et recensées dans l'attribut inconnus.
 
         Parameters
         ----------
         dataset : Dataset
             Jeu de données
-        """
 
-        header = dataset.header
-        data = dataset.body
-        header.append(self.__echelle)
+        Returns
+        -------
+        Dataset
+            Jeu de données avec la variable echelle à la place de la variable pivot
+
+        Examples
+        --------
+        >>> d = Dataset(['numer_sta', 't'], [{'numer_sta': '07005', 't': '1'}, {'numer_sta': '99999', 't': '2'}, {'numer_sta': '07015', 't': '3'}, {'numer_sta': '99999', 't': '4'}])
+        >>> a = AgregationSpatiale('data/synop/postesSynopAvecRegions.csv', 'ID', 'numer_sta', 'Region')
+        >>> res = a.fusion_synop(d)
+        >>> res.header, res.body
+        (['t', 'Region'], [{'t': '1', 'Region': 'Hauts-de-France'}, {'t': '3', 'Region': 'Hauts-de-France'}])
+        >>> a.inconnus
+        {'99999': 2}
+        """
+        index = index_synop(self.__filesynop, self.__pivotsynop, self.__echelle)
+        pivot = self.__pivotdata
+        echelle = self.__echelle
+        header = [var for var in dataset.header if var not in (pivot, echelle)]
 
         body = []
-        synop = []
-
-        # ouverture du fichier de synchronisation
-        with open(self.__filesynop, mode='r', encoding='utf-8') as csvr:
-            csv_reader = csv.DictReader(csvr, delimiter=",")
-            for row in csv_reader:
-                synop.append(row)
-
-        # ajout de la nouvelle variable echelle au jeu de données
-        for row_a in data:
-            for row_b in synop:
-                if row_a[self.__pivotdata] == row_b[self.__pivotsynop]:
-                    row_a[self.__echelle] = row_b[self.__echelle]
-                    body.append(row_a)
-
-        header.remove(self.__pivotdata)
-
-        # suppression de la variable pivot dans le jeu de données
-        sel = SelectionVariables(header)
-        result = sel.transforme(Dataset(header, body))
-        return result
+        inconnus = {}
+        for row in dataset.body:
+            cle = row.get(pivot)
+            valeur = index.get(cle)
+            if valeur is None:
+                inconnus[cle] = inconnus.get(cle, 0) + 1
+                continue
+            obs = {var: row.get(var) for var in header}
+            obs[echelle] = valeur
+            body.append(obs)
+
+        self.__inconnus = inconnus
+        return Dataset(header + [echelle], body)
+
+    @property
+    def inconnus(self):
+        """Observations écartées lors de la dernière fusion
+
+        Returns
+        -------
+        dict
+            Nombre d'observations écartées pour chaque valeur du pivot absente
+            du fichier de synchronisation
+        """
+        return self.__inconnus
+
+    def estime(self, nombre):
+        """Voir Transformation.estime : un groupe pour dix observations,
+        faute de mieux"""
+        return nombre / 10
+
+    def commute(self, predicat):
+        """Voir Transformation.commute
+
+        Une sélection portant seulement sur des variables de groupby écarte
+        des groupes entiers, dont les valeurs de ces variables sont reprises
+        telles quelles : elle peut être faite avant l'agrégation.
+
+        Examples
+        --------
+        >>> from pipelinepackage.model.predicat import Comparaison
+        >>> a = AgregationSpatiale('data/synop/postesSynopAvecRegions.csv', 'ID', 'numer_sta', 'Region', groupby=['date'])
+        >>> a.commute(Comparaison('date', '>=', '2022-01-15', 'date')), a.commute(Comparaison('Region', '=', 'Corse'))
+        (True, False)
+        """
+        variables = predicat.variables()
+        return variables <= set(self.__groupby or []) and \
+            not variables & {self.__pivotdata, self.__echelle}
 
     def transforme(self, dataset):
+        """Transformation d'un jeu de données.
 
-        table = self.fusion_synop(dataset)
-
-        body = table.body
-        header = table.header
-
-        # table dans laquelle on groupe les obs
-        groups = {}
-
-        # agrégation des lignes selon les groupes
-        for row in body:
-            cle = row[self.__echelle]
-
-            # concaténation des valeurs des variables par lesquelles on groupe
-            if self.__groupby:
-                for var in self.__groupby:
-                    cle = cle + row[var]
-
-            # ajout au dictionnaire groups
-            if cle in groups:
-                groups[cle].append(row)
-            else:
-                groups[cle] = [row]
+        Agrégation des observations à l'échelle choisie : après la fusion
+        avec le fichier de synchronisation, le calcul est confié à GroupBy,
+        les groupes étant définis par l'échelle et les variables de groupby.
+        Seules les valeurs None sont ignorées : une valeur non numérique
+        (par exemple 'mq') doit être enlevée au préalable (voir EnleveValMq).
 
-        datares = []
-        if self.__groupby:
-            vargroup = [self.__echelle] + self.__groupby
-        else:
-            vargroup = [self.__echelle]
-
-        # calcul des valeurs agrégées sur chaque groupe
-        for data in groups.values():
-
-            obsag = {}
-
-            for var in header:
-                if var not in vargroup:
-                    vals = [float(row.get(var))
-                            for row in data if row.get(var) is not None]
-                    obsag[var] = self.__fonction(vals)
-                else:
-                    obsag[var] = data[0][var]
+        Parameters
+        ----------
+        dataset : Dataset
+            Jeu de données à agréger.
+
+        Returns
+        -------
+        Dataset
+            Une observation par groupe.
+
+        Examples
+        --------
+        >>> d = Dataset(['numer_sta', 'date', 't'], [{'numer_sta': '07005', 'date': '1', 't': '280'}, {'numer_sta': '07015', 'date': '1', 't': '284'}, {'numer_sta': '07110', 'date': '1', 't': '282'}, {'numer_sta': '07005', 'date': '2', 't': '278'}])
+        >>> a = AgregationSpatiale('data/synop/postesSynopAvecRegions.csv', 'ID', 'numer_sta', 'Region', groupby=['date'])
+        >>> a.transforme(d).body
+        [{'Region': 'Hauts-de-France', 'date': '1', 't': 282.0}, {'Region': 'Bretagne', 'date': '1', 't': 282.0}, {'Region': 'Hauts-de-France', 'date': '2', 't': 278.0}]
+        >>> AgregationSpatiale('data/synop/postesSynopAvecRegions.csv', 'ID', 'numer_sta', 'Region', groupby=['date'], fonction='max').transforme(d).body[0]
+        {'Region': 'Hauts-de-France', 'date': '1', 't': 284.0}
+        >>> d = Dataset(['numer_sta', 't'], [{'numer_sta': '07005', 't': '280'}, {'numer_sta': '07015', 't': 'mq'}])
+        >>> AgregationSpatiale('data/synop/postesSynopAvecRegions.csv', 'ID', 'numer_sta', 'Region').transforme(d)
+        Traceback (most recent call last):
+        ...
+        ValueError: could not convert string to float: 'mq'
+        """
+        table = self.fusion_synop(dataset)
 
-            datares.append(obsag)
+        vargroup = [self.__echelle] + (self.__groupby or [])
+        agregats = {var: (var, self.__fonction)
+                    for var in table.header if var not in vargroup}
 
-        return Dataset(header, datares)
+        result = GroupBy(vargroup, agregats, valmq=(None,)).transforme(table)
+        return Dataset(table.header, result.body)
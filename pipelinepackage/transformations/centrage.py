@@ -9,7 +9,10 @@ Examples
 [{'nom': 'Anne', 'age': 6.0}, {'nom': 'Clementine', 'age': 0.0}, {'nom': 'Chloe', 'age': -10.0}, {'nom': 'Maelle', 'age': 4.0}]
 
 """
+from array import array
+from pipelinepackage.model.colonne import Colonne
 from pipelinepackage.model.dataset import Dataset
+from pipelinepackage.model.datasetcolonnes import DatasetColonnes
 from pipelinepackage.transformations.transformation import Transformation
 from pipelinepackage.estimateurs.estimateur import Estimateur
 
@@ -32,6 +35,8 @@ class Centrage(Transformation):
     [{'nom': 'Anne', 'age': 6.0}, {'nom': 'Clementine', 'age': 0.0}, {'nom': 'Chloe', 'age': -10.0}, {'nom': 'Maelle', 'age': 4.0}]
     """
 
+    conserve_partition = True
+
     def __init__(self, variables):
         """ Constructeur
 
@@ -64,20 +69,34 @@ class Centrage(Transformation):
         >>> a = Centrage(['age'])
         >>> a.transforme(data).body
         [{'nom': 'Anne', 'age': 6.0}, {'nom': 'Clementine', 'age': 0.0}, {'nom': 'Chloe', 'age': -10.0}, {'nom': 'Maelle', 'age': 4.0}]
+
+        Sur un jeu de données par colonnes, le calcul porte sur les colonnes entières
+        >>> from pipelinepackage.model.datasetcolonnes import DatasetColonnes
+        >>> a.transforme(DatasetColonnes.depuis_dataset(data)).valeurs('age')
+        [6.0, 0.0, -10.0, 4.0]
         """
-        body = dataset.body
         variables = list(set(dataset.header) & set(self.__variables))
-        moys = {}
-
-        for var in variables:
-            estim = Estimateur(var)
-            moys[var] = estim.moyenne(dataset)
+        # moyennes de toutes les variables en un seul parcours
+        moys = Estimateur(variables).moyenne(dataset)
 
+        if isinstance(dataset, DatasetColonnes):
+            resultat = dataset
+            for var in variables:
+                col = dataset.colonne(var)
+                moy = moys[var]
+                resultat = resultat.remplace(
+                    Colonne(var, 'float', array('d', [val - moy for val in col.donnees]),
+                            col.nulls))
+            return resultat.reprend_index(dataset, variables)
+
+        # valeurs remplacées sur place : leurs index ne sont plus valides
+        dataset.oublie_index(variables)
+        body = dataset.body
         for i in range(len(body)):
             for var in variables:
                 body[i][var] = float(body[i][var])-moys[var]
 
-        return Dataset(dataset.header, body)
+        return Dataset(dataset.header, body).reprend_index(dataset)
 
 
 if __name__ == '__main__':
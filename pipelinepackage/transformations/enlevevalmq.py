@@ -1,10 +1,31 @@
 """
 Enlever les valeurs manquantes d'un jeu de données
-"""
 
+Seules les variables choisies sont examinées (par défaut toutes), et chaque
+observation est écartée dès sa première valeur manquante. Sur un jeu de
+données par colonnes, le masque des valeurs manquantes de chaque colonne est
+utilisé directement.
+
+Plutôt que d'écarter les observations, les valeurs manquantes peuvent être
+remplacées (imputation) :
+
+- 'precedente' : dernière valeur connue du même groupe (par exemple de la
+  même station), y compris d'un lot à l'autre lors d'une exécution par lots
+  (voir transforme_lots), mais jamais d'un jeu de données à l'autre ;
+- 'interpolation' : interpolation linéaire dans le temps entre les valeurs
+  connues qui encadrent l'observation, dans le même groupe ;
+- 'moyenne' : moyenne des valeurs connues du groupe.
+
+Les observations dont une valeur n'a pas pu être remplacée (aucune valeur
+précédente, extrémité d'une série...) sont écartées.
+"""
+from pipelinepackage.model.colonne import VALMQ, vers_epoch
 from pipelinepackage.model.dataset import Dataset
+from pipelinepackage.model.datasetcolonnes import DatasetColonnes
 from pipelinepackage.transformations.transformation import Transformation
 
+IMPUTATIONS = (None, 'precedente', 'interpolation', 'moyenne')
+
 
 class EnleveValMq(Transformation):
     """"
@@ -15,6 +36,16 @@ class EnleveValMq(Transformation):
     ----------
     listevalmq : list[str]
             Valeurs que les valeurs manquantes peuvent prendre.
+    variables : list[str]
+        Variables examinées, by default None (toutes les variables)
+    imputation : str
+        Remplacement des valeurs manquantes : None (observations écartées),
+        'precedente', 'interpolation' ou 'moyenne'
+    groupby : list[str]
+        Variables définissant les groupes (par exemple la station) pour l'imputation
+    vardate : str
+        Variable de date, pour l'ordre des observations ('precedente') et
+        l'interpolation ('interpolation', obligatoire)
 
     Examples
     --------
@@ -22,18 +53,190 @@ class EnleveValMq(Transformation):
     >>> a = EnleveValMq(['NA'])
     >>> a.transforme(data).body
     [{'nom': 'Clementine', 'age': 17}, {'nom': 'Chloe', 'age': 7}]
+
+    Seule la variable age est examinée
+    >>> EnleveValMq(['NA'], ['age']).transforme(data).body
+    [{'nom': 'Clementine', 'age': 17}, {'nom': 'Chloe', 'age': 7}, {'nom': 'NA', 'age': 21}]
     """
 
-    def __init__(self, listevalmq):
+    def __init__(self, listevalmq, variables=None, imputation=None, groupby=None,
+                 vardate=None):
         """Constructeur
 
         Parameters
         ----------
         listevalmq : list[str]
             Valeurs que les valeurs manquantes peuvent prendre
+        variables : str ou list[str], optional
+            Variables examinées, by default None (toutes les variables)
+        imputation : str, optional
+            Remplacement des valeurs manquantes ('precedente', 'interpolation'
+            ou 'moyenne'), by default None (observations écartées)
+        groupby : str ou list[str], optional
+            Variables définissant les groupes pour l'imputation, by default None
+        vardate : str, optional
+            Variable de date, by default None
         """
         super().__init__()
+        if isinstance(variables, str):
+            variables = [variables]
+        if isinstance(groupby, str):
+            groupby = [groupby]
+        if imputation not in IMPUTATIONS:
+            raise ValueError("Imputation inconnue : " + str(imputation))
+        if imputation == 'interpolation' and vardate is None:
+            raise ValueError("L'interpolation nécessite une variable de date (vardate)")
         self.__listevalmq = listevalmq
+        self.__variables = variables
+        self.__imputation = imputation
+        self.__groupby = groupby or []
+        self.__vardate = vardate
+        # dernières valeurs connues de chaque groupe ('precedente')
+        self.__dernieres = {}
+        try:
+            self.__valmq = frozenset(listevalmq)
+        except TypeError:
+            self.__valmq = listevalmq
+
+    @property
+    def ligne_a_ligne(self):
+        """Vrai sauf pour l'interpolation et la moyenne, qui ont besoin de
+        toutes les observations d'un groupe"""
+        return self.__imputation in (None, 'precedente')
+
+    @property
+    def fusionnable(self):
+        """Vrai sans imputation : chaque observation est gardée ou écartée seule"""
+        return self.__imputation is None
+
+    @property
+    def conserve_tri(self):
+        """Vrai sans imputation : les observations gardent leur ordre et leurs valeurs"""
+        return self.__imputation is None
+
+    @property
+    def conserve_partition(self):
+        """Vrai sans imputation"""
+        return self.__imputation is None
+
+    @property
+    def imputation(self):
+        """Remplacement des valeurs manquantes"""
+        return self.__imputation
+
+    @property
+    def variables(self):
+        """Variables examinées (None pour toutes)"""
+        return self.__variables
+
+    def estime(self, nombre):
+        """Voir Transformation.estime : sans imputation, une observation sur
+        dix est supposée incomplète"""
+        return nombre * 0.9 if self.__imputation is None else nombre
+
+    def evite_tri(self, tri):
+        """Voir Transformation.evite_tri : les imputations 'precedente' et
+        'interpolation' parcourent les observations dans l'ordre des dates"""
+        if self.__vardate is None or self.__imputation not in ('precedente', 'interpolation'):
+            return None
+        return tuple(tri[:1]) == (self.__vardate,)
+
+    def reinitialise(self):
+        """Oubli des dernières valeurs connues (imputation 'precedente')
+
+        Fait au début de transforme et de transforme_lots : les valeurs
+        connues ne sont conservées que d'un lot à l'autre d'un même jeu de
+        données.
+        """
+        self.__dernieres = {}
+
+    def __examinees(self, dataset):
+        if self.__variables is None:
+            return list(dataset.header)
+        return [var for var in self.__variables if var in dataset.header]
+
+    def __transforme_colonnes(self, dataset, variables):
+        """Observations complètes d'un jeu de données par colonnes"""
+        manquant = bytearray(len(dataset))
+        nulls_manquants = any(val in self.__valmq for val in VALMQ)
+        for var in variables:
+            col = dataset.colonne(var)
+            if nulls_manquants and col.nulls is not None:
+                manquant = bytearray(a | b for a, b in zip(manquant, col.nulls))
+            if col.type == 'str':
+                codes = {code for code, val in enumerate(col.modalites) if val in self.__valmq}
+                if codes:
+                    manquant = bytearray(mq or code in codes
+                                         for mq, code in zip(manquant, col.donnees))
+            elif any(isinstance(val, (int, float)) for val in self.__valmq):
+                manquant = bytearray(mq or val in self.__valmq
+                                     for mq, val in zip(manquant, col.donnees))
+        if not any(manquant):
+            return dataset
+        return dataset.prend([i for i, mq in enumerate(manquant) if not mq])
+
+    def __ordre(self, body, trie):
+        """Positions des observations, dans l'ordre des dates si vardate est renseignée"""
+        if self.__vardate is None or trie:
+            return range(len(body))
+        dates = [vers_epoch(row[self.__vardate]) for row in body]
+        return sorted(range(len(body)), key=dates.__getitem__)
+
+    def __precedente(self, body, variables, trie):
+        valmq = self.__valmq
+        groupby = self.__groupby
+        for i in self.__ordre(body, trie):
+            row = body[i]
+            dernieres = self.__dernieres.setdefault(tuple(row.get(g) for g in groupby), {})
+            for var in variables:
+                val = row.get(var)
+                if val in valmq:
+                    if var in dernieres:
+                        row[var] = dernieres[var]
+                else:
+                    dernieres[var] = val
+
+    def __interpolation(self, body, variables, trie):
+        valmq = self.__valmq
+        groupes = {}
+        for i in self.__ordre(body, trie):
+            groupes.setdefault(tuple(body[i].get(g) for g in self.__groupby), []).append(i)
+        for positions in groupes.values():
+            dates = [vers_epoch(body[i][self.__vardate]) for i in positions]
+            for var in variables:
+                precedent = None
+                en_attente = []
+                for k, i in enumerate(positions):
+                    val = body[i].get(var)
+                    if val in valmq:
+                        if precedent is not None:
+                            en_attente.append(k)
+                        continue
+                    val = float(val)
+                    for j in en_attente:
+                        k0, v0 = precedent
+                        t0, t1 = dates[k0], dates[k]
+                        poids = (dates[j] - t0)/(t1 - t0) if t1 != t0 else 0.0
+                        body[positions[j]][var] = v0 + (val - v0)*poids
+                    en_attente = []
+                    precedent = (k, val)
+
+    def __moyenne(self, body, variables):
+        valmq = self.__valmq
+        sommes = {}
+        for row in body:
+            cle = tuple(row.get(g) for g in self.__groupby)
+            groupe = sommes.setdefault(cle, {var: [0.0, 0] for var in variables})
+            for var in variables:
+                val = row.get(var)
+                if val not in valmq:
+                    groupe[var][0] += float(val)
+                    groupe[var][1] += 1
+        for row in body:
+            groupe = sommes[tuple(row.get(g) for g in self.__groupby)]
+            for var in variables:
+                if row.get(var) in valmq and groupe[var][1]:
+                    row[var] = groupe[var][0]/groupe[var][1]
 
     def transforme(self, dataset):
         """Transformation d'un jeu de données.
@@ -56,24 +259,98 @@ class EnleveValMq(Transformation):
         >>> a = EnleveValMq(['NA'])
         >>> a.transforme(data).body
         [{'nom': 'Clementine', 'age': 17}, {'nom': 'Chloe', 'age': 7}]
+
+        Imputation par station
+        >>> def data():
+        ...     return Dataset(['sta', 'date', 't'], [{'sta': 'A', 'date': '2022-01-01 00:00:00', 't': '10'}, {'sta': 'B', 'date': '2022-01-01 00:00:00', 't': 'mq'}, {'sta': 'A', 'date': '2022-01-01 03:00:00', 't': 'mq'}, {'sta': 'A', 'date': '2022-01-01 12:00:00', 't': '18'}])
+        >>> [row['t'] for row in EnleveValMq(['mq'], ['t'], 'precedente', 'sta').transforme(data()).body]
+        ['10', '10', '18']
+        >>> [row['t'] for row in EnleveValMq(['mq'], ['t'], 'interpolation', 'sta', 'date').transforme(data()).body]
+        ['10', 12.0, '18']
+        >>> [row['t'] for row in EnleveValMq(['mq'], ['t'], 'moyenne', 'sta').transforme(data()).body]
+        ['10', 14.0, '18']
+
+        Les valeurs connues d'un jeu de données ne servent pas au suivant
+        >>> a = EnleveValMq(['mq'], ['t'], 'precedente', 'sta')
+        >>> a.transforme(Dataset(['sta', 't'], [{'sta': 'A', 't': '10'}])).body
+        [{'sta': 'A', 't': '10'}]
+        >>> a.transforme(Dataset(['sta', 't'], [{'sta': 'A', 't': 'mq'}, {'sta': 'A', 't': '12'}])).body
+        [{'sta': 'A', 't': '12'}]
         """
-        body = []
+        self.reinitialise()
+        return self.__transforme(dataset)
+
+    def transforme_lots(self, lots):
+        """Transformation des lots successifs d'un même jeu de données
+
+        Avec l'imputation 'precedente', les dernières valeurs connues d'un lot
+        servent aux lots suivants (voir Transformation.transforme_lots).
+
+        Examples
+        --------
+        >>> lots = [Dataset(['sta', 't'], [{'sta': 'A', 't': '10'}]), Dataset(['sta', 't'], [{'sta': 'A', 't': 'mq'}])]
+        >>> [lot.body for lot in EnleveValMq(['mq'], ['t'], 'precedente', 'sta').transforme_lots(lots)]
+        [[{'sta': 'A', 't': '10'}], [{'sta': 'A', 't': '10'}]]
+        """
+        self.reinitialise()
+        for lot in lots:
+            yield self.__transforme(lot)
+
+    def __transforme(self, dataset):
+        """Transformation d'un jeu de données ou d'un lot, les dernières
+        valeurs connues étant conservées"""
+        variables = self.__examinees(dataset)
+        if self.__imputation is None and isinstance(dataset, DatasetColonnes):
+            return self.__transforme_colonnes(dataset, variables)
+
         data = dataset.body
+        if self.__imputation is not None:
+            # valeurs remplacées sur place : leurs index ne sont plus valides
+            dataset.oublie_index(variables)
+        # observations déjà dans l'ordre des dates : pas de tri
+        trie = bool(self.evite_tri(dataset.tri))
+        if self.__imputation == 'precedente':
+            self.__precedente(data, variables, trie)
+        elif self.__imputation == 'interpolation':
+            self.__interpolation(data, variables, trie)
+        elif self.__imputation == 'moyenne':
+            self.__moyenne(data, variables)
 
+        valmq = self.__valmq
+        body = []
         for row in data:
-            check = True
-            for val in dataset.header:
-                if row.get(val) in self.__listevalmq:
-                    check = False
-            if check:
+            for var in variables:
+                if row.get(var) in valmq:
+                    break
+            else:
                 body.append(row)
 
-        header = []
-        if len(body) > 0:
-            header = list(body[0])
+        return Dataset(dataset.header, body)
+
+    def compile_ligne(self, dataset, header):
+        """Test d'une seule observation, sans imputation (voir
+        Transformation.compile_ligne)
+
+        Examples
+        --------
+        >>> fonction, _ = EnleveValMq(['NA']).compile_ligne(None, ['nom', 'age'])
+        >>> fonction({'nom': 'Chloe', 'age': 7}), fonction({'nom': 'Anne', 'age': 'NA'})
+        ({'nom': 'Chloe', 'age': 7}, None)
+        """
+        if self.__imputation is not None:
+            return None
+        variables = list(header) if self.__variables is None else \
+            [var for var in self.__variables if var in header]
+        valmq = self.__valmq
+
+        def enleve(row):
+            for var in variables:
+                if row.get(var) in valmq:
+                    return None
+            return row
+        return enleve, header
 
-        return Dataset(header, body)
 
 if __name__ == '__main__':
     import doctest
-    doctest.testmod(verbose=True)
\ No newline at end of file
+    doctest.testmod(verbose=True)
@@ -2,10 +2,51 @@
 module fenetrage
 
 Sélectionner toutes les observations dont la date est dans une fourchette donnée.
+
+Les bornes des fenêtres sont converties une seule fois, à la construction.
+Plusieurs fenêtres (par exemple tous les week-ends d'un mois) peuvent être
+extraites en un seul parcours. Si le jeu de données est trié selon la date
+(trie=True ou Dataset.tri) ou porte un index trié sur la variable de date (voir
+Dataset.indexe), les fenêtres sont trouvées par recherche dichotomique, sans
+examiner les autres observations.
 """
-from datetime import datetime
+from bisect import bisect_right
+from itertools import chain
+from pipelinepackage.model.colonne import VALMQ, vers_epoch
 from pipelinepackage.transformations.transformation import Transformation
 from pipelinepackage.model.dataset import Dataset
+from pipelinepackage.model.datasetcolonnes import DatasetColonnes
+from pipelinepackage.model.predicat import Comparaison, Ou
+
+
+def _secondes(valeur):
+    """Date en secondes, None si elle est manquante
+
+    Examples
+    --------
+    >>> _secondes('1970-01-02'), _secondes('mq'), _secondes(None)
+    (86400, None, None)
+    """
+    if valeur in VALMQ:
+        return None
+    return vers_epoch(valeur)
+
+
+def _recherche(cle, nombre, valeur, droite=False):
+    """Recherche dichotomique dans une suite triée lue par la fonction cle
+
+    Rend la première position dont la clé est supérieure ou égale à valeur
+    (strictement supérieure si droite est vrai).
+    """
+    bas, haut = 0, nombre
+    while bas < haut:
+        milieu = (bas + haut)//2
+        val = cle(milieu)
+        if val < valeur or (droite and val == valeur):
+            bas = milieu + 1
+        else:
+            haut = milieu
+    return bas
 
 
 class Fenetrage(Transformation):
@@ -13,7 +54,8 @@ class Fenetrage(Transformation):
 
     Modélise une sélection de lignes selon une variable de date.
     Les dates sont des chaines de caractères au format suivant :
-    'yyyy-mm-dd hh:mm:ss' ou 'yyyy-mm-dd'
+    'yyyy-mm-dd hh:mm:ss' ou 'yyyy-mm-dd', des secondes depuis le 1er janvier
+    1970 ou des datetime (voir FormaterDate)
 
     Attributes
     ----------
@@ -23,6 +65,10 @@ class Fenetrage(Transformation):
         Date avant laquelle on souhaite obtenir les observations
     date : str
         Nom de la variable de date du jeu de données
+    trie : bool
+        Vrai si les jeux de données transformés sont triés selon la date
+    fenetres : list[tuple]
+        Autres fenêtres (date de début, date de fin) sélectionnées
 
     Examples
     --------
@@ -30,30 +76,164 @@ class Fenetrage(Transformation):
     >>> a = Fenetrage('2003-01-01', '2005-12-31', 'date')
     >>> a.transforme(data).body
     [{'nom': 'Clementine', 'date': '2004-09-25'}]
+
+    Plusieurs fenêtres
+    >>> a = Fenetrage(None, None, 'date', fenetres=[('1998-01-01', '1998-12-31'), ('2015-01-01', '2015-12-31')])
+    >>> [row['nom'] for row in a.transforme(data).body]
+    ['Anne', 'Chloe']
     """
 
-    def __init__(self, date_debut, date_fin, variable):
+    ligne_a_ligne = True
+    conserve_tri = True
+    conserve_partition = True
+    fusionnable = True
+
+    def __init__(self, date_debut, date_fin, variable, trie=False, fenetres=None):
         """ Constructeur
 
         Parameters
         ----------
         date_debut : str
             Date à partir de laquelle on souhaite obtenir les observations
+            (None si seules les fenêtres sont données)
         date_fin : str
             Date avant laquelle on souhaite obtenir les observations
         variable : str
             Nom de la variable de date du jeu de données
+        trie : bool, optional
+            Vrai si les jeux de données transformés sont triés selon la date
+            (sans valeur manquante), by default False
+        fenetres : list[tuple], optional
+            Autres fenêtres (date de début, date de fin), by default None
         """
         super().__init__()
         self.__date_debut = date_debut
         self.__date_fin = date_fin
         self.__variable = variable
+        self.__trie = trie
+        self.__fenetres = ([(date_debut, date_fin)] if date_debut is not None else []) + \
+            list(fenetres or [])
+        if not self.__fenetres:
+            raise ValueError("Aucune fenêtre de dates")
+        # bornes converties une fois pour toutes
+        self.__bornes = [(vers_epoch(debut), vers_epoch(fin)) for debut, fin in self.__fenetres]
+        # réunion des fenêtres : intervalles disjoints triés
+        union = []
+        for debut, fin in sorted(self.__bornes):
+            if union and debut <= union[-1][1]:
+                union[-1][1] = max(union[-1][1], fin)
+            elif debut <= fin:
+                union.append([debut, fin])
+        self.__debuts = [debut for debut, _ in union]
+        self.__fins = [fin for _, fin in union]
+
+    @property
+    def trie(self):
+        """Vrai si les jeux de données transformés sont triés selon la date"""
+        return self.__trie
+
+    @property
+    def fenetres(self):
+        """Fenêtres (date de début, date de fin) sélectionnées"""
+        return self.__fenetres
+
+    @property
+    def predicat(self):
+        """Condition vérifiée par les observations sélectionnées
+
+        Returns
+        -------
+        Predicat
+            La date est comprise entre date_debut et date_fin (incluses), ou
+            dans l'une des fenêtres
+
+        Examples
+        --------
+        >>> Fenetrage('2022-01-01', '2022-01-31', 'date').predicat.compile()({'date': '2022-01-15 12:00:00'})
+        True
+        """
+        comparaisons = [Comparaison(self.__variable, 'between', [debut, fin], 'date')
+                        for debut, fin in self.__fenetres]
+        if len(comparaisons) == 1:
+            return comparaisons[0]
+        return Ou(comparaisons)
+
+    def estime(self, nombre):
+        """Voir Transformation.estime et Predicat.selectivite"""
+        return nombre * self.predicat.selectivite()
+
+    def commute(self, predicat):
+        """Voir Transformation.commute : deux sélections peuvent être faites
+        dans n'importe quel ordre"""
+        return True
+
+    def __dans_union(self, secondes):
+        """Vrai si la date est dans l'une des fenêtres"""
+        k = bisect_right(self.__debuts, secondes) - 1
+        return k >= 0 and secondes <= self.__fins[k]
+
+    def __cle(self, dataset):
+        """Fonction rendant la date (en secondes) d'une position du jeu de
+        données trié, None si le jeu de données ne s'y prête pas (dates
+        manquantes comprises : elles ne sont pas ordonnées)"""
+        if isinstance(dataset, DatasetColonnes):
+            col = dataset.colonne(self.__variable)
+            if col.type in ('date', 'int') and col.nulls is None:
+                return col.donnees.__getitem__
+            return None
+        body = dataset.body
+        variable = self.__variable
+        if any(row.get(variable) in VALMQ for row in body):
+            return None
+        return lambda i: vers_epoch(body[i][variable])
+
+    def __extraits(self, dataset, bornes):
+        """Positions des observations de chaque fenêtre (range si elles sont
+        consécutives), trouvées par recherche dichotomique dans le jeu de
+        données trié ou dans un index trié ; None si aucun des deux"""
+        index = dataset.index(self.__variable, 'tri', 'date')
+        if index is not None:
+            return [index.intervalle(debut, fin) for debut, fin in bornes]
+        if not self.__trie and dataset.tri[:1] != (self.__variable,):
+            return None
+        cle = self.__cle(dataset)
+        if cle is None:
+            return None
+        nombre = len(dataset)
+        return [range(_recherche(cle, nombre, debut), _recherche(cle, nombre, fin, True))
+                for debut, fin in bornes]
+
+    @staticmethod
+    def __extrait(dataset, positions):
+        """Observations aux positions données"""
+        if isinstance(positions, range):
+            if isinstance(dataset, DatasetColonnes):
+                return dataset.tranche(positions.start, positions.stop)
+            return Dataset(dataset.header, dataset.body[positions.start:positions.stop])
+        if isinstance(dataset, DatasetColonnes):
+            return dataset.prend(positions)
+        data = dataset.body
+        return Dataset(dataset.header, [data[i] for i in positions])
+
+    def __secondes(self, dataset):
+        """Dates du jeu de données en secondes (None si manquante)"""
+        if isinstance(dataset, DatasetColonnes):
+            col = dataset.colonne(self.__variable)
+            if col.type == 'str':
+                secondes = [_secondes(val) for val in col.modalites] + [None]
+                return [secondes[code] for code in col.donnees]
+            if col.type in ('date', 'int'):
+                if col.nulls is None:
+                    return col.donnees
+                return [None if mq else val for val, mq in zip(col.donnees, col.nulls)]
+        return [_secondes(val) for val in dataset.valeurs(self.__variable)]
 
     def transforme(self, dataset):
         """ Transformation d'un jeu de données
 
         Sélection des observation du jeu de données dataset dont la variable de
-        date des observations est comprise entre date_debut et date_fin.
+        date des observations est comprise entre date_debut et date_fin (ou
+        dans l'une des fenêtres). Les observations gardent leur ordre.
 
         Parameters
         ----------
@@ -71,17 +251,103 @@ class Fenetrage(Transformation):
         >>> a = Fenetrage('2003-01-01', '2020-05-10', 'date')
         >>> a.transforme(data).body
         [{'nom': 'Clementine', 'date': '2004-09-25'}, {'nom': 'Chloe', 'date': '2015-10-09'}]
+
+        Les observations sans date sont écartées
+        >>> data = Dataset(['nom', 'date'], [{'nom': 'Anne', 'date': 'mq'}, {'nom': 'Clementine', 'date': '2004-09-25'}, {'nom': 'Chloe', 'date': None}])
+        >>> a.transforme(data).body
+        [{'nom': 'Clementine', 'date': '2004-09-25'}]
+
+        Jeu de données trié : recherche dichotomique
+        >>> data = Dataset(['date'], [{'date': '2022-01-0' + str(j)} for j in range(1, 10)])
+        >>> Fenetrage('2022-01-03', '2022-01-05', 'date', trie=True).transforme(data).body
+        [{'date': '2022-01-03'}, {'date': '2022-01-04'}, {'date': '2022-01-05'}]
+
+        Une date manquante empêche la recherche dichotomique : les observations
+        sont alors examinées une à une
+        >>> data = Dataset(['date'], [{'date': 'mq'}, {'date': '2022-01-03'}, {'date': None}, {'date': '2022-01-04'}], tri=('date',))
+        >>> Fenetrage('2022-01-03', '2022-01-05', 'date').transforme(data).body
+        [{'date': '2022-01-03'}, {'date': '2022-01-04'}]
+
+        Jeu de données indexé selon la date
+        >>> data = Dataset(['date'], [{'date': '2022-01-0' + str(j)} for j in (5, 1, 3, 9)])
+        >>> index = data.indexe('date', 'tri', 'date')
+        >>> Fenetrage('2022-01-03', '2022-01-05', 'date').transforme(data).body
+        [{'date': '2022-01-05'}, {'date': '2022-01-03'}]
         """
-        result = []
-        data = dataset.body
+        extraits = self.__extraits(dataset, list(zip(self.__debuts, self.__fins)))
+        if extraits is not None:
+            if len(extraits) == 1:
+                return self.__extrait(dataset, extraits[0])
+            # fenêtres disjointes et triées : les positions de fenêtres
+            # consécutives se suivent, sinon elles sont remises dans l'ordre
+            positions = list(chain.from_iterable(extraits))
+            if not all(isinstance(extrait, range) for extrait in extraits):
+                positions.sort()
+            return self.__extrait(dataset, positions)
+
+        dans_union = self.__dans_union
+        indices = [i for i, secondes in enumerate(self.__secondes(dataset))
+                   if secondes is not None and dans_union(secondes)]
+        return self.__extrait(dataset, indices)
+
+    def compile_ligne(self, dataset, header):
+        """Test de la date d'une seule observation (voir Transformation.compile_ligne)
+
+        Examples
+        --------
+        >>> fonction, _ = Fenetrage('2003-01-01', '2005-12-31', 'date').compile_ligne(None, ['date'])
+        >>> fonction({'date': '2004-09-25'}), fonction({'date': '1998-07-24'})
+        ({'date': '2004-09-25'}, None)
+        >>> fonction({'date': 'mq'}), fonction({})
+        (None, None)
+        """
+        dans_union = self.__dans_union
+        variable = self.__variable
+
+        def selectionne(row):
+            secondes = _secondes(row.get(variable))
+            return row if secondes is not None and dans_union(secondes) else None
+        return selectionne, header
+
+    def decoupe(self, dataset):
+        """Extraction de chaque fenêtre séparément, en un seul parcours
+
+        Parameters
+        ----------
+        dataset : Dataset
+            Jeu de données sur lequel on effectue la sélection d'observations
+
+        Returns
+        -------
+        list[Dataset]
+            Un jeu de données par fenêtre, dans l'ordre des fenêtres (une
+            observation figure dans chaque fenêtre qui la contient)
+
+        Examples
+        --------
+        >>> data = Dataset(['date'], [{'date': '2022-01-0' + str(j)} for j in range(1, 10)])
+        >>> a = Fenetrage(None, None, 'date', fenetres=[('2022-01-01', '2022-01-02'), ('2022-01-08', '2022-01-09')])
+        >>> [len(fenetre) for fenetre in a.decoupe(data)]
+        [2, 2]
+        >>> [fenetre.body[0]['date'] for fenetre in Fenetrage(None, None, 'date', True, a.fenetres).decoupe(data)]
+        ['2022-01-01', '2022-01-08']
+        """
+        extraits = self.__extraits(dataset, self.__bornes)
+        if extraits is not None:
+            return [self.__extrait(dataset, positions) for positions in extraits]
 
-        for row in data:
-            if (datetime.fromisoformat(self.__date_debut) <=
-                datetime.fromisoformat(row[self.__variable]) <=
-                    datetime.fromisoformat(self.__date_fin)):
-                result.append(row)
+        # fenêtres triées par début : seules celles déjà ouvertes sont examinées
+        ordre = sorted(range(len(self.__bornes)), key=self.__bornes.__getitem__)
+        debuts = [self.__bornes[k][0] for k in ordre]
+        indices = [[] for _ in self.__bornes]
+        for i, secondes in enumerate(self.__secondes(dataset)):
+            if secondes is None:
+                continue
+            for k in ordre[:bisect_right(debuts, secondes)]:
+                if secondes <= self.__bornes[k][1]:
+                    indices[k].append(i)
 
-        return Dataset(dataset.header, result)
+        return [self.__extrait(dataset, positions) for positions in indices]
 
 
 if __name__ == '__main__':
@@ -0,0 +1,251 @@
+"""
+module fenetreglissante
+
+Base pour le calcul de statistiques sur une fenêtre glissante.
+
+Le jeu de données est trié une seule fois selon la variable de date (le tri
+est évité s'il est déjà dans l'ordre, et même sa vérification si le jeu de
+données est décrit comme trié selon la date, éventuellement après les
+variables de groupe : voir Dataset.tri), puis chaque groupe est parcouru une
+seule fois : à chaque pas, les observations qui entrent dans la fenêtre et
+celles qui en sortent mettent à jour des accumulateurs (voir le module
+accumulateursglissants), pour toutes les variables à la fois.
+
+Deux types de fenêtres sont possibles :
+
+- un nombre d'observations (nvals), centré sur l'observation courante ;
+- une durée (duree), couvrant les observations des dernières secondes
+  jusqu'à l'observation courante incluse.
+"""
+from abc import abstractmethod
+from datetime import timedelta
+from math import floor
+from operator import itemgetter
+from pipelinepackage.transformations.transformation import Transformation
+from pipelinepackage.model.colonne import vers_epoch
+from pipelinepackage.model.dataset import Dataset
+
+
+class FenetreGlissante(Transformation):
+    """Classe abstraite FenetreGlissante
+
+    Attributes
+    ----------
+    variables : list[str]
+        Variables numériques sur lesquelles calculer les statistiques
+    nvals : int
+        Nombre de valeurs de la fenêtre centrée (None si fenêtre de durée)
+    vardate : str
+        Nom de la variable de date du jeu de données
+    duree : timedelta
+        Durée de la fenêtre (None si fenêtre de nvals valeurs)
+    groupby : list[str]
+        Variables définissant des groupes (par exemple la région) sur lesquels
+        les fenêtres sont calculées séparément
+    """
+
+    def __init__(self, variables, nvals, vardate, duree=None, groupby=None):
+        """Constructeur
+
+        Parameters
+        ----------
+        variables : str ou list[str]
+            Variable(s) numérique(s) sur laquelle/lesquelles calculer les statistiques
+        nvals : int
+            Nombre de valeurs de la fenêtre centrée (ignoré si duree est renseignée)
+        vardate : str
+            Nom de la variable de date du jeu de données
+        duree : timedelta ou int, optional
+            Durée de la fenêtre (en secondes si entier), by default None
+        groupby : str ou list[str], optional
+            Variable(s) définissant les groupes, by default None
+        """
+        super().__init__()
+        if isinstance(variables, str):
+            variables = [variables]
+        if isinstance(groupby, str):
+            groupby = [groupby]
+        if isinstance(duree, timedelta):
+            duree = duree.total_seconds()
+        self.__variables = variables
+        self.__nvals = nvals if duree is None else None
+        self.__vardate = vardate
+        self.__duree = duree
+        self.__groupby = groupby or []
+
+    @property
+    def variables(self):
+        """Variables sur lesquelles calculer les statistiques"""
+        return self.__variables
+
+    @property
+    def vardate(self):
+        """Nom de la variable de date du jeu de données"""
+        return self.__vardate
+
+    def evite_tri(self, tri):
+        """Voir Transformation.evite_tri : vrai si les observations sont
+        décrites comme triées selon la date, éventuellement après les
+        variables de groupe"""
+        tri = tuple(tri)
+        groupby = tuple(self.__groupby)
+        suite = tri[len(groupby):len(groupby)+1] == (self.__vardate,)
+        return tri[:1] == (self.__vardate,) or \
+            bool(groupby and set(tri[:len(groupby)]) == set(groupby) and suite)
+
+    def ordre(self, tri):
+        """Voir Transformation.ordre : les observations sont rendues triées
+        selon la date, sauf si leur ordre décrit suffisait"""
+        return tuple(tri) if self.evite_tri(tri) else (self.__vardate,)
+
+    @abstractmethod
+    def accumulateurs(self, variable):
+        """Statistiques à calculer pour une variable
+
+        Parameters
+        ----------
+        variable : str
+            Nom de la variable
+
+        Returns
+        -------
+        list[tuple[str, Accumulateur]]
+            Nom de la nouvelle variable et accumulateur pour chaque statistique
+        """
+
+    def ordonne(self, body):
+        """Tri des observations selon la variable de date
+
+        Parameters
+        ----------
+        body : list[dict]
+            Observations
+
+        Returns
+        -------
+        list[dict]
+            Observations triées (la liste d'origine si elle l'était déjà)
+        """
+        dates = [row[self.__vardate] for row in body]
+        if all(dates[i] <= dates[i+1] for i in range(len(dates)-1)):
+            return body
+        return sorted(body, key=itemgetter(self.__vardate))
+
+    def groupes(self, body):
+        """Positions des observations de chaque groupe
+
+        Parameters
+        ----------
+        body : list[dict]
+            Observations triées selon la date
+
+        Returns
+        -------
+        list[list[int]]
+            Positions des observations de chaque groupe, dans l'ordre des dates
+        """
+        if not self.__groupby:
+            return [list(range(len(body)))]
+        groupes = {}
+        for i, row in enumerate(body):
+            cle = tuple(row.get(var) for var in self.__groupby)
+            groupes.setdefault(cle, []).append(i)
+        return list(groupes.values())
+
+    def bornes(self, body, positions):
+        """Fenêtre associée à chaque observation d'un groupe
+
+        Parameters
+        ----------
+        body : list[dict]
+            Observations triées selon la date
+        positions : list[int]
+            Positions des observations du groupe
+
+        Returns
+        -------
+        generator[tuple[int, int, int]]
+            Rang de l'observation dans le groupe, rang de début (inclus) et de
+            fin (exclu) de sa fenêtre, par rangs croissants
+        """
+        nb_obs = len(positions)
+        if self.__duree is None:
+            # calcul du pas à gauche et à droite
+            step_deb = floor(self.__nvals/2)
+            step_fin = step_deb-1 if self.__nvals % 2 == 0 else step_deb
+            for k in range(step_deb, nb_obs-step_fin):
+                yield k, k-step_deb, k+step_fin+1
+        else:
+            dates = [vers_epoch(body[i][self.__vardate]) for i in positions]
+            debut = 0
+            for k in range(nb_obs):
+                while dates[debut] <= dates[k] - self.__duree:
+                    debut += 1
+                yield k, debut, k+1
+
+    def transforme(self, dataset):
+        """Transformation d'un jeu de données.
+
+        Calcul des statistiques glissantes sur un jeu de données.
+
+        Parameters
+        ----------
+        dataset : Dataset
+            Jeu de données sur lequel on souhaite calculer les statistiques.
+
+        Returns
+        -------
+        Dataset
+            Jeu de données trié selon la date (ou laissé dans son ordre s'il
+            est décrit comme trié selon les variables de groupe puis la date),
+            avec une nouvelle variable par statistique et par variable.
+
+        Examples
+        --------
+        >>> from pipelinepackage.transformations.moyenneglissante import MoyenneGlissante
+        >>> data = Dataset(['r', 'date', 't'], [{'r': 'A', 'date': '2020-01-02', 't': 1}, {'r': 'A', 'date': '2020-01-03', 't': 3}, {'r': 'B', 'date': '2020-01-01', 't': 10}, {'r': 'B', 'date': '2020-01-02', 't': 20}], tri=['r', 'date'])
+        >>> res = MoyenneGlissante('t', 2, 'date', groupby='r').transforme(data)
+        >>> res.tri, [row.get('moygli_t') for row in res.body]
+        (('r', 'date'), [None, 2.0, None, 15.0])
+        """
+        tri = self.ordre(dataset.tri)
+        if self.evite_tri(dataset.tri):
+            # ordre décrit : ni tri ni vérification
+            body = dataset.body
+        else:
+            body = self.ordonne(dataset.body)
+
+        noms = [nom for var in self.__variables for nom, _ in self.accumulateurs(var)]
+        header = dataset.header + [nom for nom in noms if nom not in dataset.header]
+
+        for positions in self.groupes(body):
+            # conversion des valeurs du groupe une seule fois
+            valeurs = {}
+            for var in self.__variables:
+                vals = [body[i].get(var) for i in positions]
+                valeurs[var] = [None if val is None else float(val) for val in vals]
+            pas = [(valeurs[var], nom, acc) for var in self.__variables
+                   for nom, acc in self.accumulateurs(var)]
+
+            debut = fin = 0
+            for k, deb, fi in self.bornes(body, positions):
+                while fin < fi:
+                    for vals, _, acc in pas:
+                        acc.ajoute(vals[fin])
+                    fin += 1
+                while debut < deb:
+                    for vals, _, acc in pas:
+                        acc.retire(vals[debut])
+                    debut += 1
+                row = body[positions[k]]
+                for _, nom, acc in pas:
+                    val = acc.valeur()
+                    if val is not None:
+                        row[nom] = val
+
+        return Dataset(header, body, tri=tri)
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod(verbose=True)
@@ -1,9 +1,109 @@
 """
 Formater les dates
+
+Les formats les plus courants ('%Y%m%d%H%M%S', '%Y%m%d', ISO 8601 sans
+décalage horaire) sont lus par découpage à position fixe, les autres (dont les
+dates avec décalage horaire, '%z') par datetime.strptime. Chaque chaine n'est convertie qu'une fois : une même date
+revient pour toutes les stations (synop) ou toutes les régions (eco2mix), les
+conversions sont donc mémorisées.
+
+Les dates peuvent être rendues sous forme de chaine 'yyyy-mm-dd hh:mm:ss'
+(heure locale, décalage horaire retiré), d'entier (secondes depuis le 1er
+janvier 1970 UTC, décalage horaire pris en compte) ou de datetime ; les
+transformations qui comparent des dates (Fenetrage, SelectionObservations,
+MoyenneGlissante...) acceptent ces trois formes.
 """
 from datetime import datetime
+from functools import lru_cache
+from array import array
 from pipelinepackage.transformations.transformation import Transformation
+from pipelinepackage.model.colonne import Colonne, vers_epoch
 from pipelinepackage.model.dataset import Dataset
+from pipelinepackage.model.datasetcolonnes import DatasetColonnes
+
+SORTIES = ('str', 'epoch', 'datetime')
+
+
+def _lit_compacte(valeur):
+    """Lecture d'une date au format '%Y%m%d%H%M%S' ou '%Y%m%d'"""
+    if len(valeur) not in (8, 14) or not valeur.isdigit():
+        raise ValueError("Date mal formée : " + valeur)
+    if len(valeur) == 8:
+        return datetime(int(valeur[0:4]), int(valeur[4:6]), int(valeur[6:8]))
+    return datetime(int(valeur[0:4]), int(valeur[4:6]), int(valeur[6:8]),
+                    int(valeur[8:10]), int(valeur[10:12]), int(valeur[12:14]))
+
+
+def _lit_iso(valeur):
+    """Lecture d'une date ISO 8601 sans décalage horaire"""
+    return datetime.fromisoformat(valeur)
+
+
+# formats lus sans strptime (les formats ISO ne sont lus ainsi que s'ils
+# ont exactement la longueur attendue, datetime.fromisoformat acceptant
+# d'autres variantes, dont un décalage horaire)
+LECTEURS = {'%Y%m%d%H%M%S': (_lit_compacte, 14),
+            '%Y%m%d': (_lit_compacte, 8),
+            '%Y-%m-%dT%H:%M:%S': (_lit_iso, 19),
+            '%Y-%m-%d %H:%M:%S': (_lit_iso, 19),
+            '%Y-%m-%d': (_lit_iso, 10)}
+
+
+# formats dont l'ordre alphabétique est l'ordre chronologique
+CHRONOLOGIQUES = ('%Y%m%d%H%M%S', '%Y%m%d', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%d %H:%M:%S',
+                  '%Y-%m-%d')
+
+
+def convertisseur(dateformat, sortie='str', taille_cache=65536):
+    """Fonction de conversion des dates d'un format donné
+
+    Parameters
+    ----------
+    dateformat : str
+        Format des dates lues (voir datetime.strptime)
+    sortie : str, optional
+        Forme des dates rendues : 'str', 'epoch' ou 'datetime', by default 'str'
+    taille_cache : int, optional
+        Nombre de conversions mémorisées, by default 65536
+
+    Returns
+    -------
+    function
+        Fonction qui prend une chaine et rend la date convertie
+
+    Examples
+    --------
+    >>> convertisseur('%Y%m%d%H%M%S')('20220101030000')
+    '2022-01-01 03:00:00'
+    >>> convertisseur('%Y-%m-%dT%H:%M:%S%z', 'epoch')('2022-01-01T03:00:00+01:00')
+    1641002400
+    >>> convertisseur('%Y-%m-%dT%H:%M:%S%z')('2022-01-01T03:00:00+01:00')
+    '2022-01-01 03:00:00'
+    >>> convertisseur('%Y-%m-%dT%H:%M:%S%z')('2022-01-01 03:00:00')
+    Traceback (most recent call last):
+    ...
+    ValueError: time data '2022-01-01 03:00:00' does not match format '%Y-%m-%dT%H:%M:%S%z'
+    >>> convertisseur('%d/%m/%Y', 'datetime')('15/01/2022')
+    datetime.datetime(2022, 1, 15, 0, 0)
+    """
+    if sortie not in SORTIES:
+        raise ValueError("Sortie inconnue : " + str(sortie))
+    lecteur, longueur = LECTEURS.get(dateformat, (None, None))
+
+    def lit(valeur):
+        if lecteur is not None and len(valeur) == longueur:
+            return lecteur(valeur)
+        return datetime.strptime(valeur, dateformat)
+
+    if sortie == 'str':
+        def convertit(valeur):
+            return str(lit(valeur).replace(tzinfo=None))
+    elif sortie == 'epoch':
+        def convertit(valeur):
+            return vers_epoch(lit(valeur))
+    else:
+        convertit = lit
+    return lru_cache(maxsize=taille_cache)(convertit)
 
 
 class FormaterDate(Transformation):
@@ -16,6 +116,9 @@ class FormaterDate(Transformation):
     dateformats : str ou list[str]
         Format de la date correspondant a/aux variables
         (variable et doivent avoir le même type et la même longueur si listes)
+    sortie : str
+        Forme des dates obtenues : 'str' (chaine 'yyyy-mm-dd hh:mm:ss'),
+        'epoch' (secondes depuis le 1er janvier 1970) ou 'datetime'
 
     Examples
     --------
@@ -23,9 +126,18 @@ class FormaterDate(Transformation):
     >>> a = FormaterDate(['date', 'date2'], ['%Y%m%d%H%M%S', '%Y%m%d'])
     >>> a.transforme(data).body
     [{'nom': 'Clementine', 'date': '2004-10-05 23:00:21', 'date2': '2010-05-20 00:00:00'}, {'nom': 'Chloe', 'date': '2015-07-20 22:15:15', 'date2': '2017-02-01 00:00:00'}, {'nom': 'Maelle', 'date': '2001-03-15 15:51:45', 'date2': '2019-07-10 00:00:00'}]
+
+    Dates en secondes depuis le 1er janvier 1970
+    >>> data = Dataset(['date'], [{'date': '2022-01-01T03:00:00+01:00'}])
+    >>> FormaterDate('date', '%Y-%m-%dT%H:%M:%S%z', 'epoch').transforme(data).body
+    [{'date': 1641002400}]
     """
 
-    def __init__(self, variables, dateformats):
+    ligne_a_ligne = True
+    conserve_partition = True
+    fusionnable = True
+
+    def __init__(self, variables, dateformats, sortie='str'):
         """Constructeur
 
         Parameters
@@ -35,15 +147,56 @@ class FormaterDate(Transformation):
         dateformats : str ou list[str]
             Format de la date correspondant a/aux variables
             (variable et doivent avoir le même type et la même longueur si listes)
+        sortie : str, optional
+            Forme des dates obtenues : 'str', 'epoch' ou 'datetime', by default 'str'
         """
         super().__init__()
+        if isinstance(variables, str):
+            variables = [variables]
+            dateformats = [dateformats]
+        if sortie not in SORTIES:
+            raise ValueError("Sortie inconnue : " + str(sortie))
         self.__variables = variables
         self.__dateformats = dateformats
+        self.__sortie = sortie
+        # conversions mémorisées d'un lot à l'autre
+        self.__conversions = [(var, convertisseur(form, sortie))
+                              for var, form in zip(variables, dateformats)]
+
+    @property
+    def sortie(self):
+        """Forme des dates obtenues"""
+        return self.__sortie
+
+    @property
+    def conserve_tri(self):
+        """Vrai si tous les formats lus vont de l'année à la seconde sans
+        décalage horaire : l'ordre des chaines est alors celui des dates"""
+        return all(form in CHRONOLOGIQUES for form in self.__dateformats)
+
+    def __transforme_colonnes(self, dataset):
+        """Conversion des modalités des colonnes de dates (une fois par date distincte)"""
+        if any(dataset.colonne(var).type != 'str' for var in self.__variables):
+            return None
+        colonnes = []
+        for var, convertit in self.__conversions:
+            col = dataset.colonne(var)
+            # heure locale pour une sortie 'str', comme pour les observations
+            secondes = [vers_epoch(convertit(val)) for val in col.modalites] + [0]
+            donnees = array('q', map(secondes.__getitem__, col.donnees))
+            colonnes.append(Colonne(var, 'date' if self.__sortie == 'str' else 'int',
+                                    donnees, col.nulls))
+        resultat = dataset
+        for col in colonnes:
+            resultat = resultat.remplace(col)
+        return resultat.reprend_index(dataset, self.__variables)
 
     def transforme(self, dataset):
         """Transformation de la date
 
-        Création d'une chaine de caractères pour la date au bon format
+        Création d'une chaine de caractères (ou d'un entier, ou d'un datetime)
+        pour la date au bon format. Sur un jeu de données par colonnes, la
+        variable devient une colonne de type 'date' ('int' si sortie='epoch').
 
         Parameters
         ----------
@@ -61,22 +214,49 @@ class FormaterDate(Transformation):
         >>> a = FormaterDate(['date', 'date2'], ['%Y%m%d%H%M%S', '%Y%m%d'])
         >>> a.transforme(data).body
         [{'nom': 'Clementine', 'date': '2004-10-05 23:00:21', 'date2': '2010-05-20 00:00:00'}, {'nom': 'Chloe', 'date': '2015-07-20 22:15:15', 'date2': '2017-02-01 00:00:00'}, {'nom': 'Maelle', 'date': '2001-03-15 15:51:45', 'date2': '2019-07-10 00:00:00'}]
+
+        >>> d = DatasetColonnes.depuis_dataset(Dataset(['date'], [{'date': '20220101030000'}, {'date': '20220101030000'}]), {'date': 'str'})
+        >>> res = FormaterDate('date', '%Y%m%d%H%M%S').transforme(d)
+        >>> res.colonne('date').type, res.valeurs('date')
+        ('date', ['2022-01-01 03:00:00', '2022-01-01 03:00:00'])
+        >>> d = DatasetColonnes.depuis_dataset(Dataset(['date'], [{'date': '2022-01-01T03:00:00+01:00'}]))
+        >>> FormaterDate('date', '%Y-%m-%dT%H:%M:%S%z').transforme(d).valeurs('date')
+        ['2022-01-01 03:00:00']
         """
-        data = dataset.body
-        body = []
+        if isinstance(dataset, DatasetColonnes) and self.__sortie != 'datetime':
+            res = self.__transforme_colonnes(dataset)
+            if res is not None:
+                return res
+
+        # les dates sont modifiées sur place : leurs index ne sont plus valides
+        dataset.oublie_index(self.__variables)
+        body = dataset.body
+        for row in body:
+            for var, convertit in self.__conversions:
+                row[var] = convertit(row[var])
 
-        if isinstance(self.__variables, str):
-            self.__variables = [self.__variables]
-            self.__dateformats = [self.__dateformats]
+        return Dataset(dataset.header, body).reprend_index(dataset)
 
-        for row in data:
-            for var, form in zip(self.__variables, self.__dateformats):
-                datestr = datetime.strptime(
-                    row[var], form).replace(tzinfo=None)
-                row[var] = str(datestr)
-            body.append(row)
+    def compile_ligne(self, dataset, header):
+        """Conversion des dates d'une seule observation, sur place (voir
+        Transformation.compile_ligne)
+
+        Examples
+        --------
+        >>> data = Dataset(['date'], [{'date': '20220101030000'}])
+        >>> fonction, _ = FormaterDate('date', '%Y%m%d%H%M%S').compile_ligne(data, data.header)
+        >>> fonction(data.body[0])
+        {'date': '2022-01-01 03:00:00'}
+        """
+        # les dates du jeu de données peuvent être modifiées sur place
+        dataset.oublie_index(self.__variables)
+        conversions = self.__conversions
 
-        return Dataset(dataset.header, body)
+        def convertit_dates(row):
+            for var, convertit in conversions:
+                row[var] = convertit(row[var])
+            return row
+        return convertit_dates, header
 
 
 if __name__ == '__main__':
@@ -0,0 +1,162 @@
+"""
+module fusion
+
+Appliquer plusieurs transformations consécutives en un seul parcours.
+
+Les transformations fusionnables (voir Transformation.fusionnable) fournissent
+chacune une fonction traitant une seule observation. La fusion enchaîne ces
+fonctions sur chaque observation : une observation écartée par l'une d'elles
+n'est pas examinée par les suivantes, et aucune liste intermédiaire n'est
+construite. Le résultat est le même que celui des transformations appliquées
+l'une après l'autre.
+"""
+from pipelinepackage.transformations.transformation import Transformation
+from pipelinepackage.model.dataset import Dataset
+from pipelinepackage.model.datasetcolonnes import DatasetColonnes
+
+
+class Fusion(Transformation):
+    """Classe Fusion
+
+    Transformations fusionnables appliquées en un seul parcours.
+
+    Attributes
+    ----------
+    etapes : list[Transformation]
+        Transformations fusionnées, dans l'ordre d'application
+
+    Examples
+    --------
+    >>> from pipelinepackage.transformations.selectionvariables import SelectionVariables
+    >>> from pipelinepackage.transformations.enlevevalmq import EnleveValMq
+    >>> from pipelinepackage.transformations.formaterdate import FormaterDate
+    >>> data = Dataset(['sta', 'date', 't'], [{'sta': 'A', 'date': '20220101000000', 't': '280'}, {'sta': 'B', 'date': '20220101000000', 't': 'mq'}])
+    >>> a = Fusion([SelectionVariables(['date', 't']), EnleveValMq(['mq']), FormaterDate('date', '%Y%m%d%H%M%S')])
+    >>> res = a.transforme(data)
+    >>> res.header, res.body
+    (['date', 't'], [{'date': '2022-01-01 00:00:00', 't': '280'}])
+
+    Une imputation a besoin des autres observations : elle n'est pas fusionnable
+    >>> Fusion([EnleveValMq(['mq'], imputation='moyenne')])
+    Traceback (most recent call last):
+    ...
+    ValueError: EnleveValMq n'est pas fusionnable
+    """
+
+    ligne_a_ligne = True
+    fusionnable = True
+
+    def __init__(self, etapes):
+        """Constructeur
+
+        Parameters
+        ----------
+        etapes : list[Transformation]
+            Transformations fusionnables, dans l'ordre d'application
+
+        Raises
+        ------
+        ValueError
+            Si l'une des transformations n'est pas fusionnable
+        """
+        super().__init__()
+        for etape in etapes:
+            if not etape.fusionnable:
+                raise ValueError(type(etape).__name__ + " n'est pas fusionnable")
+        self.__etapes = list(etapes)
+
+    @property
+    def etapes(self):
+        """Transformations fusionnées"""
+        return self.__etapes
+
+    @property
+    def conserve_tri(self):
+        """Vrai si toutes les transformations fusionnées conservent le tri"""
+        return all(etape.conserve_tri for etape in self.__etapes)
+
+    @property
+    def conserve_partition(self):
+        """Vrai si toutes les transformations fusionnées conservent la partition"""
+        return all(etape.conserve_partition for etape in self.__etapes)
+
+    def estime(self, nombre):
+        """Estimations des transformations fusionnées, enchaînées"""
+        for etape in self.__etapes:
+            nombre = etape.estime(nombre)
+        return nombre
+
+    def ordre(self, tri):
+        """Tri obtenu après les transformations fusionnées"""
+        for etape in self.__etapes:
+            tri = etape.ordre(tri)
+        return tri
+
+    def __fonctions(self, dataset, header):
+        """Fonctions de chacune des transformations et variables obtenues"""
+        fonctions = []
+        for etape in self.__etapes:
+            fonction, header = etape.compile_ligne(dataset, header)
+            fonctions.append(fonction)
+        return fonctions, header
+
+    def compile_ligne(self, dataset, header):
+        """Enchaînement des fonctions des transformations fusionnées (voir
+        Transformation.compile_ligne)"""
+        fonctions, header = self.__fonctions(dataset, header)
+
+        def applique(row):
+            for fonction in fonctions:
+                row = fonction(row)
+                if row is None:
+                    return None
+            return row
+        return applique, header
+
+    def transforme(self, dataset):
+        """Application des transformations en un seul parcours
+
+        Un jeu de données par colonnes est transformé colonne par colonne par
+        chacune des transformations.
+
+        Parameters
+        ----------
+        dataset : Dataset
+            Jeu de données à transformer
+
+        Returns
+        -------
+        Dataset
+            Jeu de données transformé
+
+        Examples
+        --------
+        >>> from pipelinepackage.transformations.selectionobservations import SelectionObservations
+        >>> from pipelinepackage.transformations.selectionvariables import SelectionVariables
+        >>> data = Dataset(['nom', 'age'], [{'nom': 'Anne', 'age': 23}, {'nom': 'Clementine', 'age': 17}, {'nom': 'Maelle', 'age': 21}])
+        >>> Fusion([SelectionObservations(['age'], ['>'], [18], ['int']), SelectionVariables(['nom'])]).transforme(data).body
+        [{'nom': 'Anne'}, {'nom': 'Maelle'}]
+        """
+        if isinstance(dataset, DatasetColonnes):
+            for etape in self.__etapes:
+                dataset = etape.transforme(dataset)
+            return dataset
+
+        fonctions, header = self.__fonctions(dataset, dataset.header)
+
+        body = []
+        garde = body.append
+        for row in dataset.body:
+            for fonction in fonctions:
+                row = fonction(row)
+                if row is None:
+                    break
+            else:
+                garde(row)
+
+        return Dataset(header, body)
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod(verbose=True)
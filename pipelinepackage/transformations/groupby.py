@@ -0,0 +1,207 @@
+"""
+Agréger un jeu de données par groupes d'observations.
+
+Les groupes sont repérés par un tuple des valeurs des variables de
+regroupement (agrégation par hachage) et chaque statistique est calculée au
+fil de l'eau par un accumulateur (module accumulateurs) : un seul passage sur
+les observations suffit pour toutes les statistiques, sans conserver les
+observations de chaque groupe. Sur un jeu de données par colonnes, les
+groupes sont formés directement à partir des codes des modalités.
+
+Examples
+--------
+>>> data = Dataset(['region', 'date', 't'], [{'region': 'Bretagne', 'date': '2022-01-01', 't': '280'}, {'region': 'Corse', 'date': '2022-01-01', 't': '290'}, {'region': 'Bretagne', 'date': '2022-01-02', 't': '284'}, {'region': 'Bretagne', 'date': '2022-01-03', 't': 'mq'}])
+>>> g = GroupBy(['region'], {'tmoy': ('t', 'moyenne'), 'tmax': ('t', 'max'), 'n': ('t', 'compte'), 'debut': ('date', 'premier')})
+>>> for row in g.transforme(data).body:
+...     print(row)
+{'region': 'Bretagne', 'tmoy': 282.0, 'tmax': 284.0, 'n': 2, 'debut': '2022-01-01'}
+{'region': 'Corse', 'tmoy': 290.0, 'tmax': 290.0, 'n': 1, 'debut': '2022-01-01'}
+"""
+from itertools import repeat
+from pipelinepackage.transformations.transformation import Transformation
+from pipelinepackage.estimateurs.accumulateurs import cree_accumulateur
+from pipelinepackage.model.colonne import Colonne, VALMQ
+from pipelinepackage.model.dataset import Dataset
+from pipelinepackage.model.datasetcolonnes import DatasetColonnes
+
+
+class GroupBy(Transformation):
+    """Classe GroupBy
+
+    Attributes
+    ----------
+    cles : list[str]
+        Variables définissant les groupes
+    agregats : dict
+        Pour chaque variable créée, couple (variable agrégée, statistique).
+        La statistique est le nom d'un accumulateur ('compte', 'somme',
+        'moyenne', 'min', 'max', 'ecarttype', 'premier', 'dernier' ou leurs
+        équivalents anglais 'count', 'sum', 'mean', 'std', 'first', 'last'),
+        ou une fonction qui prend la liste des valeurs du groupe
+    valmq : tuple
+        Valeurs considérées comme manquantes (ignorées par les statistiques)
+    """
+
+    def __init__(self, cles, agregats, valmq=VALMQ):
+        """Constructeur
+
+        Parameters
+        ----------
+        cles : str ou list[str]
+            Variable(s) définissant les groupes
+        agregats : dict
+            Pour chaque variable créée, couple (variable agrégée, statistique)
+        valmq : tuple, optional
+            Valeurs considérées comme manquantes, by default (None, '', 'mq')
+        """
+        super().__init__()
+        if isinstance(cles, str):
+            cles = [cles]
+        for _, agregat in agregats.values():
+            # vérification des noms des statistiques dès la construction
+            cree_accumulateur(agregat)
+        self.__cles = cles
+        self.__agregats = agregats
+        self.__valmq = valmq
+
+    @property
+    def cles(self):
+        """Variables définissant les groupes"""
+        return self.__cles
+
+    @property
+    def agregats(self):
+        """Statistiques calculées sur chaque groupe"""
+        return self.__agregats
+
+    def estime(self, nombre):
+        """Voir Transformation.estime : un groupe pour dix observations,
+        faute de mieux"""
+        return nombre / 10
+
+    def commute(self, predicat):
+        """Voir Transformation.commute : une sélection sur les clés écarte
+        des groupes entiers"""
+        return predicat.variables() <= set(self.__cles)
+
+    def ordre(self, tri):
+        """Voir Transformation.ordre : une observation par groupe, dans
+        l'ordre d'apparition, le tri est conservé pour ses premières variables
+        de regroupement"""
+        prefixe = []
+        for var in tri:
+            if var not in self.__cles:
+                break
+            prefixe.append(var)
+        return tuple(prefixe)
+
+    def __valeurs(self, dataset, variable, numerique):
+        """Valeurs d'une variable à transmettre aux accumulateurs (None si manquante)"""
+        if isinstance(dataset, DatasetColonnes):
+            if variable not in dataset.header:
+                return [None] * len(dataset)
+            col = dataset.colonne(variable)
+            if not numerique or col.type == 'str':
+                vals = col.valeurs()
+            else:
+                vals = col.donnees.tolist()
+                if col.nulls is not None:
+                    vals = [None if mq else val for val, mq in zip(vals, col.nulls)]
+                return vals
+        else:
+            valmq = set(self.__valmq)
+            vals = [None if val in valmq else val for val in dataset.valeurs(variable)]
+        if numerique:
+            vals = [None if val is None else float(val) for val in vals]
+        return vals
+
+    def __plan(self, dataset):
+        """Valeurs lues une seule fois par variable et accumulateurs qui les reçoivent"""
+        positions = {}
+        for k, (variable, agregat) in enumerate(self.__agregats.values()):
+            numerique = cree_accumulateur(agregat).numerique
+            positions.setdefault((variable, numerique), []).append(k)
+        return [(self.__valeurs(dataset, variable, numerique), pos)
+                for (variable, numerique), pos in positions.items()]
+
+    def transforme(self, dataset):
+        """Transformation d'un jeu de données.
+
+        Calcul des statistiques sur chaque groupe d'observations.
+
+        Parameters
+        ----------
+        dataset : Dataset
+            Jeu de données à agréger.
+
+        Returns
+        -------
+        Dataset
+            Une observation par groupe (dans l'ordre d'apparition des groupes),
+            avec les variables de regroupement puis les variables créées. Un
+            DatasetColonnes si le jeu de données en est un.
+
+        Examples
+        --------
+        >>> from pipelinepackage.model.datasetcolonnes import DatasetColonnes
+        >>> data = DatasetColonnes.depuis_dataset(Dataset(['region', 't'], [{'region': 'Bretagne', 't': '1'}, {'region': 'Corse', 't': '5'}, {'region': 'Bretagne', 't': '3'}]))
+        >>> res = GroupBy('region', {'tmoy': ('t', 'mean'), 'tstd': ('t', 'std')}).transforme(data)
+        >>> res.valeurs('region'), res.valeurs('tmoy'), res.valeurs('tstd')
+        (['Bretagne', 'Corse'], [2.0, 5.0], [1.4142135623730951, None])
+        """
+        cles = self.__cles
+        if isinstance(dataset, DatasetColonnes):
+            colonnes = [dataset.colonne(var) for var in cles]
+            codes = []
+            for col in colonnes:
+                vals = col.donnees.tolist()
+                if col.nulls is not None and col.type != 'str':
+                    vals = [None if mq else val for val, mq in zip(vals, col.nulls)]
+                codes.append(vals)
+
+            def lit_cle(j, i):
+                return colonnes[j][i]
+        else:
+            codes = [dataset.valeurs(var) for var in cles]
+
+            def lit_cle(j, i):
+                return codes[j][i]
+
+        agregats = [agregat for _, agregat in self.__agregats.values()]
+        plan = self.__plan(dataset)
+        groupes = {}
+        premiers = []
+        for i, cle in enumerate(zip(*codes) if codes else repeat((), len(dataset))):
+            accs = groupes.get(cle)
+            if accs is None:
+                accs = groupes[cle] = [cree_accumulateur(agregat) for agregat in agregats]
+                premiers.append(i)
+            for vals, positions in plan:
+                val = vals[i]
+                if val is not None:
+                    for k in positions:
+                        accs[k].ajoute(val)
+
+        noms = list(self.__agregats)
+        header = cles + [nom for nom in noms if nom not in cles]
+        body = []
+        for i, accs in zip(premiers, groupes.values()):
+            row = {var: lit_cle(j, i) for j, var in enumerate(cles)}
+            for nom, acc in zip(noms, accs):
+                row[nom] = acc.valeur()
+            body.append(row)
+
+        tri = self.ordre(dataset.tri)
+
+        if isinstance(dataset, DatasetColonnes):
+            types = {col.nom: col.type for col in colonnes}
+            resultat = DatasetColonnes([Colonne.depuis_valeurs(var, [row[var] for row in body],
+                                                               types.get(var))
+                                        for var in header])
+            return resultat.decrit_ordre(tri, cles)
+        return Dataset(header, body, tri, cles)
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod(verbose=True)
@@ -3,6 +3,15 @@ module jointure
 
 Joindre deux jeux de données selon un ou plusieurs pivots.
 
+La jointure est faite par hachage : les clés sont les tuples des valeurs des
+pivots et la table est construite sur le plus petit des deux jeux de données.
+La table est un index de hachage (voir Dataset.indexe) conservé par le jeu de
+données : celle de dataset_bis, une fois construite, sert à tous les jeux de
+données joints ensuite (par exemple à chaque lot d'une exécution par lots).
+L'ordre du résultat ne dépend pas de ce choix : observations de dataset dans
+leur ordre (chacune suivie de toutes ses correspondances), puis observations
+de dataset_bis non appariées.
+
 Examples
 --------
 Jointure interne entre data et data_bis selon les pivots 'A' et 'B'
@@ -33,7 +42,9 @@ Jointure complète entre data et data_bis selon les pivots 'A' et 'B'
 >>> a.transforme(data).body
 [{'A': 'a', 'B': 't', 'C': 1, 'D': '3'}, {'A': 'b', 'B': 'u', 'C': 2, 'D': '2'}, {'A': 'c', 'B': 'v', 'C': 3}, {'A': 'd', 'B': 'w', 'D': '1'}]
 """
+from datetime import timedelta
 from pipelinepackage.transformations.transformation import Transformation
+from pipelinepackage.model.colonne import vers_epoch
 from pipelinepackage.model.dataset import Dataset
 
 
@@ -52,6 +63,24 @@ class Jointure(Transformation):
         Variables "pivots" correspondant à pivots pour dataset_bis
     typej : str
         Type de jointure, by default 'inner' (peut être aussi 'full', left', 'right')
+    mode : str
+        Algorithme de jointure, by default 'hachage' :
+
+        - 'hachage' : table de hachage sur le plus petit jeu de données ;
+        - 'tri' : tri des deux jeux de données selon les pivots (évité s'ils
+          sont déjà triés) puis fusion en un seul passage, le résultat étant
+          trié selon les pivots ;
+        - 'asof' : le dernier pivot est une date, les autres pivots (par
+          exemple la région) doivent être égaux ; chaque observation est
+          associée à l'observation de dataset_bis la plus proche dans le temps
+          (seules les jointures 'inner' et 'left' sont possibles).
+    tolerance : float
+        Pour le mode 'asof', écart maximal (en secondes) entre les dates
+        associées, by default None (pas de limite)
+    direction : str
+        Pour le mode 'asof', 'arriere' (dernière date antérieure ou égale),
+        'avant' (première date postérieure ou égale) ou 'proche' (date la plus
+        proche), by default 'arriere'
 
     Examples
     --------
@@ -63,7 +92,8 @@ class Jointure(Transformation):
     [{'A': 'a', 'B': 't', 'C': 1, 'D': '3'}, {'A': 'b', 'B': 'u', 'C': 2, 'D': '2'}, {'A': 'd', 'B': 'w', 'D': '1'}]
     """
 
-    def __init__(self, dataset_bis, pivots, pivots_bis, typej='inner'):
+    def __init__(self, dataset_bis, pivots, pivots_bis, typej='inner', mode='hachage',
+                 tolerance=None, direction='arriere'):
         """Constructeur
 
         Attributs
@@ -76,12 +106,109 @@ class Jointure(Transformation):
             Variables "pivots" correspondant à pivots pour dataset_bis
         typej : str
             Type de jointure, by default 'inner' (peut être aussi 'full', left', 'right')
+        mode : str, optional
+            Algorithme de jointure ('hachage', 'tri' ou 'asof'), by default 'hachage'
+        tolerance : float ou timedelta, optional
+            Pour le mode 'asof', écart maximal entre les dates associées
+            (en secondes si nombre), by default None
+        direction : str, optional
+            Pour le mode 'asof', 'arriere', 'avant' ou 'proche', by default 'arriere'
+
+        Raises
+        ------
+        ValueError
+            Si le type, le mode ou la direction de jointure est inconnu
+
+        Examples
+        --------
+        >>> Jointure(Dataset(['A'], []), ['A'], ['A'], 'outer')
+        Traceback (most recent call last):
+        ...
+        ValueError: Type de jointure inconnu : outer
         """
         super().__init__()
+        if typej not in ('inner', 'left', 'right', 'full'):
+            raise ValueError("Type de jointure inconnu : " + str(typej))
+        if mode not in ('hachage', 'tri', 'asof'):
+            raise ValueError("Mode de jointure inconnu : " + str(mode))
+        if mode == 'asof' and typej not in ('inner', 'left'):
+            raise ValueError("Le mode 'asof' n'accepte que les jointures 'inner' et 'left'")
+        if direction not in ('arriere', 'avant', 'proche'):
+            raise ValueError("Direction inconnue : " + str(direction))
+        if isinstance(tolerance, timedelta):
+            tolerance = tolerance.total_seconds()
         self.__dataset_bis = dataset_bis
         self.__pivots = pivots
         self.__pivots_bis = pivots_bis
         self.__typej = typej
+        self.__mode = mode
+        self.__tolerance = tolerance
+        self.__direction = direction
+
+    @property
+    def typej(self):
+        """Type de jointure"""
+        return self.__typej
+
+    @property
+    def mode(self):
+        """Algorithme de jointure"""
+        return self.__mode
+
+    @property
+    def conserve_tri(self):
+        """Vrai pour une jointure par hachage ou asof interne ou à gauche :
+        les observations de dataset gardent leur ordre (chacune suivie de
+        ses correspondances)"""
+        return self.__mode != 'tri' and self.__typej in ('inner', 'left')
+
+    @property
+    def conserve_partition(self):
+        """Voir conserve_tri"""
+        return self.conserve_tri
+
+    def estime(self, nombre):
+        """Voir Transformation.estime : chaque observation est supposée avoir
+        au plus une correspondance"""
+        if self.__typej == 'right':
+            return len(self.__dataset_bis)
+        if self.__typej == 'full':
+            return max(nombre, len(self.__dataset_bis))
+        return nombre
+
+    def commute(self, predicat):
+        """Voir Transformation.commute
+
+        Pour une jointure interne ou à gauche, chaque observation du résultat
+        provient d'une seule observation de dataset : une sélection ne portant
+        sur aucune variable ajoutée par dataset_bis peut être faite avant la
+        jointure.
+
+        Examples
+        --------
+        >>> from pipelinepackage.model.predicat import Comparaison
+        >>> a = Jointure(Dataset(['A', 'D'], []), ['A'], ['A'])
+        >>> a.commute(Comparaison('A', '=', 'a')), a.commute(Comparaison('D', '=', '3'))
+        (True, False)
+        """
+        if self.__typej not in ('inner', 'left'):
+            return False
+        ajoutees = set(self.__dataset_bis.header) - set(self.__pivots_bis)
+        return not predicat.variables() & ajoutees
+
+    def ordre(self, tri):
+        """Voir Transformation.ordre : la jointure interne par tri-fusion rend
+        les observations triées selon les pivots"""
+        if self.__mode == 'tri' and self.__typej == 'inner':
+            return tuple(self.__pivots)
+        return super().ordre(tri)
+
+    def evite_tri(self, tri):
+        """Voir Transformation.evite_tri : seule la jointure par tri-fusion
+        trie (dataset_bis étant aussi trié s'il ne l'est pas déjà)"""
+        if self.__mode != 'tri':
+            return None
+        return tuple(tri[:len(self.__pivots)]) == tuple(self.__pivots)
 
     def transforme(self, dataset):
         """Jointure de deux jeux de données.
@@ -106,53 +233,209 @@ class Jointure(Transformation):
         >>> a = Jointure(data_bis, ['A', 'B'], ['a', 'b'], 'left')
         >>> a.transforme(data).body
         [{'A': 'a', 'B': 't', 'C': 1, 'd': '3'}, {'A': 'b', 'B': 'u', 'C': 2, 'd': '2'}, {'A': 'c', 'B': 'v', 'C': 3}]
+
+        Toutes les combinaisons d'observations de même clé sont conservées
+        >>> data = Dataset(['A', 'B', 'C'], [{'A': 'A', 'B': 'BC', 'C': 1}, {'A': 'A', 'B': 'BC', 'C': 2}])
+        >>> data_bis = Dataset(['A', 'B', 'D'], [{'A': 'AB', 'B': 'C', 'D': 'x'}, {'A': 'A', 'B': 'BC', 'D': 'y'}, {'A': 'A', 'B': 'BC', 'D': 'z'}])
+        >>> [(row['C'], row['D']) for row in Jointure(data_bis, ['A', 'B'], ['A', 'B']).transforme(data).body]
+        [(1, 'y'), (1, 'z'), (2, 'y'), (2, 'z')]
+
+        Jointure complète par tri-fusion (résultat trié selon les pivots)
+        >>> data = Dataset(['A', 'C'], [{'A': 'c', 'C': 3}, {'A': 'a', 'C': 1}])
+        >>> data_bis = Dataset(['A', 'D'], [{'A': 'b', 'D': '2'}, {'A': 'a', 'D': '1'}])
+        >>> Jointure(data_bis, ['A'], ['A'], 'full', mode='tri').transforme(data).body
+        [{'A': 'a', 'C': 1, 'D': '1'}, {'A': 'b', 'D': '2'}, {'A': 'c', 'C': 3}]
+
+        Jointure asof : dernière mesure (d'au plus 3h) de la région
+        >>> conso = Dataset(['region', 'date', 'conso'], [{'region': 'Bretagne', 'date': '2022-01-01 00:30:00', 'conso': '10'}, {'region': 'Bretagne', 'date': '2022-01-01 03:30:00', 'conso': '11'}, {'region': 'Corse', 'date': '2022-01-01 02:00:00', 'conso': '5'}, {'region': 'Corse', 'date': '2022-01-01 09:00:00', 'conso': '6'}])
+        >>> temp = Dataset(['Region', 'date', 't'], [{'Region': 'Bretagne', 'date': '2022-01-01 00:00:00', 't': '280'}, {'Region': 'Bretagne', 'date': '2022-01-01 03:00:00', 't': '282'}, {'Region': 'Corse', 'date': '2022-01-01 00:00:00', 't': '285'}])
+        >>> a = Jointure(temp, ['region', 'date'], ['Region', 'date'], 'left', mode='asof', tolerance=3*3600)
+        >>> [(row['conso'], row.get('t')) for row in a.transforme(conso).body]
+        [('10', '280'), ('11', '282'), ('5', '285'), ('6', None)]
+        >>> a = Jointure(temp, ['region', 'date'], ['Region', 'date'], mode='asof', direction='proche')
+        >>> [(row['conso'], row.get('t')) for row in a.transforme(conso).body]
+        [('10', '280'), ('11', '282'), ('5', '285'), ('6', '285')]
         """
-        datares = []
+        body = dataset.body
+        body_bis = self.__dataset_bis.body
 
-        data_bis = {}
-        for row in self.__dataset_bis.body:
-            cle = ''
-            for var in self.__pivots_bis:
-                cle += row[var]
-            data_bis[cle] = row
-
-        for row in dataset.body:
-            cle = ''
-            for var in self.__pivots:
-                cle += row[var]
-
-            # si clé dans les deux tables
-            if data_bis.get(cle) is not None:
-                rowdata = {key: value for d in (row, data_bis[cle])
-                           for key, value in d.items()}
-                for pivot_a, pivot_b in zip(self.__pivots, self.__pivots_bis):
-                    if pivot_a != pivot_b:
-                        del rowdata[pivot_b]
-                datares.append(rowdata)
-
-                # suppression si ligne ajoutée au résultat (sert pour 'full' et 'right')
-                del data_bis[cle]
-
-            # si la clé n'est que dans dataset_bis mais on fait une jointure full ou left
-            elif self.__typej in ['full', 'left']:
-                datares.append(row)
-
-        # dans le cas d'une jointure full ou right on veut récupérer les clés du second
-        # jeu de données qui n'apparaissaient pas dans le premier
-        if self.__typej in ['full', 'right'] and data_bis:
-            for obs in data_bis.values():
-                # renommage des variables pivots afin qu'elles aient le même nom que celles
-                # du premier jeu de données
-                for vara, varb in zip(self.__pivots, self.__pivots_bis):
-                    if vara != varb:
-                        obs[vara] = obs[varb]
-                        del obs[varb]
+        if self.__mode == 'tri':
+            paires = self.__paires_tri(dataset, body, body_bis)
+        elif self.__mode == 'asof':
+            paires = self.__paires_asof(body, body_bis)
+        else:
+            paires = self.__paires_hachage(dataset, body, body_bis)
+
+        # variables de dataset_bis ajoutées aux observations, calculées une
+        # seule fois par observation de dataset_bis
+        exclues = set(self.__pivots_bis)
+        ajouts = {}
+
+        def ajout(j):
+            vals = ajouts.get(j)
+            if vals is None:
+                vals = ajouts[j] = {var: val for var, val in body_bis[j].items()
+                                    if var not in exclues}
+            return vals
+
+        datares = []
+        for i, j in paires:
+            if j is None:
+                datares.append(body[i])
+            elif i is None:
+                # les variables pivots prennent le nom de celles du premier jeu de données
+                row = body_bis[j]
+                obs = {var: row.get(var_bis)
+                       for var, var_bis in zip(self.__pivots, self.__pivots_bis)}
+                obs.update(ajout(j))
+                datares.append(obs)
+            else:
+                obs = body[i].copy()
+                obs.update(ajout(j))
                 datares.append(obs)
 
         header = dataset.header + [elem for elem in self.__dataset_bis.header
-                                   if elem not in self.__pivots_bis]
+                                   if elem not in exclues and elem not in dataset.header]
+
+        resultat = Dataset(header, datares)
+        if self.__mode == 'tri' and self.__typej == 'inner':
+            resultat.decrit_ordre(tri=self.ordre(dataset.tri))
+        return resultat
+
+    @staticmethod
+    def __cles(body, pivots):
+        """Clé (tuple des valeurs des pivots) de chaque observation"""
+        return (tuple(map(row.get, pivots)) for row in body)
+
+    def __paires_hachage(self, dataset, body, body_bis):
+        """Couples de positions (dataset, dataset_bis) appariées par hachage
+
+        Une position vaut None pour une observation non appariée conservée.
+        """
+        # table de hachage construite sur le plus petit jeu, sauf si celle de
+        # dataset_bis existe déjà ; les clés contenant une valeur manquante ne
+        # sont pas indexées (elles ne sont appariées à aucune observation)
+        dataset_bis = self.__dataset_bis
+        if len(body_bis) <= len(body) or dataset_bis.index(self.__pivots_bis) is not None:
+            table = dataset_bis.indexe(self.__pivots_bis).table
+            correspondances = [table.get(cle, ())
+                               for cle in self.__cles(body, self.__pivots)]
+        else:
+            table = dataset.indexe(self.__pivots).table
+            correspondances = [[] for _ in body]
+            for j, cle in enumerate(self.__cles(body_bis, self.__pivots_bis)):
+                for i in table.get(cle, ()):
+                    correspondances[i].append(j)
+
+        garde = self.__typej in ('full', 'left')
+        for i, lignes in enumerate(correspondances):
+            for j in lignes:
+                yield i, j
+            if not lignes and garde:
+                yield i, None
+
+        # dans le cas d'une jointure full ou right on veut récupérer les observations
+        # du second jeu de données qui n'ont été appariées à aucune observation
+        if self.__typej in ('full', 'right'):
+            appariees = set().union(*correspondances)
+            for j in range(len(body_bis)):
+                if j not in appariees:
+                    yield None, j
+
+    def __ordre(self, body, pivots, trie=False):
+        """Clés triables et positions des observations dans l'ordre des clés
+
+        Les observations dont la clé contient une valeur manquante sont
+        renvoyées à part, dans leur ordre d'origine. Si le jeu de données est
+        décrit comme trié selon les pivots, l'ordre n'est pas vérifié.
+        """
+        cles = list(self.__cles(body, pivots))
+        completes = [i for i, cle in enumerate(cles) if None not in cle]
+        manquantes = [i for i, cle in enumerate(cles) if None in cle]
+        if not trie and any(cles[a] > cles[b] for a, b in zip(completes, completes[1:])):
+            completes.sort(key=cles.__getitem__)
+        return cles, completes, manquantes
+
+    def __paires_tri(self, dataset, body, body_bis):
+        """Couples de positions (dataset, dataset_bis) appariées par tri-fusion"""
+        pivots, pivots_bis = tuple(self.__pivots), tuple(self.__pivots_bis)
+        cles, ordre, manquantes = self.__ordre(body, pivots, self.evite_tri(dataset.tri))
+        cles_bis, ordre_bis, manquantes_bis = self.__ordre(
+            body_bis, pivots_bis, self.__dataset_bis.tri[:len(pivots_bis)] == pivots_bis)
+        gauche = self.__typej in ('full', 'left')
+        droite = self.__typej in ('full', 'right')
+
+        a = b = 0
+        while a < len(ordre) and b < len(ordre_bis):
+            cle, cle_bis = cles[ordre[a]], cles_bis[ordre_bis[b]]
+            if cle < cle_bis:
+                if gauche:
+                    yield ordre[a], None
+                a += 1
+            elif cle > cle_bis:
+                if droite:
+                    yield None, ordre_bis[b]
+                b += 1
+            else:
+                # blocs d'observations de même clé dans les deux jeux
+                fin, fin_bis = a, b
+                while fin < len(ordre) and cles[ordre[fin]] == cle:
+                    fin += 1
+                while fin_bis < len(ordre_bis) and cles_bis[ordre_bis[fin_bis]] == cle:
+                    fin_bis += 1
+                for i in ordre[a:fin]:
+                    for j in ordre_bis[b:fin_bis]:
+                        yield i, j
+                a, b = fin, fin_bis
+
+        if gauche:
+            for i in ordre[a:] + manquantes:
+                yield i, None
+        if droite:
+            for j in ordre_bis[b:] + manquantes_bis:
+                yield None, j
+
+    def __paires_asof(self, body, body_bis):
+        """Couples de positions (dataset, dataset_bis) appariées selon la date la plus proche
+
+        Dans chaque partition (valeurs des pivots autres que la date), les deux
+        jeux sont triés par date puis parcourus ensemble une seule fois.
+        """
+        partitions = {}
+        for cote, (donnees, pivots) in enumerate(((body, self.__pivots),
+                                                  (body_bis, self.__pivots_bis))):
+            for pos, cle in enumerate(self.__cles(donnees, pivots)):
+                if None in cle:
+                    continue
+                partitions.setdefault(cle[:-1], ([], []))[cote].append((vers_epoch(cle[-1]), pos))
+
+        correspondance = {}
+        for dates, dates_bis in partitions.values():
+            dates.sort()
+            dates_bis.sort()
+            b = 0
+            for date, i in dates:
+                # dernière date de dataset_bis antérieure ou égale
+                while b < len(dates_bis) and dates_bis[b][0] <= date:
+                    b += 1
+                candidats = []
+                if self.__direction in ('arriere', 'proche') and b > 0:
+                    candidats.append(dates_bis[b-1])
+                if self.__direction in ('avant', 'proche'):
+                    suivant = b-1 if b > 0 and dates_bis[b-1][0] == date else b
+                    if suivant < len(dates_bis):
+                        candidats.append(dates_bis[suivant])
+                if not candidats:
+                    continue
+                date_bis, j = min(candidats, key=lambda cand: abs(cand[0] - date))
+                if self.__tolerance is None or abs(date_bis - date) <= self.__tolerance:
+                    correspondance[i] = j
 
-        return Dataset(header, datares)
+        garde = self.__typej == 'left'
+        for i in range(len(body)):
+            j = correspondance.get(i)
+            if j is not None or garde:
+                yield i, j
 
 
 if __name__ == '__main__':
@@ -2,26 +2,61 @@
 Calculer la moyenne glissante d'un jeu de données.
 
 Ne peut d'appliquer qu'à une variable numérique.
+
+Le calcul repose sur le moteur de fenêtres glissantes (module fenetreglissante) :
+un seul tri, puis une somme courante mise à jour à chaque pas.
 """
-from math import floor
-from pipelinepackage.transformations.transformation import Transformation
+from pipelinepackage.transformations.fenetreglissante import FenetreGlissante
+from pipelinepackage.estimateurs.accumulateursglissants import AccMoyenne
 from pipelinepackage.model.dataset import Dataset
-from pipelinepackage.estimateurs.estimateur import Estimateur
-
 
-class MoyenneGlissante(Transformation):
 
-    def __init__(self, variable, nvals, vardate):
+class MoyenneGlissante(FenetreGlissante):
+    """Classe MoyenneGlissante
+
+    Ajoute au jeu de données la moyenne glissante d'une ou plusieurs variables
+    (variable 'moygli_' suivie du nom de la variable).
+
+    Attributes
+    ----------
+    variables : list[str]
+        Variables sur lesquelles calculer la moyenne mobile
+    nvals : int
+        Nombre de valeurs sur lesquelles calculer la moyenne mobile (impair)
+    vardate : str
+        Nom de la variable de date du jeu de données
+    duree : timedelta
+        Durée de la fenêtre, à la place d'un nombre de valeurs
+    groupby : list[str]
+        Variables définissant les groupes sur lesquels calculer séparément la moyenne
+
+    Examples
+    --------
+    Moyenne sur les dernières 24h, par région
+    >>> from datetime import timedelta
+    >>> data = Dataset(['region', 'conso', 'date'], [{'region': 'A', 'conso': 10, 'date': '2022-01-01 00:00:00'}, {'region': 'B', 'conso': 100, 'date': '2022-01-01 00:00:00'}, {'region': 'A', 'conso': 20, 'date': '2022-01-01 12:00:00'}, {'region': 'A', 'conso': 30, 'date': '2022-01-02 06:00:00'}, {'region': 'B', 'conso': 200, 'date': '2022-01-02 06:00:00'}])
+    >>> a = MoyenneGlissante('conso', None, 'date', duree=timedelta(hours=24), groupby='region')
+    >>> [row['moygli_conso'] for row in a.transforme(data).body]
+    [10.0, 100.0, 15.0, 25.0, 200.0]
+    """
+
+    def __init__(self, variable, nvals, vardate, duree=None, groupby=None):
         """Contructeur
 
         Parameters
         ----------
-        variable : str
-            Nom de la variable sur laquelle calculer la moyenne mobile
+        variable : str ou list[str]
+            Nom de la ou des variables sur lesquelles calculer la moyenne mobile
         nvals : int
             Nombre de valeurs sur lesquelles calculer la moyenne mobile (impair)
         vardate : str
             Nom de la variable de date du jeu de données
+        duree : timedelta ou int, optional
+            Durée de la fenêtre (en secondes si entier) : la moyenne porte alors
+            sur les observations de cette durée précédant l'observation courante
+            (incluse), by default None
+        groupby : str ou list[str], optional
+            Variable(s) définissant les groupes (par exemple la région), by default None
 
         Examples
         --------
@@ -30,10 +65,22 @@ class MoyenneGlissante(Transformation):
         >>> a.transforme(data).body
         [{'prix': 15, 'date': '2020-01-01'}, {'prix': 17, 'date': '2020-02-01', 'moygli_prix': 16.0}, {'prix': 16, 'date': '2020-03-01', 'moygli_prix': 16.333}, {'prix': 16, 'date': '2020-04-01', 'moygli_prix': 14.333}, {'prix': 11, 'date': '2020-05-01', 'moygli_prix': 12.333}, {'prix': 10, 'date': '2020-06-01', 'moygli_prix': 10.667}, {'prix': 11, 'date': '2020-07-01', 'moygli_prix': 11.667}, {'prix': 14, 'date': '2020-08-01', 'moygli_prix': 13.333}, {'prix': 15, 'date': '2020-09-01', 'moygli_prix': 15.667}, {'prix': 18, 'date': '2020-10-01', 'moygli_prix': 17.667}, {'prix': 20, 'date': '2020-11-01', 'moygli_prix': 19.0}, {'prix': 19, 'date': '2020-12-01', 'moygli_prix': 19.0}, {'prix': 18, 'date': '2021-01-01', 'moygli_prix': 17.667}, {'prix': 16, 'date': '2021-02-01'}]
         """
-        super().__init__()
-        self.__variable = variable
-        self.__nvals = nvals
-        self.__vardate = vardate
+        super().__init__(variable, nvals, vardate, duree, groupby)
+
+    def accumulateurs(self, variable):
+        """Statistique calculée pour une variable
+
+        Parameters
+        ----------
+        variable : str
+            Nom de la variable
+
+        Returns
+        -------
+        list[tuple[str, Accumulateur]]
+            Nom de la nouvelle variable et accumulateur de la moyenne
+        """
+        return [("moygli_"+variable, AccMoyenne())]
 
     def transforme(self, dataset):
         """Transformation d'un jeu de données.
@@ -55,37 +102,13 @@ class MoyenneGlissante(Transformation):
         >>> a = MoyenneGlissante('prix', 3, 'date')
         >>> a.transforme(data).body
         [{'prix': 15, 'date': '2020-01-01'}, {'prix': 17, 'date': '2020-02-01', 'moygli_prix': 16.0}, {'prix': 16, 'date': '2020-03-01', 'moygli_prix': 16.333}, {'prix': 16, 'date': '2020-04-01', 'moygli_prix': 14.333}, {'prix': 11, 'date': '2020-05-01', 'moygli_prix': 12.333}, {'prix': 10, 'date': '2020-06-01', 'moygli_prix': 10.667}, {'prix': 11, 'date': '2020-07-01', 'moygli_prix': 11.667}, {'prix': 14, 'date': '2020-08-01', 'moygli_prix': 13.333}, {'prix': 15, 'date': '2020-09-01', 'moygli_prix': 15.667}, {'prix': 18, 'date': '2020-10-01', 'moygli_prix': 17.667}, {'prix': 20, 'date': '2020-11-01', 'moygli_prix': 19.0}, {'prix': 19, 'date': '2020-12-01', 'moygli_prix': 19.0}, {'prix': 18, 'date': '2021-01-01', 'moygli_prix': 17.667}, {'prix': 16, 'date': '2021-02-01'}]
+
+        Plusieurs variables en un seul passage
+        >>> data = Dataset(['a', 'b', 'date'], [{'a': 1, 'b': 4, 'date': '2020-01-03'}, {'a': 2, 'b': 5, 'date': '2020-01-01'}, {'a': 3, 'b': 6, 'date': '2020-01-02'}])
+        >>> MoyenneGlissante(['a', 'b'], 2, 'date').transforme(data).body
+        [{'a': 2, 'b': 5, 'date': '2020-01-01'}, {'a': 3, 'b': 6, 'date': '2020-01-02', 'moygli_a': 2.5, 'moygli_b': 5.5}, {'a': 1, 'b': 4, 'date': '2020-01-03', 'moygli_a': 2.0, 'moygli_b': 5.0}]
         """
-        body = dataset.body
-        header = dataset.header
-
-        # tri du jeu de données dans l'ordre croissant selon la variable de date
-        nb_row = len(body)
-        for i in range(1, nb_row):
-            cle = body[i]
-            j = i-1
-            while j >= 0 and body[j][self.__vardate] > cle[self.__vardate]:
-                body[j+1] = body[j]
-                j = j-1
-            body[j+1] = cle
-
-        # nom de la nouvelle variable à ajouter au jeu de données
-        new_var = "moygli_"+self.__variable
-        header.append(new_var)
-
-        estim = Estimateur(self.__variable)
-
-        # calcul du pas à gauche et à droite
-        step_deb = floor(self.__nvals/2)
-        step_fin = step_deb-1 if self.__nvals % 2 == 0 else step_deb
-
-        # calcul de la moyenne glissante
-        for i in range(step_deb, len(body)-step_fin):
-            temp = body[i-step_deb:i+step_fin+1]
-            moytemp = estim.moyenne(Dataset(dataset.header, temp))
-            body[i][new_var] = moytemp
-
-        return Dataset(header, body)
+        return super().transforme(dataset)
 
 
 if __name__ == '__main__':
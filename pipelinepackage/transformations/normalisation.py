@@ -1,8 +1,15 @@
 """
 Normaliser des variables d'un jeu de données.
+
+La moyenne et l'écart-type de toutes les variables sont calculés en un seul
+parcours des observations (méthode de Welford). Ces paramètres peuvent être
+ajustés sur un jeu de données (ajuste) puis appliqués à d'autres (applique),
+par exemple aux lots des mois suivants, sans être recalculés.
 """
+from array import array
+from pipelinepackage.model.colonne import Colonne, VALMQ
 from pipelinepackage.model.dataset import Dataset
-from pipelinepackage.estimateurs.estimateur import Estimateur
+from pipelinepackage.model.datasetcolonnes import DatasetColonnes
 from pipelinepackage.transformations.transformation import Transformation
 
 
@@ -15,6 +22,13 @@ class Normalisation(Transformation):
     ----------
     variables : list[str]
         Liste de la ou des variables que l'on souhaite normaliser.
+    suffixe : str
+        Si renseigné, les valeurs normalisées sont placées dans de nouvelles
+        variables (nom de la variable suivi du suffixe) au lieu de remplacer
+        les valeurs d'origine
+    parametres : dict
+        Moyenne et écart-type (arrondis au millième, comme Estimateur) de
+        chaque variable, s'ils ont été ajustés ou fournis
 
     Examples
     --------
@@ -22,23 +36,167 @@ class Normalisation(Transformation):
     >>> a = Normalisation(['age'])
     >>> a.transforme(data).body
     [{'nom': 'Anne', 'age': 0.8429334082607474}, {'nom': 'Clementine', 'age': 0.0}, {'nom': 'Chloe', 'age': -1.4048890137679122}, {'nom': 'Maelle', 'age': 0.561955605507165}]
+
+    Paramètres ajustés sur un premier jeu de données puis appliqués à un autre
+    >>> a = Normalisation(['t', 'u'], suffixe='_norm').ajuste(Dataset(['t', 'u'], [{'t': '1', 'u': '10'}, {'t': '3', 'u': 'mq'}, {'t': '5', 'u': '30'}]))
+    >>> a.parametres
+    {'t': (3.0, 2.0), 'u': (20.0, 14.142)}
+    >>> a.applique(Dataset(['t', 'u'], [{'t': '7', 'u': 'mq'}])).body
+    [{'t': '7', 'u': 'mq', 't_norm': 2.0, 'u_norm': None}]
     """
 
-    def __init__(self, variables):
+    conserve_partition = True
+
+    def __init__(self, variables, suffixe=None, parametres=None, valmq=VALMQ):
         """Constructeur
 
         Parameters
         ----------
         variables : list[str]
             Liste de la ou des variables que l'on souhaite normaliser.
+        suffixe : str, optional
+            Suffixe des nouvelles variables, by default None (valeurs remplacées)
+        parametres : dict, optional
+            Couple (moyenne, écart-type) de chaque variable, by default None
+            (calculés sur le jeu de données transformé)
+        valmq : tuple, optional
+            Valeurs considérées comme manquantes (ignorées et laissées
+            manquantes), by default (None, '', 'mq')
         """
         super().__init__()
+        if isinstance(variables, str):
+            variables = [variables]
         self.__variables = variables
+        self.__suffixe = suffixe
+        self.__parametres = parametres
+        self.__valmq = valmq
+
+    @property
+    def ligne_a_ligne(self):
+        """Vrai une fois les paramètres connus : chaque observation est alors
+        normalisée indépendamment des autres"""
+        return self.__parametres is not None
+
+    @property
+    def parametres(self):
+        """Moyenne et écart-type de chaque variable (None si non ajustés)"""
+        return self.__parametres
+
+    @property
+    def suffixe(self):
+        """Suffixe des nouvelles variables"""
+        return self.__suffixe
+
+    def __calcule(self, dataset):
+        """Moyenne et écart-type de chaque variable, en un seul parcours"""
+        variables = [var for var in self.__variables if var in dataset.header]
+        nombres = [0] * len(variables)
+        moyennes = [0.0] * len(variables)
+        m2s = [0.0] * len(variables)
+
+        def ajoute(k, val):
+            nombres[k] += 1
+            delta = val - moyennes[k]
+            moyennes[k] += delta/nombres[k]
+            m2s[k] += delta*(val - moyennes[k])
+
+        if isinstance(dataset, DatasetColonnes):
+            for k, var in enumerate(variables):
+                col = dataset.colonne(var)
+                nulls = col.nulls
+                for i, val in enumerate(col.donnees if col.type != 'str' else col.valeurs()):
+                    if (nulls is None or not nulls[i]) and val is not None:
+                        ajoute(k, float(val))
+        else:
+            valmq = set(self.__valmq)
+            positions = list(enumerate(variables))
+            for row in dataset.body:
+                for k, var in positions:
+                    val = row.get(var)
+                    if val not in valmq:
+                        ajoute(k, float(val))
+
+        parametres = {}
+        for k, var in enumerate(variables):
+            if nombres[k] < 2:
+                raise ValueError("Pas assez de valeurs pour normaliser " + var)
+            parametres[var] = (round(moyennes[k], 3), round((m2s[k]/(nombres[k]-1))**(1/2), 3))
+        return parametres
+
+    def ajuste(self, dataset):
+        """Ajustement des paramètres sur un jeu de données
+
+        Parameters
+        ----------
+        dataset : Dataset
+            Jeu de données sur lequel calculer les moyennes et écarts-types
+
+        Returns
+        -------
+        Normalisation
+            La normalisation elle-même, dont les paramètres sont désormais fixés
+        """
+        self.__parametres = self.__calcule(dataset)
+        return self
+
+    def applique(self, dataset, parametres=None):
+        """Normalisation d'un jeu de données avec des paramètres connus
+
+        Parameters
+        ----------
+        dataset : Dataset
+            Jeu de données à normaliser
+        parametres : dict, optional
+            Couple (moyenne, écart-type) de chaque variable, by default None
+            (paramètres ajustés)
+
+        Returns
+        -------
+        Dataset
+            Jeu de données normalisé
+        """
+        if parametres is None:
+            parametres = self.__parametres
+        if parametres is None:
+            raise ValueError("Paramètres de normalisation non ajustés")
+        suffixe = self.__suffixe or ''
+        variables = [var for var in self.__variables if var in parametres]
+
+        if isinstance(dataset, DatasetColonnes):
+            resultat = dataset
+            for var in variables:
+                col = dataset.colonne(var)
+                moy, ecart = parametres[var]
+                vals = col.donnees if col.type != 'str' else \
+                    [float('nan') if val is None else float(val) for val in col.valeurs()]
+                resultat = resultat.remplace(
+                    Colonne(var + suffixe, 'float',
+                            array('d', [(val - moy)/ecart for val in vals]), col.nulls))
+            return resultat.reprend_index(dataset, [var + suffixe for var in variables])
+
+        # sans suffixe les valeurs sont remplacées sur place : leurs index ne
+        # sont plus valides
+        if not self.__suffixe:
+            dataset.oublie_index(variables)
+        valmq = set(self.__valmq)
+        conversions = [(var, var + suffixe) + parametres[var] for var in variables]
+        body = dataset.body
+        for row in body:
+            for var, nouvelle, moy, ecart in conversions:
+                val = row.get(var)
+                row[nouvelle] = None if val in valmq else (float(val) - moy)/ecart
+        header = dataset.header
+        if self.__suffixe:
+            header = header + [var + suffixe for var in variables
+                               if var + suffixe not in header]
+        return Dataset(header, body).reprend_index(dataset)
 
     def transforme(self, dataset):
         """Normalisation d'un jeu de données.
 
-        Normalise les données du jeu de données passé en paramètre.
+        Normalise les données du jeu de données passé en paramètre, avec les
+        paramètres ajustés ou fournis s'il y en a, sinon avec la moyenne et
+        l'écart-type du jeu de données lui-même.
 
         Parameters
         ----------
@@ -56,19 +214,17 @@ class Normalisation(Transformation):
         >>> a = Normalisation(['age'])
         >>> a.transforme(data).body
         [{'nom': 'Anne', 'age': 0.8429334082607474}, {'nom': 'Clementine', 'age': 0.0}, {'nom': 'Chloe', 'age': -1.4048890137679122}, {'nom': 'Maelle', 'age': 0.561955605507165}]
+
+        Deux variables : chaque observation n'apparait qu'une fois
+        >>> data = Dataset(['a', 'b'], [{'a': 1, 'b': 4}, {'a': 3, 'b': 8}])
+        >>> Normalisation(['a', 'b']).transforme(data).body
+        [{'a': -0.7072135785007072, 'b': -0.7072135785007072}, {'a': 0.7072135785007072, 'b': 0.7072135785007072}]
         """
-        data = dataset.body
-        body = []
-        for variable in self.__variables:
-            # calcul de la moyenne et de l'écart-type pour chaque variable
-            estim = Estimateur(variable)
-            moy = estim.moyenne(dataset)
-            ecart = estim.ecarttype(dataset)
-            for row in data:
-                row[variable] = (float(row[variable]) - moy)/ecart
-                body.append(row)
-        return Dataset(dataset.header, body)
+        if self.__parametres is not None:
+            return self.applique(dataset)
+        return self.applique(dataset, self.__calcule(dataset))
+
 
 if __name__ == '__main__':
     import doctest
-    doctest.testmod(verbose=True)
\ No newline at end of file
+    doctest.testmod(verbose=True)
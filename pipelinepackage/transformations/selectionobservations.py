@@ -1,9 +1,13 @@
 """
 Sélectionner des variables à partir de condictions.
+
+Si le jeu de données porte un index (voir Dataset.indexe) sur une variable
+comparée, seules les observations trouvées dans l'index sont examinées.
 """
-from datetime import datetime
 from pipelinepackage.transformations.transformation import Transformation
 from pipelinepackage.model.dataset import Dataset
+from pipelinepackage.model.datasetcolonnes import DatasetColonnes
+from pipelinepackage.model.predicat import Comparaison, Et
 
 
 class SelectionObservations(Transformation):
@@ -14,11 +18,14 @@ class SelectionObservations(Transformation):
     variables : list[str]
         liste de variables
     conditions : list[str]
-        liste de conditions ('=', '>', '<' ou '!=')
+        liste de conditions ('=', '!=', '>', '<', '>=', '<=', 'in',
+        'between', 'null' ou 'notnull')
     valeurs : list[str]
         liste de valeurs pour les conditions
     types : list[str]
         liste des types pris par les variables ('int', 'float', 'str' ou 'date')
+    predicat : Predicat
+        prédicat à utiliser à la place des listes précédentes
 
     Examples
     --------
@@ -35,31 +42,86 @@ class SelectionObservations(Transformation):
     [{'nom': 'Chloe', 'age': 7}]
     """
 
-    def __init__(self, variables, conditions, valeurs, types=None):
+    ligne_a_ligne = True
+    conserve_tri = True
+    conserve_partition = True
+    fusionnable = True
+
+    def __init__(self, variables=None, conditions=None, valeurs=None, types=None,
+                 predicat=None):
         """Constructeur
 
+        Les conditions sont compilées une seule fois en un prédicat
+        (voir le module predicat).
+
         Parameters
         ----------
         variables : list[str]
             liste de variables
         conditions : list[str]
-            liste de conditions ('=', '>', '<' ou '!=')
+            liste de conditions ('=', '!=', '>', '<', '>=', '<=', 'in',
+            'between', 'null' ou 'notnull')
         valeurs : list[str]
-            liste de valeurs pour les conditions
-        types : list[str]
-            liste des types pris par les variables ('int', 'float', 'str' ou 'date')
+            liste de valeurs pour les conditions (une liste pour 'in', une
+            paire de bornes pour 'between')
+        types : list[str], optional
+            liste des types pris par les variables ('int', 'float', 'str' ou 'date'),
+            by default None ('str' pour toutes les variables)
+        predicat : Predicat, optional
+            Prédicat à utiliser à la place des listes précédentes (permet
+            de combiner des conditions avec des ET et des OU), by default None
         """
         super().__init__()
-        self.__variables = variables
-        self.__conditions = conditions
-        self.__valeurs = valeurs
-        self.__types = types
+        if predicat is None:
+            types = types or ['str'] * len(variables)
+            predicat = Et([Comparaison(var, cond, val, typ) for var, cond, val, typ
+                           in zip(variables, conditions, valeurs, types)])
+        self.__predicat = predicat
+        self.__test = predicat.compile()
+
+    @property
+    def predicat(self):
+        """Getter pour l'attribut predicat
+
+        Returns
+        -------
+        Predicat
+            Conditions que doivent vérifier les observations sélectionnées
+        """
+        return self.__predicat
+
+    def estime(self, nombre):
+        """Voir Transformation.estime et Predicat.selectivite"""
+        return nombre * self.__predicat.selectivite()
+
+    def commute(self, predicat):
+        """Voir Transformation.commute : deux sélections peuvent être faites
+        dans n'importe quel ordre"""
+        return True
+
+    def __candidats(self, dataset):
+        """Positions des observations pouvant vérifier le prédicat, lues dans
+        le plus sélectif des index du jeu de données (None si aucun ne sert)"""
+        predicat = self.__predicat
+        comparaisons = predicat.predicats if isinstance(predicat, Et) else [predicat]
+        candidats = None
+        for comparaison in comparaisons:
+            if not isinstance(comparaison, Comparaison):
+                continue
+            for index in (dataset.index(comparaison.variable),
+                          dataset.index(comparaison.variable, 'tri', comparaison.type)):
+                positions = None if index is None else index.cherche(comparaison)
+                if positions is not None and (candidats is None or
+                                              len(positions) < len(candidats)):
+                    candidats = positions
+        return candidats
 
     def transforme(self, dataset):
         """Sélection d'observations d'un jeu de données.
 
         Construit un jeu de données ne contenant que les observations
-        répondant aux conditions passées au constructeur.
+        répondant aux conditions passées au constructeur. Sur un jeu de données
+        par colonnes, les conditions sont évaluées colonne par colonne.
 
         Parameters
         ----------
@@ -84,42 +146,53 @@ class SelectionObservations(Transformation):
         >>> b = SelectionObservations(['nom', 'age'], ['!=', '<'], ['Clementine', 18], ['str', 'int'])
         >>> b.transforme(databis).body
         [{'nom': 'Chloe', 'age': 7}]
+
+        Selection avec un prédicat (âge entre 10 et 20 ou prénom Anne)
+        >>> from pipelinepackage.model.predicat import Comparaison
+        >>> c = SelectionObservations(predicat=Comparaison('age', 'between', [10, 20], 'int') | Comparaison('nom', '=', 'Anne'))
+        >>> c.transforme(databis).body
+        [{'nom': 'Anne', 'age': 23}, {'nom': 'Clementine', 'age': 17}]
+
+        Selection sur un jeu de données par colonnes
+        >>> from pipelinepackage.model.datasetcolonnes import DatasetColonnes
+        >>> a.transforme(DatasetColonnes.depuis_dataset(data)).valeurs('nom')
+        ['Anne', 'Maelle']
+
+        Selection sur un jeu de données indexé selon le nom
+        >>> index = databis.indexe('nom')
+        >>> SelectionObservations(['nom', 'age'], ['in', '>'], [['Anne', 'Chloe'], 10], ['str', 'int']).transforme(databis).body
+        [{'nom': 'Anne', 'age': 23}]
         """
-        body = dataset.body
-        datares = []
-
-        # on passe sur toutes les lignes (observations)
-        for row in body:
-            check = True
-            for var, cond, val, typ in zip(self.__variables, self.__conditions,
-                                           self.__valeurs, self.__types):
-                valrow = row.get(var)
-
-                # conversion dans le bon type pour la comparaison
-                if typ == 'float':
-                    valrow, val = float(valrow), float(val)
-                elif typ == 'int':
-                    valrow, val = int(valrow), int(val)
-                elif typ == 'date':
-                    valrow, val = datetime.fromisoformat(
-                        valrow), datetime.fromisoformat(val)
-
-                # comparaison
-                if cond == '=':
-                    check = check and valrow == val
-                elif cond == '>':
-                    check = check and valrow > val
-                elif cond == '<':
-                    check = check and valrow < val
-                else:
-                    check = check and valrow != val
-
-            # si toutes les conditions sont remplies on garde l'observation
-            if check:
-                datares.append(row)
+        candidats = self.__candidats(dataset)
+
+        if isinstance(dataset, DatasetColonnes):
+            if candidats is not None:
+                dataset = dataset.prend(candidats)
+            masque = self.__predicat.masque(dataset)
+            return dataset.prend([i for i, garde in enumerate(masque) if garde])
+
+        test = self.__test
+        data = dataset.body
+        lignes = data if candidats is None else (data[i] for i in candidats)
+        datares = [row for row in lignes if test(row)]
 
         return Dataset(dataset.header, datares)
 
+    def compile_ligne(self, dataset, header):
+        """Test d'une seule observation (voir Transformation.compile_ligne)
+
+        Examples
+        --------
+        >>> fonction, _ = SelectionObservations(['age'], ['>'], [18], ['int']).compile_ligne(None, ['age'])
+        >>> fonction({'age': 23}), fonction({'age': 17})
+        ({'age': 23}, None)
+        """
+        test = self.__test
+
+        def selectionne(row):
+            return row if test(row) else None
+        return selectionne, header
+
 
 if __name__ == '__main__':
     import doctest
@@ -1,7 +1,8 @@
 """
 Sélectionner des variables d'un jeu de données.
 
-Crée un nouveau jeu de données ne contenant que les variables sélectionnées.
+Crée un nouveau jeu de données ne contenant que les variables sélectionnées,
+dans l'ordre dans lequel elles ont été demandées.
 """
 from pipelinepackage.transformations.transformation import Transformation
 from pipelinepackage.model.dataset import Dataset
@@ -27,6 +28,11 @@ class SelectionVariables(Transformation):
     [{'nom': 'Anne'}, {'nom': 'Clementine'}, {'nom': 'Chloe'}, {'nom': 'Maelle'}]
     """
 
+    ligne_a_ligne = True
+    conserve_tri = True
+    conserve_partition = True
+    fusionnable = True
+
     def __init__(self, variables):
         """Constructeur
 
@@ -38,6 +44,17 @@ class SelectionVariables(Transformation):
         super().__init__()
         self.__variables = variables
 
+    @property
+    def variables(self):
+        """Getter pour l'attribut variables
+
+        Returns
+        -------
+        list[str]
+            Nom de la ou des variables à conserver.
+        """
+        return self.__variables
+
     def transforme(self, dataset):
         """ Selection de variables dans un jeu de données.
 
@@ -60,12 +77,28 @@ class SelectionVariables(Transformation):
         """
         body = dataset.body
 
-        variables = list(set(self.__variables) & set(dataset.header))
+        variables = [var for var in self.__variables if var in dataset.header]
 
         for i in range(len(body)):
             body[i] = {key: body[i][key] for key in variables}
 
-        return Dataset(variables, body)
+        # mêmes observations dans le même ordre : les index restent valides
+        return Dataset(variables, body).reprend_index(dataset)
+
+    def compile_ligne(self, dataset, header):
+        """Sélection des variables d'une seule observation (voir Transformation.compile_ligne)
+
+        Examples
+        --------
+        >>> fonction, header = SelectionVariables(['region', 'age']).compile_ligne(None, ['nom', 'region'])
+        >>> fonction({'nom': 'Anne', 'region': 'Corse'}), header
+        ({'region': 'Corse'}, ['region'])
+        """
+        variables = [var for var in self.__variables if var in header]
+
+        def selectionne(row):
+            return {key: row[key] for key in variables}
+        return selectionne, variables
 
 
 if __name__ == '__main__':
@@ -0,0 +1,151 @@
+"""
+Calculer des statistiques glissantes (écart-type, minimum, maximum, médiane,
+quantiles) d'un jeu de données.
+
+Ne peut s'appliquer qu'à des variables numériques.
+
+Comme la moyenne glissante, le calcul repose sur le moteur de fenêtres
+glissantes (module fenetreglissante) : toutes les statistiques de toutes les
+variables sont mises à jour au cours d'un même parcours des observations triées.
+"""
+from pipelinepackage.transformations.fenetreglissante import FenetreGlissante
+from pipelinepackage.estimateurs.accumulateursglissants import AccMoyenne, AccEcartType, \
+    AccMin, AccMax, AccQuantile
+from pipelinepackage.model.dataset import Dataset
+
+# préfixe de la nouvelle variable et accumulateur associés à chaque statistique
+STATISTIQUES = {'moyenne': ('moygli_', AccMoyenne),
+                'ecarttype': ('ecartgli_', AccEcartType),
+                'min': ('mingli_', AccMin),
+                'max': ('maxgli_', AccMax),
+                'mediane': ('medgli_', AccQuantile)}
+
+
+class StatistiquesGlissantes(FenetreGlissante):
+    """Classe StatistiquesGlissantes
+
+    Ajoute au jeu de données des statistiques glissantes d'une ou plusieurs
+    variables. Chaque statistique donne une nouvelle variable, nommée par un
+    préfixe suivi du nom de la variable :
+
+    - 'moyenne' : moygli_
+    - 'ecarttype' : ecartgli_ (écart-type corrigé, comme Estimateur.ecarttype)
+    - 'min' : mingli_
+    - 'max' : maxgli_
+    - 'mediane' : medgli_
+    - 'qXX' : qXXgli_, quantile d'ordre XX % (par exemple 'q90')
+
+    Attributes
+    ----------
+    variables : list[str]
+        Variables sur lesquelles calculer les statistiques
+    nvals : int
+        Nombre de valeurs de la fenêtre centrée
+    vardate : str
+        Nom de la variable de date du jeu de données
+    statistiques : list[str]
+        Statistiques à calculer
+    duree : timedelta
+        Durée de la fenêtre, à la place d'un nombre de valeurs
+    groupby : list[str]
+        Variables définissant les groupes sur lesquels calculer séparément les statistiques
+
+    Examples
+    --------
+    >>> data = Dataset(['t', 'date'], [{'t': 3, 'date': '2020-01-01'}, {'t': 1, 'date': '2020-01-02'}, {'t': 4, 'date': '2020-01-03'}, {'t': 1, 'date': '2020-01-04'}, {'t': 5, 'date': '2020-01-05'}])
+    >>> s = StatistiquesGlissantes('t', 3, 'date', ['min', 'max', 'mediane', 'ecarttype'])
+    >>> for row in s.transforme(data).body[1:4]:
+    ...     print(row)
+    {'t': 1, 'date': '2020-01-02', 'mingli_t': 1.0, 'maxgli_t': 4.0, 'medgli_t': 3.0, 'ecartgli_t': 1.528}
+    {'t': 4, 'date': '2020-01-03', 'mingli_t': 1.0, 'maxgli_t': 4.0, 'medgli_t': 1.0, 'ecartgli_t': 1.732}
+    {'t': 1, 'date': '2020-01-04', 'mingli_t': 1.0, 'maxgli_t': 5.0, 'medgli_t': 4.0, 'ecartgli_t': 2.082}
+
+    Quantile sur les dernières 48h
+    >>> s = StatistiquesGlissantes('t', None, 'date', ['q90'], duree=2*24*3600)
+    >>> [row['q90gli_t'] for row in s.transforme(data).body]
+    [3.0, 2.8, 3.7, 3.7, 4.6]
+    """
+
+    def __init__(self, variables, nvals, vardate, statistiques=None, duree=None, groupby=None):
+        """Constructeur
+
+        Parameters
+        ----------
+        variables : str ou list[str]
+            Nom de la ou des variables sur lesquelles calculer les statistiques
+        nvals : int
+            Nombre de valeurs de la fenêtre centrée (ignoré si duree est renseignée)
+        vardate : str
+            Nom de la variable de date du jeu de données
+        statistiques : list[str], optional
+            Statistiques à calculer parmi 'moyenne', 'ecarttype', 'min', 'max',
+            'mediane' et 'qXX', by default None ('ecarttype', 'min', 'max' et 'mediane')
+        duree : timedelta ou int, optional
+            Durée de la fenêtre (en secondes si entier), by default None
+        groupby : str ou list[str], optional
+            Variable(s) définissant les groupes (par exemple la région), by default None
+        """
+        super().__init__(variables, nvals, vardate, duree, groupby)
+        if statistiques is None:
+            statistiques = ['ecarttype', 'min', 'max', 'mediane']
+        for stat in statistiques:
+            if stat not in STATISTIQUES and not stat.startswith('q'):
+                raise ValueError("Statistique inconnue : " + str(stat))
+        self.__statistiques = statistiques
+
+    @property
+    def statistiques(self):
+        """Statistiques à calculer"""
+        return self.__statistiques
+
+    def accumulateurs(self, variable):
+        """Statistiques calculées pour une variable
+
+        Parameters
+        ----------
+        variable : str
+            Nom de la variable
+
+        Returns
+        -------
+        list[tuple[str, Accumulateur]]
+            Nom de la nouvelle variable et accumulateur pour chaque statistique
+        """
+        accs = []
+        for stat in self.__statistiques:
+            if stat in STATISTIQUES:
+                prefixe, classe = STATISTIQUES[stat]
+                accs.append((prefixe+variable, classe()))
+            else:
+                accs.append((stat+"gli_"+variable, AccQuantile(float(stat[1:])/100)))
+        return accs
+
+    def transforme(self, dataset):
+        """Transformation d'un jeu de données.
+
+        Calcul des statistiques glissantes sur un jeu de données.
+
+        Parameters
+        ----------
+        dataset : Dataset
+            Jeu de données sur lequel on souhaite calculer les statistiques glissantes.
+
+        Returns
+        -------
+        Dataset
+            Jeu de données trié selon la date, avec une nouvelle variable par
+            statistique et par variable.
+
+        Examples
+        --------
+        >>> data = Dataset(['region', 'conso', 'date'], [{'region': 'A', 'conso': 10, 'date': '2022-01-01'}, {'region': 'B', 'conso': 100, 'date': '2022-01-01'}, {'region': 'A', 'conso': 20, 'date': '2022-01-02'}, {'region': 'B', 'conso': None, 'date': '2022-01-02'}, {'region': 'A', 'conso': 30, 'date': '2022-01-03'}, {'region': 'B', 'conso': 300, 'date': '2022-01-03'}])
+        >>> s = StatistiquesGlissantes('conso', 2, 'date', ['min', 'max'], groupby='region')
+        >>> [(row.get('mingli_conso'), row.get('maxgli_conso')) for row in s.transforme(data).body]
+        [(None, None), (None, None), (10.0, 20.0), (100.0, 100.0), (20.0, 30.0), (300.0, 300.0)]
+        """
+        return super().transforme(dataset)
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod(verbose=True)
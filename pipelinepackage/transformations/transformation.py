@@ -10,8 +10,31 @@ class Transformation(ABC):
     """Classe abstraite Transformation
 
     Base pour des classes effectuant des transformations sur des jeux de données
+
+    Attributes
+    ----------
+    ligne_a_ligne : bool
+        Vrai si chaque observation est traitée indépendamment des autres :
+        la transformation peut alors être appliquée lot par lot
+    conserve_tri : bool
+        Vrai si les observations gardent leur ordre relatif et si les
+        valeurs ne changent pas d'ordre : le tri décrit pour le jeu de
+        données (Dataset.tri) reste valable après la transformation
+    conserve_partition : bool
+        Vrai si des observations de mêmes valeurs restent consécutives et de
+        mêmes valeurs : la partition décrite (Dataset.partition) reste valable
+    fusionnable : bool
+        Vrai si la transformation peut être appliquée observation par
+        observation (voir compile_ligne) : plusieurs transformations
+        consécutives de ce genre sont alors fusionnées en un seul parcours
+        (voir Fusion)
     """
 
+    ligne_a_ligne = False
+    conserve_tri = False
+    conserve_partition = False
+    fusionnable = False
+
     @abstractmethod
     def __init__(self):
         """Constructeur
@@ -26,3 +49,111 @@ class Transformation(ABC):
         dataset : Dataset
             Jeu de données sur lequel la transformation est effectuée
         """
+
+    def transforme_lots(self, lots):
+        """Transformer un jeu de données lu par lots
+
+        Utilisé pour les transformations ligne à ligne lors d'une exécution
+        par lots (voir Pipeline.run) : les lots appartiennent au même jeu de
+        données, une transformation peut donc garder un état de l'un à
+        l'autre.
+
+        Parameters
+        ----------
+        lots : iterable[Dataset]
+            Lots successifs du jeu de données
+
+        Returns
+        -------
+        iterable[Dataset]
+            Lots transformés, un par lot reçu, par défaut transformés chacun
+            par transforme
+        """
+        return map(self.transforme, lots)
+
+    def compile_ligne(self, dataset, header):
+        """Fonction appliquant la transformation à une seule observation
+
+        Seules les transformations fusionnables (voir fusionnable) la
+        fournissent.
+
+        Parameters
+        ----------
+        dataset : Dataset
+            Jeu de données transformé (ses observations peuvent être
+            modifiées sur place par la fonction)
+        header : list[str]
+            Variables des observations reçues par la fonction
+
+        Returns
+        -------
+        tuple ou None
+            Fonction prenant une observation et rendant l'observation
+            transformée (None si elle est écartée), et variables des
+            observations rendues ; None si la transformation n'est pas
+            fusionnable
+        """
+        return None
+
+    def estime(self, nombre):
+        """Nombre estimé d'observations rendues (voir Plan)
+
+        Parameters
+        ----------
+        nombre : float
+            Nombre estimé d'observations reçues
+
+        Returns
+        -------
+        float
+            Nombre estimé d'observations rendues, par défaut le même
+        """
+        return nombre
+
+    def commute(self, predicat):
+        """Une sélection selon predicat peut-elle être faite avant la transformation ?
+
+        Parameters
+        ----------
+        predicat : Predicat
+            Condition de la sélection
+
+        Returns
+        -------
+        bool
+            Vrai si sélectionner avant ou après la transformation donne le
+            même résultat, par défaut False
+        """
+        return False
+
+    def ordre(self, tri):
+        """Tri des observations rendues (voir Dataset.tri)
+
+        Parameters
+        ----------
+        tri : tuple[str]
+            Tri des observations reçues
+
+        Returns
+        -------
+        tuple[str]
+            Tri des observations rendues : par défaut celui reçu s'il est
+            conservé, () sinon
+        """
+        return tuple(tri) if self.conserve_tri else ()
+
+    def evite_tri(self, tri):
+        """La transformation peut-elle se passer de trier les observations ?
+
+        Parameters
+        ----------
+        tri : tuple[str]
+            Tri des observations reçues
+
+        Returns
+        -------
+        bool ou None
+            None si la transformation ne trie jamais, sinon vrai si le tri
+            décrit la dispense de trier
+        """
+        return None